@@ -0,0 +1,176 @@
+from typing import Optional
+import logging
+import threading
+import httpx
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    DefaultHttpxClient,
+    DefaultAsyncHttpxClient,
+    DEFAULT_CONNECTION_LIMITS,
+    Timeout
+    )
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    QDRANT_URL,
+    QDRANT_API_KEY,
+    CLIENT_MAX_CONNECTIONS,
+    CLIENT_MAX_KEEPALIVE,
+    CLIENT_KEEPALIVE_EXPIRY,
+    CLIENT_TIMEOUT,
+    CLIENT_CONNECT_TIMEOUT,
+    QDRANT_PREFER_GRPC,
+    QDRANT_GRPC_PORT
+    )
+
+# Pool limits type of the HTTP library the OpenAI SDK is built on
+OpenAILimits = type(DEFAULT_CONNECTION_LIMITS)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+
+class ClientRegistry:
+    """Builds OpenAI and Qdrant clients once and hands the same instances to every caller.
+
+    All OpenAI clients share one pooled HTTP transport (one sync, one async), so `RAG`, `Chat` and
+    `IngestionPipeline` reuse warm keep-alive connections instead of each opening their own. Qdrant
+    clients are shared per URL and can use gRPC, which sends vectors as packed floats instead of JSON.
+
+    Args:
+        openai_api_key (str): Default OpenAI API key. Default is taken from config.
+        openai_base_url (str | None): OpenAI API base URL. Default is taken from config (the public API).
+        qdrant_url (str): Default Qdrant URL. Default is taken from config.
+        qdrant_api_key (str): Qdrant API key. Default is taken from config.
+        max_connections (int): Connection pool size per transport. Default is taken from config (100).
+        max_keepalive_connections (int): Idle connections kept open per transport. Default is taken from config (20).
+        keepalive_expiry (float): Seconds an idle connection is kept open. Default is taken from config (30).
+        timeout (float): Read/write timeout in seconds. Default is taken from config (60).
+        connect_timeout (float): Connect timeout in seconds. Default is taken from config (5).
+        prefer_grpc (bool): Talk to Qdrant over gRPC instead of HTTP/JSON. Default is taken from config (False).
+        grpc_port (int): Qdrant gRPC port. Default is taken from config (6334).
+        check_compatibility (bool): Ask the Qdrant server for its version when a client is built. Off by default,
+            since it costs a round trip at startup. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = OPENAI_API_KEY,
+        openai_base_url: Optional[str] = OPENAI_BASE_URL,
+        qdrant_url: Optional[str] = QDRANT_URL,
+        qdrant_api_key: Optional[str] = QDRANT_API_KEY,
+        max_connections: int = CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = CLIENT_MAX_KEEPALIVE,
+        keepalive_expiry: float = CLIENT_KEEPALIVE_EXPIRY,
+        timeout: float = CLIENT_TIMEOUT,
+        connect_timeout: float = CLIENT_CONNECT_TIMEOUT,
+        prefer_grpc: bool = QDRANT_PREFER_GRPC,
+        grpc_port: int = QDRANT_GRPC_PORT,
+        check_compatibility: bool = False,
+    ):
+        self.openai_api_key = openai_api_key
+        self.openai_base_url = openai_base_url
+        self.qdrant_url = qdrant_url
+        self.qdrant_api_key = qdrant_api_key
+        self.prefer_grpc = prefer_grpc
+        self.grpc_port = grpc_port
+        self.check_compatibility = check_compatibility
+        self.timeout = timeout
+        pool = dict(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.openai_limits = OpenAILimits(**pool)
+        self.qdrant_limits = httpx.Limits(**pool)
+        self.openai_timeout = Timeout(timeout, connect=connect_timeout)
+        self._clients: dict[tuple, object] = {}
+        # Re-entrant: building an OpenAI client builds the shared transport under the same lock
+        self._lock = threading.RLock()
+
+    def http_client(self) -> DefaultHttpxClient:
+        """The pooled sync transport shared by all OpenAI clients."""
+        return self._get(("http",), lambda: DefaultHttpxClient(limits=self.openai_limits, timeout=self.openai_timeout))
+
+    def async_http_client(self) -> DefaultAsyncHttpxClient:
+        """The pooled async transport shared by all async OpenAI clients."""
+        return self._get(("async_http",), lambda: DefaultAsyncHttpxClient(limits=self.openai_limits, timeout=self.openai_timeout))
+
+    def openai(self, api_key: Optional[str] = None) -> OpenAI:
+        api_key = api_key or self.openai_api_key
+        return self._get(("openai", api_key), lambda: OpenAI(api_key=api_key, base_url=self.openai_base_url, http_client=self.http_client()))
+
+    def async_openai(self, api_key: Optional[str] = None) -> AsyncOpenAI:
+        api_key = api_key or self.openai_api_key
+        return self._get(("async_openai", api_key), lambda: AsyncOpenAI(api_key=api_key, base_url=self.openai_base_url, http_client=self.async_http_client()))
+
+    def qdrant(self, url: Optional[str] = None) -> QdrantClient:
+        url = url or self.qdrant_url
+        return self._get(("qdrant", url), lambda: QdrantClient(**self._qdrant_kwargs(url)))
+
+    def async_qdrant(self, url: Optional[str] = None) -> AsyncQdrantClient:
+        url = url or self.qdrant_url
+        return self._get(("async_qdrant", url), lambda: AsyncQdrantClient(**self._qdrant_kwargs(url)))
+
+    def close(self) -> None:
+        """Close the sync clients. Async clients are closed with `aclose`."""
+        with self._lock:
+            for key, client in list(self._clients.items()):
+                if not key[0].startswith("async"):
+                    client.close()
+                    del self._clients[key]
+
+    async def aclose(self) -> None:
+        """Close every client, sync and async."""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for key, client in clients:
+            if key[0] == "async_http":
+                await client.aclose()
+            elif key[0].startswith("async"):
+                await client.close()
+            else:
+                client.close()
+
+    # Helper methods
+    def _get(self, key: tuple, factory):
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = factory()
+                    logging.info(f"Created shared {key[0]} client.")
+        return client
+
+    def _qdrant_kwargs(self, url: Optional[str]) -> dict:
+        kwargs = {
+            "url": url,
+            "api_key": self.qdrant_api_key,
+            "timeout": int(self.timeout),
+            "prefer_grpc": self.prefer_grpc,
+            "grpc_port": self.grpc_port,
+            "check_compatibility": self.check_compatibility,
+        }
+        if not self.prefer_grpc:
+            kwargs["limits"] = self.qdrant_limits
+        return kwargs
+
+
+_default_registry: Optional[ClientRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_clients() -> ClientRegistry:
+    """The process-wide registry built from config."""
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                _default_registry = ClientRegistry()
+    return _default_registry
@@ -0,0 +1,202 @@
+from collections import Counter
+from contextlib import nullcontext
+from typing import Awaitable, Callable, ContextManager, Generic, Hashable, Optional, TypeVar
+import asyncio
+import logging
+import threading
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class RequestCoalescer(Generic[K, V]):
+    """Collects concurrent single-item requests into batched upstream calls.
+
+    Callers `await submit(item)`. Items are gathered until `max_batch_size` are waiting or the oldest has
+    waited `max_delay` seconds, then `handler` is called once with the whole batch and each caller gets
+    its own result back. If the batch call fails, every caller in it gets the error. Meant for use on a
+    single event loop (one per server worker).
+
+    Args:
+        handler (Callable[[list[K]], Awaitable[list[V]]]): Processes a batch; returns one result per item, in order.
+        max_batch_size (int): Items per batch. 1 disables batching. Defaults to 32.
+        max_delay (float): Seconds the first item of a batch may wait for others. Defaults to 0.005.
+        name (str): Label for log messages. Defaults to "batch".
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[K]], Awaitable[list[V]]],
+        max_batch_size: int = 32,
+        max_delay: float = 0.005,
+        name: str = "batch",
+    ):
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}.")
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.name = name
+
+        self._pending: list[tuple[K, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes: Counter[int] = Counter()
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+
+    async def submit(self, item: K) -> V:
+        """Queue `item` for the next batch and return its result."""
+        if self.max_batch_size == 1:
+            return (await self.handler([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, loop.time()))
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._dispatch)
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_delay_ms": 1000 * self.queue_delay_total / self.items if self.items else 0.0,
+            "max_queue_delay_ms": 1000 * self.queue_delay_max,
+        }
+
+    # Helper methods
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        now = asyncio.get_running_loop().time()
+        delays = [now - enqueued_at for _, _, enqueued_at in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        self.queue_delay_total += sum(delays)
+        self.queue_delay_max = max(self.queue_delay_max, max(delays))
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[K, asyncio.Future, float]]) -> None:
+        try:
+            results = await self.handler([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} handler returned {len(results)} results for {len(batch)} items.")
+        except Exception as e:
+            logging.warning(f"{self.name} of {len(batch)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            # A caller that was cancelled while waiting has no one to receive its result
+            if not future.done():
+                future.set_result(result)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers with the same key share its result.
+
+    The first caller starts the work and later callers with the same key wait for it, inside the
+    `waiting` context if one is given (e.g. a timing stage, as the work is timed for the first caller
+    only). Errors reach every waiting caller. Nothing is cached: once the call finishes its key is free again, so the next caller
+    starts fresh work, after a success as well as after an error.
+    """
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Future] = {}
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[V]], waiting: Optional[Callable[[], ContextManager]] = None
+    ) -> V:
+        """Await `fn()` for `key`, or join the call already in flight for it."""
+        task = self._tasks.get(key)
+        if task is None:
+            # Run as its own task so a cancelled caller does not cancel the call for the others
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.calls += 1
+            return await asyncio.shield(task)
+        self.shared += 1
+        with (waiting or nullcontext)():
+            return await asyncio.shield(task)
+
+    def do_sync(self, key: Hashable, fn: Callable[[], V], waiting: Optional[Callable[[], ContextManager]] = None) -> V:
+        """Thread-based version of `do` for synchronous callers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            with (waiting or nullcontext)():
+                call.done.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        total = self.calls + self.shared
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "in_flight": len(self._tasks) + len(self._calls),
+            "shared_rate": self.shared / total if total else 0.0,
+        }
+
+    # Helper methods
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Callers receive the error through `shield`; mark it retrieved so asyncio does not log it again
+            task.exception()
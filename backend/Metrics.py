@@ -0,0 +1,241 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+import bisect
+import logging
+import re
+import threading
+import time
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+# Seconds; spans cached lookups (milliseconds) up to slow model responses
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    # `:g` would round large counts to 6 significant digits
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values)
+        return lines
+
+
+class Histogram:
+    """Bucketed distribution of observed values per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (last one is +Inf), sum]
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class RequestTimings:
+    """Seconds spent per stage while serving one request, for the `Server-Timing` header.
+
+    Stages that run concurrently (history summary and retrieval) are each counted in full, so the
+    stages can add up to more than `total`.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        # Set to "error" by handlers that report a failure without raising (e.g. inside a stream)
+        self.status = "ok"
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict[str, float]:
+        """Milliseconds per stage, plus `total` so far."""
+        timings = {stage: round(1000 * seconds, 1) for stage, seconds in self.stages.items()}
+        timings["total"] = round(1000 * self.elapsed(), 1)
+        return timings
+
+    def header(self) -> str:
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.as_dict().items())
+
+
+# Timings of the request being served by the current task; None outside a request
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+class Metrics:
+    """Latency histograms and counters for the chat path, exported in the Prometheus text format.
+
+    `stage(name)` times a pipeline stage into `<namespace>_stage_seconds` and, inside `request(...)`,
+    into that request's `RequestTimings`. Stats dicts from other components (cache and batching
+    counters) are added at scrape time through `register_stats`.
+
+    Args:
+        namespace (str): Prefix of every metric name. Defaults to "rag".
+    """
+
+    def __init__(self, namespace: str = "rag"):
+        self.namespace = namespace
+        self.request_seconds = Histogram(f"{namespace}_request_seconds", "Time to serve a request.", ("endpoint",))
+        self.stage_seconds = Histogram(f"{namespace}_stage_seconds", "Time spent per pipeline stage.", ("stage",))
+        self.requests = Counter(f"{namespace}_requests_total", "Requests served.", ("endpoint", "status"))
+        self.errors = Counter(f"{namespace}_errors_total", "Pipeline stages that raised.", ("stage",))
+        self.tokens = Counter(f"{namespace}_tokens_total", "Tokens reported by the OpenAI API.", ("model", "kind"))
+        self._stats: dict[str, Callable[[], dict]] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors.inc(stage=name)
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self.stage_seconds.observe(seconds, stage=name)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.add(name, seconds)
+
+    @contextmanager
+    def request(self, endpoint: str) -> Iterator[RequestTimings]:
+        """Time a request and collect the stages run on its behalf."""
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        try:
+            yield timings
+        except BaseException:
+            timings.status = "error"
+            raise
+        finally:
+            self.request_seconds.observe(timings.elapsed(), endpoint=endpoint)
+            self.requests.inc(endpoint=endpoint, status=timings.status)
+            try:
+                _request_timings.reset(token)
+            except ValueError:
+                # A streaming response closed from another task; its context is discarded anyway
+                pass
+
+    def record_usage(self, model: str, usage) -> None:
+        """Count the tokens of a Responses or Embeddings API `usage` object."""
+        if usage is None:
+            return
+        # Embedding usage reports prompt_tokens instead of input_tokens
+        input_tokens = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", None)
+        output_tokens = getattr(usage, "output_tokens", None)
+        if input_tokens:
+            self.tokens.inc(input_tokens, model=model, kind="input")
+        if output_tokens:
+            self.tokens.inc(output_tokens, model=model, kind="output")
+
+    def register_stats(self, name: str, collect: Callable[[], dict]) -> None:
+        """Export the numeric values of `collect()` as gauges named `<namespace>_<name>_<key>`.
+
+        `collect` returns either a flat dict or a dict of such dicts, one per group (e.g. `Chat.cache_stats`).
+        """
+        self._stats[name] = collect
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.request_seconds, self.stage_seconds, self.requests, self.errors, self.tokens):
+            lines.extend(metric.render())
+        for name, collect in list(self._stats.items()):
+            try:
+                lines.extend(self._stats_lines(name, collect()))
+            except Exception as e:
+                logging.warning(f"Could not collect {name} stats for metrics: {e}")
+        return "\n".join(lines) + "\n"
+
+    # Helper methods
+    def _stats_lines(self, name: str, stats: dict) -> list[str]:
+        grouped = bool(stats) and all(isinstance(value, dict) for value in stats.values())
+        groups = stats.items() if grouped else [(None, stats)]
+        series: dict[str, list[str]] = {}
+        for group, values in groups:
+            labels = _labels(("group",), (group,)) if group is not None else ""
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = re.sub(r"[^a-zA-Z0-9_]", "_", f"{self.namespace}_{name}_{key}")
+                series.setdefault(metric, []).append(f"{metric}{labels} {_number(value)}")
+        lines = []
+        for metric, samples in series.items():
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(samples)
+        return lines
+
+
+_default_metrics: Optional[Metrics] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """The process-wide metrics."""
+    global _default_metrics
+    if _default_metrics is None:
+        with _default_lock:
+            if _default_metrics is None:
+                _default_metrics = Metrics()
+    return _default_metrics
@@ -0,0 +1,71 @@
+from typing import Optional
+import logging
+import threading
+import tiktoken
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+# Characters per token assumed when no tokenizer can be loaded. OpenAI tokenizers average about 4 on
+# English text; 3 over-counts a little so estimated budgets stay under the real API limits.
+CHARS_PER_TOKEN = 3
+
+_encodings: dict[tuple[str, str], Optional["tiktoken.Encoding"]] = {}
+_lock = threading.Lock()
+
+
+def load_encoding(model: str, fallback: str = "cl100k_base") -> Optional["tiktoken.Encoding"]:
+    """tiktoken encoding of `model` (or `fallback` for unknown models), or None if it cannot be loaded.
+
+    tiktoken downloads its BPE files on first use, which fails without network access. The result,
+    including a failure, is remembered per process so a missing file costs one attempt, not one per caller.
+    """
+    with _lock:
+        if (model, fallback) in _encodings:
+            return _encodings[(model, fallback)]
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(fallback)
+        except Exception as e:
+            logging.warning(f"Could not load the tokenizer for '{model}' ({e}); estimating tokens as {CHARS_PER_TOKEN} characters each.")
+            encoding = None
+        _encodings[(model, fallback)] = encoding
+        return encoding
+
+
+class Tokenizer:
+    """Token counting, truncation and splitting with the model's tokenizer, or a character estimate.
+
+    Args:
+        model (str): Model whose tokenizer is used.
+        fallback (str): Encoding for models tiktoken does not know. Defaults to "cl100k_base".
+    """
+
+    def __init__(self, model: str, fallback: str = "cl100k_base"):
+        self.encoding = load_encoding(model, fallback)
+
+    @property
+    def exact(self) -> bool:
+        """False when counts are estimated from characters."""
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def split(self, text: str, max_tokens: int) -> list[str]:
+        """Consecutive pieces of `text` of at most `max_tokens` tokens each."""
+        if self.encoding is None:
+            size = max_tokens * CHARS_PER_TOKEN
+            return [text[start:start + size] for start in range(0, len(text), size)] or [""]
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return [self.encoding.decode(tokens[start:start + max_tokens]) for start in range(0, len(tokens), max_tokens)] or [""]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The first `max_tokens` tokens of `text`."""
+        return self.split(text, max_tokens)[0]
@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from pathlib import Path
+import csv
+import io
+import math
+import random
+import textwrap
+
+_ONSETS = ("b", "c", "d", "f", "g", "k", "l", "m", "n", "p", "r", "s", "t", "v", "z", "br", "st", "tr", "pl", "gr")
+_VOWELS = ("a", "e", "i", "o", "u", "ai", "ou", "ea")
+_CODAS = ("", "", "n", "r", "s", "t", "l", "m", "x")
+
+
+# File formats `Corpus.write_files` can produce, as handled by the ingestion loaders
+FORMATS = ("pdf", "csv", "txt", "md")
+DISTRIBUTIONS = ("lognormal", "uniform", "fixed")
+
+
+@dataclass
+class SyntheticDocument:
+    title: str
+    text: str
+    topic: list[str]
+
+
+def vocabulary(size: int = 5000, seed: int = 0) -> list[str]:
+    """`size` distinct pronounceable pseudo-words. Earlier words are drawn more often (see `Corpus`)."""
+    rng = random.Random(seed)
+    words: dict[str, None] = {}
+    while len(words) < size:
+        syllables = rng.choice((1, 2, 2, 3, 3, 4))
+        words["".join(rng.choice(_ONSETS) + rng.choice(_VOWELS) + rng.choice(_CODAS) for _ in range(syllables))] = None
+    return list(words)
+
+
+class Corpus:
+    """Deterministic synthetic text with a Zipf-like word distribution.
+
+    Every document mixes common words with a few topic words of its own, so questions built from a
+    document's topic words retrieve that document.
+
+    Args:
+        vocabulary_size (int): Number of distinct words. Defaults to 5000.
+        topic_words (int): Topic words drawn per document. Defaults to 12.
+        topic_share (float): Fraction of a document's words that are topic words. Defaults to 0.4.
+        seed (int): Seed of the word list and of every generated text. Defaults to 0.
+    """
+
+    def __init__(self, vocabulary_size: int = 5000, topic_words: int = 12, topic_share: float = 0.4, seed: int = 0):
+        self.words = vocabulary(vocabulary_size, seed)
+        self.weights = [1.0 / rank for rank in range(1, len(self.words) + 1)]
+        self.topic_words = topic_words
+        self.topic_share = topic_share
+        self.seed = seed
+
+    def sentence(self, rng: random.Random, topic: list[str], length: int) -> str:
+        words = [rng.choice(topic) if rng.random() < self.topic_share else word for word in rng.choices(self.words, self.weights, k=length)]
+        return " ".join(words).capitalize() + "."
+
+    def paragraph(self, rng: random.Random, topic: list[str], words: int) -> str:
+        sentences, count = [], 0
+        while count < words:
+            length = rng.randint(8, 24)
+            sentences.append(self.sentence(rng, topic, length))
+            count += length
+        return " ".join(sentences)
+
+    def topic(self, rng: random.Random) -> list[str]:
+        # Topic words come from the rarer half of the vocabulary, so they identify the document
+        return rng.sample(self.words[len(self.words) // 2:], self.topic_words)
+
+    def documents(self, count: int, words: int = 200) -> list[SyntheticDocument]:
+        """`count` single-paragraph documents of about `words` words each."""
+        rng = random.Random(f"{self.seed}:documents")
+        documents = []
+        for number in range(count):
+            topic = self.topic(rng)
+            documents.append(SyntheticDocument(title=f"doc-{number:06d}-{topic[0]}", text=self.paragraph(rng, topic, words), topic=topic))
+        return documents
+
+    def questions(self, documents: list[SyntheticDocument], count: int, seed: int = 0) -> list[str]:
+        """`count` questions, each about a random document: mostly its topic words, plus a few common words."""
+        rng = random.Random(f"{self.seed}:questions:{seed}")
+        questions = []
+        for _ in range(count):
+            document = rng.choice(documents)
+            terms = rng.sample(document.topic, min(6, len(document.topic))) + rng.choices(self.words[:100], k=2)
+            questions.append(f"What does the report say about {' '.join(terms)}?")
+        return questions
+
+    def write_files(
+        self,
+        root: str | Path,
+        count: int,
+        formats: tuple[str, ...] = FORMATS,
+        mean_words: int = 800,
+        distribution: str = "lognormal",
+        directory: str = "bench",
+    ) -> list[dict]:
+        """Write `count` files under `root/directory`, cycling through `formats`.
+
+        File lengths in words follow `distribution` around `mean_words`: "lognormal" (a long tail of large
+        files, like real document stores), "uniform" (between half and one and a half times the mean) or "fixed".
+
+        Returns:
+            list[dict]: one entry per file with its blob "name", "format", "words" and "bytes"
+        """
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown formats {sorted(unknown)}. Available: {', '.join(FORMATS)}.")
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}'. Available: {', '.join(DISTRIBUTIONS)}.")
+        rng = random.Random(f"{self.seed}:files")
+        folder = Path(root) / directory
+        folder.mkdir(parents=True, exist_ok=True)
+        files = []
+        for number in range(count):
+            file_format = formats[number % len(formats)]
+            words = self.file_words(rng, mean_words, distribution)
+            topic = self.topic(rng)
+            title = f"report-{number:06d}-{topic[0]}"
+            content = getattr(self, f"_{file_format}")(rng, topic, words, title)
+            (folder / f"{title}.{file_format}").write_bytes(content)
+            files.append({"name": f"{directory}/{title}.{file_format}", "format": file_format, "words": words, "bytes": len(content)})
+        return files
+
+    def file_words(self, rng: random.Random, mean_words: int, distribution: str) -> int:
+        if distribution == "fixed":
+            return mean_words
+        if distribution == "uniform":
+            return rng.randint(max(1, mean_words // 2), max(1, mean_words * 3 // 2))
+        # Lognormal with the requested mean
+        sigma = 1.0
+        return max(20, int(rng.lognormvariate(math.log(mean_words) - sigma ** 2 / 2, sigma)))
+
+    # Helper methods
+    def _paragraphs(self, rng: random.Random, topic: list[str], words: int) -> list[str]:
+        paragraphs, written = [], 0
+        while written < words:
+            length = min(rng.randint(60, 160), words - written)
+            paragraphs.append(self.paragraph(rng, topic, length))
+            written += length
+        return paragraphs
+
+    def _txt(self, rng: random.Random, topic: list[str], words: int, title: str) -> bytes:
+        return "\n\n".join([title, *self._paragraphs(rng, topic, words)]).encode("utf-8")
+
+    def _md(self, rng: random.Random, topic: list[str], words: int, title: str) -> bytes:
+        lines = [f"# {title}", ""]
+        for number, paragraph in enumerate(self._paragraphs(rng, topic, words), start=1):
+            if number % 3 == 1:
+                lines += [f"## Section {number // 3 + 1}: {' '.join(rng.sample(topic, 2))}", ""]
+            lines += [paragraph, ""]
+            if number % 4 == 0:
+                lines += [f"- {self.sentence(rng, topic, 6)}" for _ in range(3)] + [""]
+        return "\n".join(lines).encode("utf-8")
+
+    def _csv(self, rng: random.Random, topic: list[str], words: int, title: str) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "quarter", "category", "amount", "description"])
+        for row in range(max(1, words // 12)):
+            writer.writerow([
+                f"{title}-{row}",
+                f"Q{rng.randint(1, 4)}",
+                rng.choice(topic),
+                f"{rng.uniform(10, 100_000):.2f}",
+                self.sentence(rng, topic, 12),
+            ])
+        return buffer.getvalue().encode("utf-8")
+
+    def _pdf(self, rng: random.Random, topic: list[str], words: int, title: str) -> bytes:
+        lines = [title, ""]
+        for paragraph in self._paragraphs(rng, topic, words):
+            lines += textwrap.wrap(paragraph, width=95) + [""]
+        return pdf_bytes([lines[start:start + 60] for start in range(0, len(lines), 60)])
+
+
+def pdf_bytes(pages: list[list[str]]) -> bytes:
+    """Minimal PDF with one Helvetica text line per string, `pages` giving the lines of each page."""
+    def escape(line: str) -> str:
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    page_numbers = [4 + 2 * index for index in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{number} 0 R' for number in page_numbers)}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for number, lines in zip(page_numbers, pages):
+        stream = ("BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({escape(line)}) Tj T*" for line in lines) + " ET").encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {number + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
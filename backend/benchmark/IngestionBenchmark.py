@@ -0,0 +1,149 @@
+"""Offline benchmark of `IngestionPipeline.ingest_from_azure`.
+
+Generates a synthetic PDF/CSV/TXT/Markdown corpus on disk, serves it through `LocalContainerClient`
+in place of Azure Blob Storage, embeds through the fake OpenAI server and stores into an in-memory
+Qdrant (or a local Qdrant server), then prints a JSON report: docs/s, chunks/s, peak RSS and seconds
+per stage (list, download, parse, chunk, embed, upsert), and how long the first vectors took to land.
+
+    python -m backend.benchmark.IngestionBenchmark --documents 200 --mean-words 1500 --output ingest.json
+
+Download, parse, chunk, embed and upsert times are summed across worker threads/processes, so they
+can exceed the wall-clock `total`; compare them between runs rather than against `total`.
+"""
+from pathlib import Path
+from typing import Optional
+import argparse
+import logging
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from ..database.Ingestion import IngestionPipeline
+from ..database.LocalBlobStorage import LocalContainerClient
+from .Corpus import Corpus, DISTRIBUTIONS, FORMATS
+from .Report import environment, write_report
+from .Stubs import FakeOpenAIServer, LocalClients
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size of this process, or of its largest finished child process (e.g. a parser), in MiB."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def run(args: argparse.Namespace, root: Path, server: FakeOpenAIServer) -> dict:
+    clients = LocalClients(openai_base_url=server.base_url, qdrant_url=args.qdrant_url)
+    pipeline = IngestionPipeline(
+        qdrant_url=args.qdrant_url,
+        collection_name=args.collection,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        container_client=LocalContainerClient(root),
+        download_workers=args.download_workers,
+        embed_concurrency=args.embed_concurrency,
+        max_batch_tokens=args.max_batch_tokens,
+        embedding_cache_dir=args.embedding_cache,
+        profile=args.profile,
+        clients=clients,
+    )
+    rss_before = peak_rss_mb()
+
+    started = time.perf_counter()
+    blob_names = pipeline.list_all_blob_names(directory=args.directory)
+    list_seconds = time.perf_counter() - started
+    result = pipeline.ingest_from_azure(blob_names, directory=args.directory, parse_workers=args.parse_workers)
+    total = time.perf_counter() - started
+    clients.close()
+
+    timings = result.get("timings", {})
+    stored = result.get("stored_count", 0)
+    loaded = len(blob_names) - len(result.get("load_errors", {}))
+    return {
+        "status": result["status"],
+        "documents": len(blob_names),
+        "failed_documents": len(blob_names) - loaded,
+        "chunks": stored,
+        "seconds": total,
+        "documents_per_second": loaded / total if total else 0.0,
+        "chunks_per_second": stored / total if total else 0.0,
+        "stages_seconds": {
+            "list": list_seconds,
+            **{stage: timings[stage] for stage in ("download", "parse", "chunk", "embed", "upsert") if stage in timings},
+        },
+        "wall_seconds": {stage: timings[stage] for stage in ("first_upsert", "load_and_chunk", "embed_and_store") if stage in timings},
+        "peak_rss_mb": {
+            "before_ingestion": rss_before,
+            "process": peak_rss_mb(),
+            "children": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        },
+        "errors": result.get("errors", [])[:10],
+        "load_errors": dict(list(result.get("load_errors", {}).items())[:10]),
+    }
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ingestion of a synthetic corpus against local stand-ins.")
+    parser.add_argument("--documents", type=int, default=100, help="Files in the synthetic corpus.")
+    parser.add_argument("--formats", default=",".join(FORMATS), help=f"Comma-separated file formats ({', '.join(FORMATS)}).")
+    parser.add_argument("--mean-words", type=int, default=800, help="Mean words per file.")
+    parser.add_argument("--distribution", default="lognormal", choices=DISTRIBUTIONS, help="File size distribution.")
+    parser.add_argument("--corpus-dir", default=None, help="Write the corpus here and keep it. Defaults to a temporary directory.")
+    parser.add_argument("--directory", default="bench", help="Blob directory (prefix) of the corpus.")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Parser processes. Default parses in the calling process.")
+    parser.add_argument("--download-workers", type=int, default=8, help="IngestionPipeline download_workers.")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="IngestionPipeline embed_concurrency.")
+    parser.add_argument("--max-batch-tokens", type=int, default=100_000, help="Token budget per embedding request.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Characters per chunk.")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Characters of overlap between chunks.")
+    parser.add_argument("--embedding-cache", default=None, help="Embedding cache directory. Default disables the cache.")
+    parser.add_argument("--embedding-latency", type=float, default=0.2, help="Seconds per fake embeddings request.")
+    parser.add_argument("--profile", default="default", help="Collection profile (see backend/database/Profiles.py).")
+    parser.add_argument("--collection", default="benchmark_ingestion", help="Collection name.")
+    parser.add_argument("--qdrant-url", default=None, help="Local Qdrant server to use instead of the in-memory client.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus.")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+
+    root = Path(args.corpus_dir) if args.corpus_dir else Path(tempfile.mkdtemp(prefix="ingestion-benchmark-"))
+    try:
+        started = time.perf_counter()
+        files = Corpus(seed=args.seed).write_files(
+            root, args.documents, formats=formats, mean_words=args.mean_words,
+            distribution=args.distribution, directory=args.directory,
+        )
+        corpus = {
+            "files": len(files),
+            "bytes": sum(f["bytes"] for f in files),
+            "words": sum(f["words"] for f in files),
+            "by_format": {fmt: sum(1 for f in files if f["format"] == fmt) for fmt in formats},
+            "generate_seconds": time.perf_counter() - started,
+        }
+        with FakeOpenAIServer(embedding_latency=args.embedding_latency, seed=args.seed) as server:
+            results = run(args, root, server)
+            calls = server.calls
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "benchmark": "ingestion",
+        "environment": environment(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "corpus": corpus,
+        **results,
+        "upstream_calls": calls,
+    }
+    write_report(report, args.output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Offline benchmark of `/api/chat`.
+
+Runs the real API app in process against a fake OpenAI server (deterministic embeddings, configurable
+latency) and an in-memory Qdrant (or a local Qdrant server) seeded with a synthetic corpus, drives
+`chat_endpoint` at a fixed concurrency and prints a JSON report: latency percentiles, requests per
+second, the per-stage breakdown from the `Server-Timing` headers, and cache and batching stats.
+
+The in-memory Qdrant searches in Python on the event loop thread, so its `search` times are far from
+a real server's; pass `--qdrant-url` of a local Qdrant when search latency is what is being measured.
+
+    python -m backend.benchmark.QueryBenchmark --requests 500 --concurrency 32 --output bench.json
+"""
+from typing import Optional
+import argparse
+import asyncio
+import logging
+import time
+import httpx
+from qdrant_client import models
+from ..database.Agent import RAG
+from ..database.Profiles import CollectionProfile, get_profile
+from ..database.Sparse import BM25Encoder
+from ..server import api
+from ..server.Chat import Chat
+from ..server.Conversations import MemoryConversationStore
+from .Corpus import Corpus, SyntheticDocument
+from .Report import environment, percentiles, write_report
+from .Stubs import FakeOpenAIServer, LocalClients, hash_embedding
+
+
+async def seed_collection(
+    clients: LocalClients,
+    collection_name: str,
+    profile: CollectionProfile,
+    documents: list[SyntheticDocument],
+    batch_size: int = 256,
+) -> None:
+    """(Re)create the collection with the profile's layout and store one point per document."""
+    encoder = BM25Encoder()
+    points = [
+        models.PointStruct(
+            id=number,
+            vector=profile.point_vector(
+                hash_embedding(document.text, profile.dimensions),
+                encoder.encode_document(document.text) if profile.sparse else None,
+            ),
+            payload={"text": document.text, "title": document.title, "source": document.title, "blob_path": document.title},
+        )
+        for number, document in enumerate(documents)
+    ]
+    for client in clients.each_qdrant():
+        async def call(method, **kwargs):
+            result = getattr(client, method)(**kwargs)
+            return await result if asyncio.iscoroutine(result) else result
+
+        if await call("collection_exists", collection_name=collection_name):
+            await call("delete_collection", collection_name=collection_name)
+        await call(
+            "create_collection",
+            collection_name=collection_name,
+            vectors_config=profile.vectors_config(),
+            sparse_vectors_config=profile.sparse_vectors_config(),
+            quantization_config=profile.quantization_config(),
+        )
+        if clients.qdrant_url is not None:
+            await call("create_payload_index", collection_name=collection_name, field_name="title", field_schema=models.PayloadSchemaType.KEYWORD)
+        for start in range(0, len(points), batch_size):
+            await call("upsert", collection_name=collection_name, points=points[start:start + batch_size])
+
+
+def parse_server_timing(header: Optional[str]) -> dict[str, float]:
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, duration = entry.strip().partition(";dur=")
+        if name and duration:
+            timings[name] = float(duration)
+    return timings
+
+
+async def drive(client: httpx.AsyncClient, questions: list[str], concurrency: int) -> tuple[list[dict], float]:
+    """Send every question to `/api/chat` with `concurrency` requests in flight. Returns per-request results and wall time."""
+    results: list[dict] = []
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(questions):
+            question = questions[next_index]
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                response = await client.post("/api/chat", json={"message": question})
+                status = response.status_code
+                stages = parse_server_timing(response.headers.get("server-timing"))
+            except httpx.HTTPError:
+                status, stages = None, {}
+            results.append({"latency_ms": 1000 * (time.perf_counter() - started), "status": status, "stages": stages})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def summarize(results: list[dict], seconds: float) -> dict:
+    ok = [r for r in results if r["status"] == 200]
+    stages: dict[str, list[float]] = {}
+    for result in ok:
+        for stage, ms in result["stages"].items():
+            stages.setdefault(stage, []).append(ms)
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "seconds": seconds,
+        "requests_per_second": len(ok) / seconds if seconds else 0.0,
+        "latency_ms": percentiles([r["latency_ms"] for r in ok]),
+        # Stages skipped by a request (e.g. cached embeddings) are absent from its header, so counts differ
+        "stages_ms": {stage: {"count": len(values), **percentiles(values)} for stage, values in sorted(stages.items())},
+    }
+
+
+async def run(args: argparse.Namespace, clients: LocalClients) -> dict:
+    profile = get_profile(args.profile)
+    corpus = Corpus(seed=args.seed)
+    documents = corpus.documents(args.documents, words=args.words)
+    distinct = args.distinct_questions or args.requests
+    pool = corpus.questions(documents, distinct, seed=1)
+    questions = [pool[i % distinct] for i in range(args.requests)]
+    warmup = corpus.questions(documents, args.warmup, seed=2)
+
+    started = time.perf_counter()
+    await seed_collection(clients, args.collection, profile, documents)
+    seed_seconds = time.perf_counter() - started
+
+    # The same objects the API lifespan builds, wired to the local stand-ins
+    agent = RAG(
+        openai_api_key="benchmark",
+        collection_name=args.collection,
+        profile=profile,
+        clients=clients,
+        search_batch_size=args.search_batch_size,
+    )
+    chat = Chat(
+        model=args.model,
+        key="benchmark",
+        rag_agent=agent,
+        clients=clients,
+        embedding_batch_size=args.embedding_batch_size,
+        answer_cache_threshold=None if args.no_answer_cache else 0.95,
+    )
+    api.app.state.agent, api.app.state.chat = agent, chat
+    api.app.state.conversations = MemoryConversationStore()
+
+    transport = httpx.ASGITransport(app=api.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            if warmup:
+                await drive(client, warmup, args.concurrency)
+            results, seconds = await drive(client, questions, args.concurrency)
+    finally:
+        await clients.aclose()
+
+    return {
+        **summarize(results, seconds),
+        "seed_seconds": seed_seconds,
+        "cache": chat.cache_stats(),
+        "batching": chat.batching_stats(),
+    }
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark /api/chat against local stand-ins for OpenAI and Qdrant.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once.")
+    parser.add_argument("--warmup", type=int, default=16, help="Unmeasured requests sent first.")
+    parser.add_argument("--distinct-questions", type=int, default=None, help="Distinct questions to cycle through. Defaults to one per request.")
+    parser.add_argument("--documents", type=int, default=2000, help="Synthetic documents (one point each).")
+    parser.add_argument("--words", type=int, default=200, help="Words per document.")
+    parser.add_argument("--profile", default="default", help="Collection profile (see backend/database/Profiles.py).")
+    parser.add_argument("--collection", default="benchmark", help="Collection name.")
+    parser.add_argument("--qdrant-url", default=None, help="Local Qdrant server to use instead of the in-memory client.")
+    parser.add_argument("--model", default="gpt-5.1", help="Chat model name passed to the fake API.")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per fake embeddings request.")
+    parser.add_argument("--response-latency", type=float, default=0.8, help="Seconds per fake responses request.")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative latency jitter of the fake API.")
+    parser.add_argument("--embedding-batch-size", type=int, default=32, help="Chat embedding_batch_size.")
+    parser.add_argument("--search-batch-size", type=int, default=32, help="RAG search_batch_size.")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Disable the semantic answer cache.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus and questions.")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = parse_args(argv)
+    # Per-request INFO lines would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    fake = dict(embedding_latency=args.embedding_latency, response_latency=args.response_latency, jitter=args.jitter, seed=args.seed)
+    with FakeOpenAIServer(**fake) as server:
+        clients = LocalClients(openai_base_url=server.base_url, qdrant_url=args.qdrant_url)
+        results = asyncio.run(run(args, clients))
+        calls = server.calls
+
+    report = {
+        "benchmark": "query",
+        "environment": environment(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        **results,
+        "upstream_calls": calls,
+    }
+    write_report(report, args.output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
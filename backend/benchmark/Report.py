@@ -0,0 +1,51 @@
+from pathlib import Path
+from typing import Optional
+import json
+import math
+import platform
+import subprocess
+import sys
+import numpy as np
+
+
+def percentiles(values: list[float], points: tuple[int, ...] = (50, 95, 99)) -> dict[str, float]:
+    """`p<N>` values plus mean and max of `values`, rounded to 2 decimals; empty input gives {}."""
+    if not values:
+        return {}
+    array = np.asarray(values, dtype=np.float64)
+    stats = {f"p{point}": round(float(np.percentile(array, point)), 2) for point in points}
+    stats["mean"] = round(float(array.mean()), 2)
+    stats["max"] = round(float(array.max()), 2)
+    return stats
+
+
+def round_floats(value, digits: int = 2):
+    """Round every float in a nested stats structure so reports diff cleanly."""
+    if isinstance(value, float):
+        return round(value, digits) if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {str(key): round_floats(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [round_floats(item, digits) for item in value]
+    return value
+
+
+def environment() -> dict:
+    """Commit and interpreter the numbers were measured with."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform()}
+
+
+def write_report(report: dict, output: Optional[str] = None) -> None:
+    """Write `report` as indented JSON to `output`, or to stdout."""
+    text = json.dumps(round_floats(report), indent=2)
+    if output:
+        Path(output).write_text(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
@@ -0,0 +1,211 @@
+from typing import Optional
+import asyncio
+import logging
+import random
+import threading
+import time
+import uuid
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from ..Clients import ClientRegistry
+from ..Tokens import load_encoding
+from ..database.Sparse import BM25Encoder
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+_encoder = BM25Encoder()
+
+
+def _input_text(item: str | list[int], model: str) -> str:
+    """Embedding inputs may be token ids (LangChain sends those); decode them so they embed like the text."""
+    if isinstance(item, str):
+        return item
+    encoding = load_encoding(model)
+    if encoding is None:
+        raise HTTPException(status_code=400, detail="Token id inputs cannot be decoded without the tokenizer files; send text instead.")
+    return encoding.decode(item)
+
+
+def hash_embedding(text: str, dimensions: int = 1536) -> list[float]:
+    """Deterministic unit-length embedding of `text` by feature hashing its terms.
+
+    Texts that share terms get a high cosine similarity, so retrieval over a synthetic corpus behaves
+    like retrieval with real embeddings: a question built from a chunk's words finds that chunk.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for term in _encoder.tokenize(text):
+        index = _encoder.term_index(term)
+        vector[index % dimensions] += 1.0 if index >> 31 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).tolist()
+
+
+def create_fake_openai_app(
+    embedding_latency: float = 0.05,
+    embedding_item_latency: float = 0.0005,
+    response_latency: float = 0.8,
+    response_tokens_per_second: float = 0.0,
+    jitter: float = 0.2,
+    seed: int = 0,
+) -> FastAPI:
+    """OpenAI stand-in serving `POST /v1/embeddings` and non-streaming `POST /v1/responses`.
+
+    Embeddings are `hash_embedding` of each input. Responses echo a fixed answer. Each call sleeps
+    for its configured latency, scaled by a random factor in `[1 - jitter, 1 + jitter]`.
+
+    Args:
+        embedding_latency (float): Seconds per embeddings request. Defaults to 0.05.
+        embedding_item_latency (float): Extra seconds per input text. Defaults to 0.0005.
+        response_latency (float): Seconds per responses request. Defaults to 0.8.
+        response_tokens_per_second (float): If set, responses also take input tokens / this rate. Defaults to 0 (off).
+        jitter (float): Relative latency jitter. Defaults to 0.2.
+        seed (int): Seed of the jitter. Defaults to 0.
+    """
+    app = FastAPI(title="Fake OpenAI API")
+    rng = random.Random(seed)
+    app.state.calls = {"embeddings": 0, "embedded_texts": 0, "responses": 0}
+
+    def delay(seconds: float) -> float:
+        return max(0.0, seconds * (1 + rng.uniform(-jitter, jitter)))
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> dict:
+        body = await request.json()
+        raw = body["input"]
+        # A single string, a list of strings, a list of token ids, or a list of token id lists
+        if isinstance(raw, str) or (raw and isinstance(raw[0], int)):
+            raw = [raw]
+        inputs = [_input_text(item, body["model"]) for item in raw]
+        dimensions = body.get("dimensions") or 1536
+        app.state.calls["embeddings"] += 1
+        app.state.calls["embedded_texts"] += len(inputs)
+        await asyncio.sleep(delay(embedding_latency + embedding_item_latency * len(inputs)))
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {"object": "embedding", "index": index, "embedding": hash_embedding(text, dimensions)}
+                for index, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/responses")
+    async def responses(request: Request) -> dict:
+        body = await request.json()
+        if body.get("stream"):
+            raise HTTPException(status_code=400, detail="Streaming is not supported by the fake OpenAI API.")
+        messages = body["input"] if isinstance(body["input"], list) else [{"role": "user", "content": body["input"]}]
+        input_tokens = sum(len(str(m.get("content", ""))) // 4 + 1 for m in messages)
+        app.state.calls["responses"] += 1
+        seconds = response_latency + (input_tokens / response_tokens_per_second if response_tokens_per_second else 0.0)
+        await asyncio.sleep(delay(seconds))
+        text = f"Synthetic answer based on {input_tokens} input tokens."
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": body["model"],
+            "output": [{
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "parallel_tool_calls": False,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": len(text) // 4 + 1,
+                "total_tokens": input_tokens + len(text) // 4 + 1,
+            },
+        }
+
+    return app
+
+
+class FakeOpenAIServer:
+    """Runs `create_fake_openai_app` with uvicorn on a free local port in a background thread.
+
+    Use as a context manager; `base_url` is what `ClientRegistry(openai_base_url=...)` expects.
+    Keyword arguments are passed to `create_fake_openai_app`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", **options):
+        self.host = host
+        self.app = create_fake_openai_app(**options)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=0, log_level="warning", access_log=False))
+        self.thread: Optional[threading.Thread] = None
+        self.port: Optional[int] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def calls(self) -> dict:
+        return dict(self.app.state.calls)
+
+    def start(self, timeout: float = 10.0) -> "FakeOpenAIServer":
+        self.thread = threading.Thread(target=self.server.run, name="fake-openai", daemon=True)
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Fake OpenAI server did not start.")
+            time.sleep(0.01)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+        logging.info(f"Fake OpenAI API listening on {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        if self.thread is not None:
+            self.thread.join(timeout=10.0)
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class LocalClients(ClientRegistry):
+    """`ClientRegistry` for benchmarks: OpenAI at `openai_base_url`, Qdrant in process memory.
+
+    Without a `qdrant_url`, `qdrant()` and `async_qdrant()` return in-memory clients. The two do not
+    share data, so whatever the async path searches must be written to both (see `each_qdrant`).
+    With a `qdrant_url` (e.g. a local Qdrant container) both talk to that server as usual.
+    """
+
+    def __init__(self, openai_base_url: str, qdrant_url: Optional[str] = None, **options):
+        options.setdefault("openai_api_key", "benchmark")
+        super().__init__(openai_base_url=openai_base_url, qdrant_url=qdrant_url, **options)
+
+    def qdrant(self, url: Optional[str] = None) -> QdrantClient:
+        if self.qdrant_url is None:
+            return self._get(("qdrant", ":memory:"), lambda: QdrantClient(location=":memory:"))
+        return super().qdrant(url)
+
+    def async_qdrant(self, url: Optional[str] = None) -> AsyncQdrantClient:
+        if self.qdrant_url is None:
+            return self._get(("async_qdrant", ":memory:"), lambda: AsyncQdrantClient(location=":memory:"))
+        return super().async_qdrant(url)
+
+    def each_qdrant(self) -> list[QdrantClient | AsyncQdrantClient]:
+        """Clients that hold separate copies of the data: both in-memory clients, or one server client."""
+        if self.qdrant_url is None:
+            return [self.qdrant(), self.async_qdrant()]
+        return [self.qdrant()]
+
@@ -0,0 +1 @@
+# Offline benchmarks: local stand-ins for OpenAI and Qdrant, synthetic corpora and load drivers.
@@ -1,13 +1,25 @@
-from openai import OpenAI
-from qdrant_client import QdrantClient
-from qdrant_client.models import ScoredPoint
-from .Ingestion import IngestionPipeline
+from array import array
+from typing import TYPE_CHECKING
+from qdrant_client import models
+from qdrant_client.models import ScoredPoint, CollectionInfo
+from .Cache import LRUCache
+from .LocalIndex import LocalVectorIndex
+from .Profiles import CollectionProfile, get_profile
+from .Sparse import BM25Encoder
+from ..Clients import ClientRegistry, get_clients
+from ..Coalescer import RequestCoalescer
 from config import (
-    QDRANT_URL,
-    QDRANT_API_KEY,
-    QDRANT_COLLECTION_NAME
+    QDRANT_COLLECTION_NAME,
+    QDRANT_COLLECTION_PROFILE,
+    MANIFEST_DIR
     )
+import hashlib
 import logging
+import time
+
+# Ingestion pulls in LangChain loaders and the Azure SDKs; it is imported only when a pipeline is built
+if TYPE_CHECKING:
+    from .Ingestion import IngestionPipeline
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,20 +33,91 @@ class RAG:
     Args:
         collection_name (str): The name of the Qdrant collection to use. Default is taken from config.
         directory (str): The directory from which to load documents. Default is "Finance" for testing purposes.
+        cache_size (int): Maximum number of cached retrieval results. Defaults to 1024.
+        cache_ttl (float): Seconds a cached retrieval result stays valid. Defaults to 300.
+        version_check_interval (float): Seconds between collection version checks against Qdrant. Defaults to 10.
+        local_index (bool): Mirror the collection in process memory and search it with NumPy instead of Qdrant. Defaults to False.
+        local_index_dtype (str): "float32" or "float16" storage for the local mirror. Defaults to "float32".
+        local_index_max_bytes (int): Collections whose vectors exceed this size are not mirrored. Defaults to 1 GiB.
+        profile (str | CollectionProfile): Collection profile that defines the embedding length and search strategy. Default is taken from config.
+        hybrid (bool): Fuse dense and BM25 sparse results with reciprocal rank fusion when the query text is given and the collection has sparse vectors. Defaults to True.
+        lexical_max_terms (int): Longest query, in terms, that `lexical_search` tries to answer without embeddings. 0 disables the lexical fast path. Defaults to 4.
+        lexical_margin (float): How much the best sparse score must exceed the runner-up for a lexical answer. Defaults to 1.5.
+        clients (ClientRegistry | None): Source of the shared OpenAI and Qdrant clients. Defaults to the process-wide registry.
+        search_batch_size (int): Concurrent async searches sent as one `query_batch_points` call. 1 disables batching. Defaults to 32.
+        search_batch_delay (float): Seconds a search may wait for others to batch with. Defaults to 0.005.
     """
 
-    def __init__(self, openai_api_key: str, collection_name: str = QDRANT_COLLECTION_NAME,directory: str = "Finance",):
+    score_threshold = 0.4
+    # Extensions tried when matching a query against document titles (file names)
+    title_extensions = ("pdf", "txt", "csv", "md", "markdown")
+    # Most titles kept in memory to tell title queries apart without asking Qdrant
+    title_facet_limit = 10_000
+
+    def __init__(
+        self,
+        openai_api_key: str,
+        collection_name: str = QDRANT_COLLECTION_NAME,
+        directory: str = "Finance",
+        cache_size: int = 1024,
+        cache_ttl: float = 300.0,
+        version_check_interval: float = 10.0,
+        local_index: bool = False,
+        local_index_dtype: str = "float32",
+        local_index_max_bytes: int = 1 << 30,
+        profile: str | CollectionProfile = QDRANT_COLLECTION_PROFILE,
+        hybrid: bool = True,
+        lexical_max_terms: int = 4,
+        lexical_margin: float = 1.5,
+        clients: ClientRegistry | None = None,
+        search_batch_size: int = 32,
+        search_batch_delay: float = 0.005,
+        ):
         
         self.collection_name = collection_name
         self.directory = directory
-        self.openai_client = OpenAI(api_key=openai_api_key)
-        self.qdrant_client = QdrantClient(
-            url=QDRANT_URL,
-            api_key=QDRANT_API_KEY
+        self.profile = get_profile(profile)
+        self.clients = clients or get_clients()
+        self.openai_client = self.clients.openai(openai_api_key)
+        self.qdrant_client = self.clients.qdrant()
+        self.async_qdrant_client = self.clients.async_qdrant()
+
+        # Retrieval cache: (embedding, hybrid query text, top_k, score_threshold, collection version) -> scored points
+        self.retrieval_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.version_check_interval = version_check_interval
+        self._version: tuple | None = None
+        self._version_checked_at = 0.0
+
+        # Sparse (BM25) search; only used once the collection is known to have sparse vectors
+        self.sparse_encoder = BM25Encoder()
+        self.sparse_available = False
+        self.hybrid = hybrid
+        self.lexical_max_terms = lexical_max_terms
+        self.lexical_margin = lexical_margin
+        # (collection version, titles) as listed by `known_titles`
+        self._titles: tuple[tuple, frozenset[str] | None] | None = None
+
+        # Concurrent async searches are coalesced into one batched Qdrant request
+        self.search_coalescer = RequestCoalescer(
+            handler=self._aquery_batch,
+            max_batch_size=search_batch_size,
+            max_delay=search_batch_delay,
+            name="Search batch",
         )
+
+        # Optional in-process mirror; Qdrant serves queries until it is loaded
+        self.local_index = None
+        if local_index:
+            self.local_index = LocalVectorIndex(
+                qdrant_client=self.qdrant_client,
+                collection_name=self.collection_name,
+                dtype=local_index_dtype,
+                max_bytes=local_index_max_bytes,
+                vector_name=self.profile.vector_name,
+            )
     
     # Class methods
-    def InitiatePipeline(self, qdrant_url: str):
+    def InitiatePipeline(self, qdrant_url: str, incremental: bool = False):
         """Initialize the ingestion pipeline.
         
         If the collection doesn't exist, it will:
@@ -43,69 +126,399 @@ class RAG:
         3. Embed and store documents
         
         If the collection exists, the process is skipped to avoid duplication.
+        With `incremental=True` the directory is synced against the collection's manifest instead:
+        only new or changed blobs are re-embedded and points of removed blobs are deleted.
         """
+        if incremental:
+            result = self._pipeline(qdrant_url).sync_from_azure(
+                manifest_path=MANIFEST_DIR / f"{self.collection_name}.json",
+                directory=self.directory
+            )
+            self.retrieval_cache.clear()
+            return result
+        
         # Check if collection exists - if it does, skip to avoid duplication
         if self.qdrant_client.collection_exists(collection_name=self.collection_name):
             return logging.info(f"Collection '{self.collection_name}' already exists. Skipping ingestion pipeline.")
         
         # Collection doesn't exist - run the full pipeline
-        pipeline = IngestionPipeline(
-            qdrant_url=qdrant_url,
-            collection_name=self.collection_name,
-            embedding_model="text-embedding-3-small",
-            chunk_size=1000,
-            chunk_overlap=200
-        )
+        pipeline = self._pipeline(qdrant_url)
 
         blob_names = pipeline.list_all_blob_names(directory=self.directory)
-        documents = pipeline.load_documents_from_azure(
-            blob_names=blob_names,
-            directory=self.directory
-        )
-        
-        chunks = pipeline.chunk_documents(documents)
-        
-        pipeline.embed_and_store(chunks)
+        # Streams blobs through download, parse, chunk, embed and upsert instead of loading them all first
+        pipeline.ingest_from_azure(blob_names=blob_names, directory=self.directory)
+        self.retrieval_cache.clear()
         logging.info(f"Ingestion pipeline completed and data stored in collection '{self.collection_name}'.")
         logging.info(f"Size of collection = {self.qdrant_client.get_collection(collection_name=self.collection_name).points_count} points.")
         
     
-    def similarity_search(self, query_embedding:list[float], top_k:int=6) -> list[ScoredPoint]:
+    def similarity_search(self, query_embedding:list[float], top_k:int=6, query_text:str|None=None) -> list[ScoredPoint]:
         """Retrieve similar documents from the Qdrant collection.
 
         Args:
             query_embedding (list[float]): The embedding vector for the query.
             top_k (int, optional): The number of top similar documents to retrieve. Defaults to 6.
+            query_text (str, optional): The query itself. If given, dense and BM25 results are fused (see `hybrid`).
 
         Raises:
-            ValueError: If the query_embedding is not of length 1536.
+            ValueError: If the query_embedding does not match the profile's dimensions (1536 by default).
             ValueError: If top_k is not positive.
             Exception: If there is an error retrieving documents from Qdrant.
 
         Returns:
             list[ScoredPoint]: A list of scored points representing the similar documents.
         """
+        self._validate_search(query_embedding=query_embedding, top_k=top_k)
         
-        
-        if len(query_embedding) != 1536:
-            raise ValueError(f"Query embedding must be of length 1536, got {len(query_embedding)}.")
-        if top_k <= 0:
-            raise ValueError(f"top_k must be positive, got {top_k}.")
-        elif top_k > 100:
-            raise ValueError(f"top_k must not exceed 100, got {top_k}.")
-        
         try:
-            response = self.qdrant_client.query_points(
+            version = self.collection_version()
+            hybrid_text = self._hybrid_text(query_text)
+            cache_key = self._cache_key(query_embedding, top_k, version, hybrid_text)
+            cached = self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            # The local mirror only holds dense vectors; hybrid queries go to Qdrant
+            points = self._local_search(query_embedding, top_k, version) if hybrid_text is None else None
+            if points is None:
+                points = self.qdrant_client.query_points(
+                    collection_name=self.collection_name,
+                    **self._query_kwargs(query_embedding, top_k, hybrid_text),
+                    with_payload=True,
+                    with_vectors=False
+                ).points
+            self._log_points(points)
+            self.retrieval_cache.set(cache_key, points)
+            return points
+            
+        except Exception as e:
+            raise Exception(f"Error retrieving similar documents: {e}") from e
+
+    async def asimilarity_search(self, query_embedding:list[float], top_k:int=6, query_text:str|None=None) -> list[ScoredPoint]:
+        """Async version of `similarity_search` using the `AsyncQdrantClient`.
+
+        Args:
+            query_embedding (list[float]): The embedding vector for the query.
+            top_k (int, optional): The number of top similar documents to retrieve. Defaults to 6.
+            query_text (str, optional): The query itself, for hybrid search.
+
+        Returns:
+            list[ScoredPoint]: A list of scored points representing the similar documents.
+        """
+        self._validate_search(query_embedding=query_embedding, top_k=top_k)
+
+        try:
+            version = await self.acollection_version()
+            hybrid_text = self._hybrid_text(query_text)
+            cache_key = self._cache_key(query_embedding, top_k, version, hybrid_text)
+            cached = self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            points = self._local_search(query_embedding, top_k, version) if hybrid_text is None else None
+            if points is None:
+                points = await self.search_coalescer.submit(self._query_request(query_embedding, top_k, hybrid_text))
+            self._log_points(points)
+            self.retrieval_cache.set(cache_key, points)
+            return points
+
+        except Exception as e:
+            raise Exception(f"Error retrieving similar documents: {e}") from e
+
+    def lexical_search(self, query:str, top_k:int=6) -> list[ScoredPoint] | None:
+        """Answer short keyword queries without an embedding, or return None if there is no confident lexical match.
+
+        A query that names a document (its title, with or without the file extension) returns that
+        document's chunks. Titles are checked against `known_titles`, so other queries cost no title
+        lookup in Qdrant. Otherwise the BM25 sparse vectors are searched, and the result is used only if
+        the best chunk contains every query term and clearly outscores the runner-up.
+
+        Scores are BM25 scores, not cosine similarities, so `score_threshold` does not apply. Chunks of
+        a named document are ranked by their BM25 score for the query; if none contains a query term
+        they are returned with score 0.0 rather than a made-up similarity.
+
+        Args:
+            query (str): The user query.
+            top_k (int, optional): The number of documents to return. Defaults to 6.
+
+        Returns:
+            list[ScoredPoint] | None: The matching documents, or None to fall back to `similarity_search`.
+        """
+        terms = self._lexical_terms(query)
+        if terms is None:
+            return None
+        try:
+            cache_key = ("lexical", query.strip(), top_k, self.collection_version())
+            cached = self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                return cached or None
+
+            names = self._named_titles(query, self.known_titles())
+            points = self._title_search(names, query, top_k) if names else []
+            if not points and self.sparse_available:
+                points = self.qdrant_client.query_points(
+                    collection_name=self.collection_name,
+                    query=self.sparse_encoder.encode_query(query),
+                    using=self.profile.SPARSE_VECTOR,
+                    limit=max(top_k, 2),
+                    with_payload=True,
+                    with_vectors=False
+                ).points
+                points = points[:top_k] if self._is_confident(points, terms) else []
+            return self._store_lexical(cache_key, query, points)
+
+        except Exception as e:
+            logging.warning(f"Lexical search failed, falling back to similarity search: {e}")
+            return None
+
+    async def alexical_search(self, query:str, top_k:int=6) -> list[ScoredPoint] | None:
+        """Async version of `lexical_search`."""
+        terms = self._lexical_terms(query)
+        if terms is None:
+            return None
+        try:
+            cache_key = ("lexical", query.strip(), top_k, await self.acollection_version())
+            cached = self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                return cached or None
+
+            names = self._named_titles(query, await self.aknown_titles())
+            points = await self._atitle_search(names, query, top_k) if names else []
+            if not points and self.sparse_available:
+                response = await self.async_qdrant_client.query_points(
+                    collection_name=self.collection_name,
+                    query=self.sparse_encoder.encode_query(query),
+                    using=self.profile.SPARSE_VECTOR,
+                    limit=max(top_k, 2),
+                    with_payload=True,
+                    with_vectors=False
+                )
+                points = response.points[:top_k] if self._is_confident(response.points, terms) else []
+            return self._store_lexical(cache_key, query, points)
+
+        except Exception as e:
+            logging.warning(f"Lexical search failed, falling back to similarity search: {e}")
+            return None
+
+    def collection_version(self) -> tuple:
+        """Return the collection's `(points_count, ingestion_version)`, re-checked at most every `version_check_interval` seconds.
+
+        Cached retrieval results are dropped whenever the version changes.
+        """
+        if self._version_is_stale():
+            self._update_version(self.qdrant_client.get_collection(collection_name=self.collection_name))
+        return self._version
+
+    async def acollection_version(self) -> tuple:
+        """Async version of `collection_version`."""
+        if self._version_is_stale():
+            self._update_version(await self.async_qdrant_client.get_collection(collection_name=self.collection_name))
+        return self._version
+
+    def known_titles(self) -> frozenset[str] | None:
+        """Document titles in the collection, listed from the "title" payload index once per collection version.
+
+        None if they cannot be listed or there are more than `title_facet_limit`; titles are then looked up per query.
+        """
+        version = self.collection_version()
+        if self._titles is None or self._titles[0] != version:
+            try:
+                response = self.qdrant_client.facet(collection_name=self.collection_name, key="title", limit=self.title_facet_limit)
+                self._titles = (version, self._facet_titles(response))
+            except Exception as e:
+                logging.warning(f"Could not list document titles, looking them up per query: {e}")
+                self._titles = (version, None)
+        return self._titles[1]
+
+    async def aknown_titles(self) -> frozenset[str] | None:
+        """Async version of `known_titles`."""
+        version = await self.acollection_version()
+        if self._titles is None or self._titles[0] != version:
+            try:
+                response = await self.async_qdrant_client.facet(collection_name=self.collection_name, key="title", limit=self.title_facet_limit)
+                self._titles = (version, self._facet_titles(response))
+            except Exception as e:
+                logging.warning(f"Could not list document titles, looking them up per query: {e}")
+                self._titles = (version, None)
+        return self._titles[1]
+
+    def load_local_index(self) -> bool:
+        """Load the local mirror synchronously, e.g. at startup. Returns False if it is disabled or not loaded."""
+        if self.local_index is None:
+            return False
+        return self.local_index.load(version=self.collection_version())
+
+    def cache_stats(self) -> dict:
+        return self.retrieval_cache.stats()
+
+    def batching_stats(self) -> dict:
+        return self.search_coalescer.stats()
+
+    # Helper methods
+    def _pipeline(self, qdrant_url: str) -> "IngestionPipeline":
+        from .Ingestion import IngestionPipeline
+
+        return IngestionPipeline(
+            qdrant_url=qdrant_url,
+            collection_name=self.collection_name,
+            embedding_model="text-embedding-3-small",
+            chunk_size=1000,
+            chunk_overlap=200,
+            profile=self.profile,
+            clients=self.clients
+        )
+
+    def _local_search(self, query_embedding:list[float], top_k:int, version:tuple) -> list[ScoredPoint] | None:
+        """Search the local mirror, or return None (and schedule a refresh) if it is missing or stale."""
+        if self.local_index is None:
+            return None
+        if not self.local_index.is_fresh(version):
+            self.local_index.refresh_in_background(version=version)
+            return None
+        return self.local_index.search(query_embedding, top_k=top_k, score_threshold=self.score_threshold)
+
+    def _hybrid_text(self, query_text:str|None) -> str | None:
+        """The query text to fuse with, or None when the search is dense-only."""
+        if not (self.hybrid and self.sparse_available and query_text):
+            return None
+        return query_text.strip() if self.sparse_encoder.tokenize(query_text) else None
+
+    def _query_kwargs(self, query_embedding:list[float], top_k:int, hybrid_text:str|None) -> dict:
+        if hybrid_text is None:
+            return {**self.profile.query_kwargs(query_embedding, top_k), "score_threshold": self.score_threshold}
+        return self.profile.hybrid_query_kwargs(
+            query_embedding,
+            self.sparse_encoder.encode_query(hybrid_text),
+            top_k,
+            score_threshold=self.score_threshold
+        )
+
+    def _query_request(self, query_embedding:list[float], top_k:int, hybrid_text:str|None) -> models.QueryRequest:
+        kwargs = self._query_kwargs(query_embedding, top_k, hybrid_text)
+        # query_points calls them search_params; batch requests call them params
+        kwargs["params"] = kwargs.pop("search_params", None)
+        return models.QueryRequest(**kwargs, with_payload=True, with_vector=False)
+
+    async def _aquery_batch(self, requests:list[models.QueryRequest]) -> list[list[ScoredPoint]]:
+        responses = await self.async_qdrant_client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=requests
+        )
+        return [response.points for response in responses]
+
+    def _lexical_terms(self, query:str) -> list[str] | None:
+        terms = self.sparse_encoder.tokenize(query)
+        if not terms or len(terms) > self.lexical_max_terms:
+            return None
+        return terms
+
+    def _named_titles(self, query:str, titles:frozenset[str] | None) -> list[str]:
+        """Titles `query` may name; only those in `titles` unless the titles are unknown (None)."""
+        title = query.strip()
+        names = [title] + [f"{title}.{ext}" for ext in self.title_extensions if not title.lower().endswith(f".{ext}")]
+        return names if titles is None else [name for name in names if name in titles]
+
+    def _title_filter(self, names:list[str]) -> models.Filter:
+        return models.Filter(must=[models.FieldCondition(key="title", match=models.MatchAny(any=names))])
+
+    def _title_search(self, names:list[str], query:str, top_k:int) -> list[ScoredPoint]:
+        """Chunks of the documents titled `names`, best BM25 match for `query` first."""
+        if self.sparse_available:
+            points = self.qdrant_client.query_points(
+                collection_name=self.collection_name,
+                query=self.sparse_encoder.encode_query(query),
+                using=self.profile.SPARSE_VECTOR,
+                query_filter=self._title_filter(names),
+                limit=top_k,
+                with_payload=True,
+                with_vectors=False
+            ).points
+            if points:
+                return points
+        records, _ = self.qdrant_client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=self._title_filter(names),
+            limit=top_k,
+            with_payload=True,
+            with_vectors=False
+        )
+        return self._title_points(records)
+
+    async def _atitle_search(self, names:list[str], query:str, top_k:int) -> list[ScoredPoint]:
+        if self.sparse_available:
+            response = await self.async_qdrant_client.query_points(
                 collection_name=self.collection_name,
-                query=query_embedding,
+                query=self.sparse_encoder.encode_query(query),
+                using=self.profile.SPARSE_VECTOR,
+                query_filter=self._title_filter(names),
                 limit=top_k,
                 with_payload=True,
-                with_vectors=False,
-                score_threshold=0.4
+                with_vectors=False
             )
-            for point in response.points:
-                logging.info(f"Retrieved point ID: {point.id} with score: {point.score}")
-            return response.points
-            
-        except Exception as e:
-            raise Exception(f"Error retrieving similar documents: {e}") from e
\ No newline at end of file
+            if response.points:
+                return response.points
+        records, _ = await self.async_qdrant_client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=self._title_filter(names),
+            limit=top_k,
+            with_payload=True,
+            with_vectors=False
+        )
+        return self._title_points(records)
+
+    def _title_points(self, records:list[models.Record]) -> list[ScoredPoint]:
+        # Matched on the title alone: there is no relevance to report, so claim none
+        return [ScoredPoint(id=r.id, version=0, score=0.0, payload=r.payload) for r in records]
+
+    def _facet_titles(self, response:models.FacetResponse) -> frozenset[str] | None:
+        if len(response.hits) >= self.title_facet_limit:
+            return None
+        return frozenset(str(hit.value) for hit in response.hits)
+
+    def _is_confident(self, points:list[ScoredPoint], terms:list[str]) -> bool:
+        if not points:
+            return False
+        if not set(terms) <= set(self.sparse_encoder.tokenize(points[0].payload.get("text", ""))):
+            return False
+        return len(points) == 1 or points[0].score >= self.lexical_margin * points[1].score
+
+    def _store_lexical(self, cache_key:tuple, query:str, points:list[ScoredPoint]) -> list[ScoredPoint] | None:
+        # Misses are cached as False so repeated non-lexical queries skip the round trips
+        self.retrieval_cache.set(cache_key, points or False)
+        if not points:
+            return None
+        logging.info(f"Lexical fast path answered query of length {len(query)} with {len(points)} documents.")
+        self._log_points(points)
+        return points
+
+    def _version_is_stale(self) -> bool:
+        return self._version is None or time.monotonic() - self._version_checked_at > self.version_check_interval
+
+    def _update_version(self, info: CollectionInfo) -> None:
+        metadata = getattr(info.config, "metadata", None) or {}
+        version = (info.points_count, metadata.get("ingestion_version"))
+        self.sparse_available = self.profile.SPARSE_VECTOR in (info.config.params.sparse_vectors or {})
+        if self._version is not None and version != self._version:
+            logging.info(f"Collection '{self.collection_name}' changed from {self._version} to {version}. Clearing retrieval cache.")
+            self.retrieval_cache.clear()
+        self._version = version
+        self._version_checked_at = time.monotonic()
+
+    def _cache_key(self, query_embedding:list[float], top_k:int, version:tuple, query_text:str|None=None) -> tuple:
+        digest = hashlib.blake2b(array("d", query_embedding).tobytes(), digest_size=16).hexdigest()
+        return (digest, query_text, top_k, self.score_threshold, version)
+
+    def _validate_search(self, query_embedding:list[float], top_k:int) -> None:
+        if len(query_embedding) != self.profile.dimensions:
+            raise ValueError(f"Query embedding must be of length {self.profile.dimensions}, got {len(query_embedding)}.")
+        if top_k <= 0:
+            raise ValueError(f"top_k must be positive, got {top_k}.")
+        elif top_k > 100:
+            raise ValueError(f"top_k must not exceed 100, got {top_k}.")
+
+    def _log_points(self, points:list[ScoredPoint]) -> None:
+        # Per-point detail is debug output; skip formatting it on the hot path otherwise
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return
+        for point in points:
+            logging.debug(f"Retrieved point ID: {point.id} with score: {point.score}")
@@ -0,0 +1,102 @@
+from typing import Iterator, List
+import logging
+from langchain_core.documents import Document
+from ..Tokens import Tokenizer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+
+class TokenBatcher:
+    """Packs chunks into embedding requests by token count instead of a fixed number of chunks.
+
+    Tokens are counted with the embedding model's tokenizer. Batches are filled up to both a token
+    and an item budget, so requests are as full as the API allows without hitting its limits.
+
+    Args:
+        model (str): Embedding model whose tokenizer is used. Defaults to "text-embedding-3-small".
+        max_batch_tokens (int): Token budget per request. Defaults to 100,000.
+        max_batch_items (int): Maximum chunks per request. Defaults to 256.
+        max_item_tokens (int): Per-input token limit of the model. Defaults to 8191.
+    """
+
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        max_batch_tokens: int = 100_000,
+        max_batch_items: int = 256,
+        max_item_tokens: int = 8191,
+    ):
+        if max_item_tokens > max_batch_tokens:
+            raise ValueError(f"max_item_tokens ({max_item_tokens}) must not exceed max_batch_tokens ({max_batch_tokens}).")
+        self.tokenizer = Tokenizer(model, fallback="cl100k_base")
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_item_tokens = max_item_tokens
+
+    def count_tokens(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def split_oversized(self, documents: List[Document]) -> List[Document]:
+        """Split chunks longer than `max_item_tokens` into pieces that fit, logging a warning for each."""
+        fitted = []
+        for doc in documents:
+            tokens = self.count_tokens(doc.page_content)
+            if tokens <= self.max_item_tokens:
+                fitted.append(doc)
+                continue
+            logging.warning(
+                f"Chunk from '{doc.metadata.get('source', '')}' has {tokens} tokens "
+                f"(limit {self.max_item_tokens}); splitting it."
+            )
+            offset = doc.metadata.get("start_index")
+            for piece in self.tokenizer.split(doc.page_content, self.max_item_tokens):
+                metadata = doc.metadata.copy()
+                if offset is not None:
+                    # Keep the piece's position in the source text for context packing
+                    metadata["start_index"] = offset
+                    offset += len(piece)
+                fitted.append(Document(page_content=piece, metadata=metadata))
+        return fitted
+
+    def batches(
+        self,
+        documents: List[Document],
+        max_batch_tokens: int | None = None,
+        max_batch_items: int | None = None,
+    ) -> Iterator[tuple[List[Document], int]]:
+        """Yield `(batch, token_count)` pairs in document order.
+
+        A chunk that is still over `max_item_tokens` here is truncated with a warning; call
+        `split_oversized` beforehand to keep its full text.
+
+        Args:
+            documents (List[Document]): Chunks to pack.
+            max_batch_tokens (int | None): Override the token budget per request.
+            max_batch_items (int | None): Override the maximum chunks per request.
+        """
+        max_batch_tokens = max_batch_tokens or self.max_batch_tokens
+        max_batch_items = max_batch_items or self.max_batch_items
+        batch: List[Document] = []
+        batch_tokens = 0
+        for doc in documents:
+            tokens = self.count_tokens(doc.page_content)
+            if tokens > self.max_item_tokens:
+                logging.warning(
+                    f"Chunk from '{doc.metadata.get('source', '')}' has {tokens} tokens "
+                    f"(limit {self.max_item_tokens}); truncating it."
+                )
+                text = self.tokenizer.truncate(doc.page_content, self.max_item_tokens)
+                doc = Document(page_content=text, metadata=doc.metadata.copy())
+                tokens = self.max_item_tokens
+
+            if batch and (batch_tokens + tokens > max_batch_tokens or len(batch) >= max_batch_items):
+                yield batch, batch_tokens
+                batch, batch_tokens = [], 0
+            batch.append(doc)
+            batch_tokens += tokens
+
+        if batch:
+            yield batch, batch_tokens
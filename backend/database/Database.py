@@ -1,19 +1,18 @@
-from qdrant_client import QdrantClient, models
-from config import QDRANT_URL, QDRANT_API_KEY, QDRANT_COLLECTION_NAME
+from qdrant_client import models
+from config import QDRANT_URL, QDRANT_COLLECTION_NAME
 from .Ingestion import IngestionPipeline
+from ..Clients import get_clients
 from azure.identity import DefaultAzureCredential
 from langchain_core.documents.base import Document
 
-# Qdrant client instance
-qdrant_client = QdrantClient(
-    url=QDRANT_URL,
-    api_key=QDRANT_API_KEY
-)
+# Qdrant client instance (shared with the pipeline below)
+qdrant_client = get_clients().qdrant(QDRANT_URL)
 
 # Collection configuration
 EMBEDDING_DIM = 1536  # OpenAI text-embedding-3-small dimension
 
 pipeline = IngestionPipeline(
+    qdrant_url=QDRANT_URL,
     collection_name=QDRANT_COLLECTION_NAME,
     embedding_model="text-embedding-3-small",
     chunk_size=1000,
@@ -0,0 +1,196 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+
+class EmbeddingCache:
+    """Content-addressed, on-disk cache of document embeddings.
+
+    Entries are keyed by SHA-256 of (model, dimensions, chunk text). Vectors live in a memory-mapped
+    float32 file and a small SQLite index maps each key to its row, so a lookup touches only the rows
+    it needs instead of deserializing the whole cache. When `max_entries` is reached the least
+    recently used entries are evicted and their rows reused.
+
+    Several instances and processes may share a directory (e.g. the API and an ingestion worker). Rows
+    are reserved, written and read inside a `BEGIN IMMEDIATE` SQLite transaction, which is held across
+    processes, so two writers never get the same row and a reader never sees a row being overwritten.
+
+    Args:
+        directory (str | Path): Cache directory. Each model/dimensions pair gets its own subdirectory.
+        model (str): Embedding model name.
+        dimensions (int): Embedding length.
+        max_entries (int): Maximum number of cached vectors. Defaults to 250,000.
+    """
+
+    GROWTH_ROWS = 4096
+
+    def __init__(self, directory: str | Path, model: str, dimensions: int, max_entries: int = 250_000):
+        if max_entries <= 0:
+            raise ValueError(f"max_entries must be positive, got {max_entries}.")
+        self.model = model
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.path = Path(directory) / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', model)}-{dimensions}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.path / "vectors.f32"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # Transactions are managed explicitly (see `_transaction`)
+        self._db = sqlite3.connect(self.path / "index.sqlite3", check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._transaction():
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, slot INTEGER NOT NULL UNIQUE, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self._size = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            self.vectors_path.touch(exist_ok=True)
+            self._vectors = self._open_vectors()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{self.dimensions}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return the cached vector for each text, or None where it is not cached."""
+        keys = [self.key(text) for text in texts]
+        with self._lock, self._transaction():
+            self._sync_capacity()
+            slots = {}
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                slots.update(rows)
+            if slots:
+                now = time.time()
+                self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, k) for k in slots])
+
+            results = [self._vectors[slots[k]].tolist() if k in slots else None for k in keys]
+            found = sum(1 for r in results if r is not None)
+            self.hits += found
+            self.misses += len(results) - found
+            return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Store vectors for the given texts, evicting least recently used entries if the cache is full."""
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            if len(vector) != self.dimensions:
+                raise ValueError(f"Embedding must be of length {self.dimensions}, got {len(vector)}.")
+            entries[self.key(text)] = vector
+        if not entries:
+            return
+
+        with self._lock, self._transaction():
+            # Another process may have stored some of these or grown the vector file since we last looked
+            self._sync_capacity()
+            existing = set()
+            keys = list(entries)
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                existing.update(row[0] for row in self._db.execute(
+                    f"SELECT key FROM entries WHERE key IN ({','.join('?' * len(part))})", part
+                ))
+            new_keys = [k for k in keys if k not in existing][:self.max_entries]
+            slots = self._allocate(len(new_keys))
+
+            now = time.time()
+            for k, slot in zip(new_keys, slots):
+                self._vectors[slot] = entries[k]
+            self._vectors.flush()
+            self._db.executemany(
+                "INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                [(k, slot, now) for k, slot in zip(new_keys, slots)],
+            )
+            self._size = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors.flush()
+            self._db.close()
+
+    # Helper methods
+    @contextmanager
+    def _transaction(self):
+        """`BEGIN IMMEDIATE` ... `COMMIT`: takes the database write lock, which other processes wait for."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _allocate(self, count: int) -> List[int]:
+        """Return `count` free rows, growing the vector file or evicting LRU entries as needed.
+
+        Must run inside `_transaction`: the next free row is read from the shared index, not from
+        per-instance state, so it is only valid while the write lock is held.
+        """
+        next_slot = self._db.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0]
+        fresh = max(0, min(count, self.max_entries - next_slot))
+        slots = list(range(next_slot, next_slot + fresh))
+        if slots:
+            self._ensure_capacity(next_slot + fresh)
+
+        evict = count - fresh
+        if evict:
+            rows = self._db.execute("SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (evict,)).fetchall()
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(row[0],) for row in rows])
+            slots.extend(row[1] for row in rows)
+            self._size -= len(rows)
+            self.evictions += len(rows)
+        return slots
+
+    def _sync_capacity(self) -> None:
+        """Remap the vector file if another instance has grown it."""
+        if self.vectors_path.stat().st_size // (4 * self.dimensions) > self._capacity:
+            self._vectors.flush()
+            del self._vectors
+            self._vectors = self._open_vectors()
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        self._vectors.flush()
+        del self._vectors
+        self._capacity = min(self.max_entries, max(rows, 2 * self._capacity, self.GROWTH_ROWS))
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(self._capacity * self.dimensions * 4)
+        self._vectors = self._open_vectors()
+
+    def _open_vectors(self) -> np.memmap:
+        self._capacity = self.vectors_path.stat().st_size // (4 * self.dimensions)
+        if self._capacity == 0:
+            self._capacity = min(self.max_entries, self.GROWTH_ROWS)
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(self._capacity * self.dimensions * 4)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dimensions))
@@ -1,9 +1,17 @@
-from typing import List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from pathlib import Path
+import hashlib
 import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 import uuid
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, ContainerClient
 from azure.identity import DefaultAzureCredential
-from langchain_azure_storage.document_loaders import AzureBlobStorageLoader
 from langchain_community.document_loaders import (
     PyPDFLoader,
     TextLoader,
@@ -13,15 +21,25 @@ from langchain_community.document_loaders import (
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
-from qdrant_client import QdrantClient, models
+from qdrant_client import models
 from qdrant_client.models import PointStruct
+from .Manifest import IngestionManifest
+from .RateLimit import TokenBucket, retry_with_backoff
+from .Batching import TokenBatcher
+from .EmbeddingCache import EmbeddingCache
+from .Profiles import CollectionProfile, get_profile
+from .Sparse import BM25Encoder
+from .Streaming import bounded_map
+from ..Clients import ClientRegistry, get_clients
 from config import (
     ACCOUNT_URL,
     BLOB_CONTAINER,
-    QDRANT_API_KEY,
+    BLOB_CONNECTION_STRING,
     OPENAI_API_KEY,
     QDRANT_URL,
-    QDRANT_COLLECTION_NAME
+    QDRANT_COLLECTION_NAME,
+    QDRANT_COLLECTION_PROFILE,
+    EMBEDDING_CACHE_DIR
 )
 
 logging.basicConfig(
@@ -29,6 +47,79 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s %(message)s"
 )
 
+# Namespace for deterministic point ids, so re-ingesting a chunk overwrites its point instead of duplicating it
+POINT_ID_NAMESPACE = uuid.UUID("6f1c1f0e-5d1b-4c57-9a55-2f3b8e0c4a17")
+
+
+# File extension -> LangChain loader
+LOADER_MAP = {
+    "pdf": PyPDFLoader,
+    "txt": TextLoader,
+    "csv": CSVLoader,
+    "md": UnstructuredMarkdownLoader,
+    "markdown": UnstructuredMarkdownLoader,
+}
+
+
+def parse_blob(content: bytes, blob_path: str, source: str, file_type: Optional[str] = None) -> List[Document]:
+    """Parse downloaded blob content with the loader for its extension (plain UTF-8 text if there is none).
+
+    Every document gets the blob's URL as "source" and its full container path as "blob_path"; point
+    ids are derived from "blob_path", so every ingestion path stores a chunk under the same id.
+    """
+    loader_factory = LOADER_MAP.get((file_type or blob_path.rsplit(".", 1)[-1]).lower())
+    if loader_factory is None:
+        return [Document(page_content=content.decode("utf-8"), metadata={"source": source, "blob_path": blob_path})]
+    
+    # Loaders read from disk, so parse from a temporary file that keeps the blob's file name
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = os.path.join(temp_dir, os.path.basename(blob_path))
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        documents = loader_factory(temp_path).load()
+    for doc in documents:
+        doc.metadata["source"] = source
+        doc.metadata["blob_path"] = blob_path
+    return documents
+
+
+def parse_and_chunk(
+    content: bytes,
+    blob_path: str,
+    source: str,
+    file_type: Optional[str],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> tuple[List[Document], float, float]:
+    """Parse and chunk a single blob. Runs in a worker process; returns (chunks, parse seconds, chunk seconds)."""
+    started = time.perf_counter()
+    documents = parse_blob(content, blob_path, source, file_type)
+    parsed = time.perf_counter()
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        add_start_index=True,
+    )
+    chunks = text_splitter.split_documents(documents)
+    return chunks, parsed - started, time.perf_counter() - parsed
+
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(blob_path: str, text_hash: str) -> str:
+    """Deterministic point id for a chunk, derived from its blob path and content hash."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{blob_path}:{text_hash}"))
+
+
+def directory_prefix(directory: str) -> str:
+    """Blob name prefix of everything inside `directory`: "Finance" matches "Finance/..." but not "Finance2/..."."""
+    directory = directory.rstrip("/")
+    return f"{directory}/" if directory else ""
+
 
 class IngestionPipeline:
     """
@@ -47,6 +138,17 @@ class IngestionPipeline:
         embedding_model: str = "text-embedding-3-small",
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
+        container_client: Optional[ContainerClient] = None,
+        download_workers: int = 8,
+        embed_concurrency: int = 4,
+        requests_per_minute: int = 3000,
+        tokens_per_minute: int = 1_000_000,
+        max_retries: int = 5,
+        max_batch_tokens: int = 100_000,
+        embedding_cache_dir: Optional[str | Path] = EMBEDDING_CACHE_DIR,
+        embedding_cache_max_entries: int = 250_000,
+        profile: str | CollectionProfile = QDRANT_COLLECTION_PROFILE,
+        clients: Optional[ClientRegistry] = None,
     ):
         """
         Initialize the ingestion pipeline.
@@ -57,51 +159,101 @@ class IngestionPipeline:
             embedding_model: OpenAI embedding model name
             chunk_size: Size of text chunks
             chunk_overlap: Overlap between chunks
+            container_client: Blob container to read from. Defaults to the configured Azure container;
+                pass an Azurite client or a `LocalContainerClient` for local runs.
+            download_workers: Maximum number of blobs downloaded in parallel
+            embed_concurrency: Maximum number of embedding requests in flight
+            requests_per_minute: Embedding API request rate limit
+            tokens_per_minute: Embedding API token rate limit
+            max_retries: Retries for a batch that fails with 429, 5xx or a connection error
+            max_batch_tokens: Token budget per embedding request
+            embedding_cache_dir: Directory of the on-disk embedding cache. None disables the cache.
+            embedding_cache_max_entries: Maximum number of cached embeddings
+            profile: Collection profile (vector size, quantization, Matryoshka prefetch vector)
+            clients: Source of the shared Qdrant client and HTTP pool. Defaults to the process-wide registry.
         """
-        self.qdrant_client = QdrantClient(
-            url=qdrant_url,
-            api_key=QDRANT_API_KEY
-        )
+        clients = clients or get_clients()
+        self.qdrant_client = clients.qdrant(qdrant_url)
         self.collection_name = collection_name
+        self.profile = get_profile(profile)
+        # Retries are handled by embed_and_store with backoff and jitter. TokenBatcher already keeps every
+        # chunk under the model's input limit, so LangChain need not tokenize again (which needs tiktoken's files)
         self.embeddings = OpenAIEmbeddings(
             model=embedding_model,
-            openai_api_key=OPENAI_API_KEY
+            check_embedding_ctx_length=False,
+            openai_api_key=clients.openai_api_key or OPENAI_API_KEY,
+            openai_api_base=clients.openai_base_url,
+            dimensions=self.profile.dimensions,
+            max_retries=0,
+            http_client=clients.http_client()
         )
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.container_client = container_client
+        self.download_workers = download_workers
+        self.embed_concurrency = embed_concurrency
+        self.max_retries = max_retries
+        self.request_limiter = TokenBucket(requests_per_minute)
+        self.token_limiter = TokenBucket(tokens_per_minute)
+        self.batcher = TokenBatcher(model=embedding_model, max_batch_tokens=max_batch_tokens)
+        self.embedding_cache = (
+            EmbeddingCache(
+                directory=embedding_cache_dir,
+                model=embedding_model,
+                dimensions=self.profile.dimensions,
+                max_entries=embedding_cache_max_entries,
+            )
+            if embedding_cache_dir else None
+        )
+        self.load_failures: dict[str, str] = {}
+        # BM25 sparse vectors for hybrid search; disabled for existing dense-only collections
+        self.sparse_encoder = BM25Encoder()
+        self.sparse_enabled = self.profile.sparse
+        # Seconds spent per ingestion stage; reported in the embed_and_store result
+        self.timings: dict[str, float] = {}
+        self._timings_lock = threading.Lock()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             length_function=len,
+            add_start_index=True,
         )
         
         # Ensure collection exists with correct vector size
         self._ensure_collection_exists()
     
     def _ensure_collection_exists(self):
-        """Create Qdrant collection if it doesn't exist with correct vector dimensions.
+        """Create Qdrant collection if it doesn't exist with the vector layout of the active profile.
         
             Also creates payload indexes for match searching.
         """
-        embedding_dim = 1536  # OpenAI text-embedding-3-small dimension
+        embedding_dim = self.profile.dimensions
         
         if not self.qdrant_client.collection_exists(self.collection_name):
             self.qdrant_client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=embedding_dim,
-                    distance=models.Distance.COSINE
-                )
+                vectors_config=self.profile.vectors_config(),
+                sparse_vectors_config=self.profile.sparse_vectors_config(),
+                quantization_config=self.profile.quantization_config()
             )
-            logging.info(f"Created collection '{self.collection_name}' with vector size {embedding_dim}")
+            self.sparse_enabled = self.profile.sparse
+            logging.info(f"Created collection '{self.collection_name}' with vector size {embedding_dim} (profile '{self.profile.name}')")
         else:
             # Verify collection has correct vector size
             collection_info = self.qdrant_client.get_collection(self.collection_name)
-            if collection_info.config.params.vectors.size != embedding_dim:
+            vectors = collection_info.config.params.vectors
+            if isinstance(vectors, dict):
+                vectors = vectors.get(self.profile.vector_name)
+            if vectors is None or vectors.size != embedding_dim:
                 logging.warning(
-                    f"Collection '{self.collection_name}' has vector size "
-                    f"{collection_info.config.params.vectors.size}, expected {embedding_dim}"
+                    f"Collection '{self.collection_name}' has vector config "
+                    f"{collection_info.config.params.vectors}, expected size {embedding_dim} (profile '{self.profile.name}')"
                 )
+            # Collections created before sparse vectors were introduced stay dense-only
+            sparse_vectors = collection_info.config.params.sparse_vectors or {}
+            self.sparse_enabled = self.profile.sparse and self.profile.SPARSE_VECTOR in sparse_vectors
+            if self.profile.sparse and not self.sparse_enabled:
+                logging.warning(f"Collection '{self.collection_name}' has no '{self.profile.SPARSE_VECTOR}' sparse vector; storing dense vectors only.")
                 
         try:
             self.qdrant_client.create_payload_index(
@@ -131,39 +283,65 @@ class IngestionPipeline:
         Returns:
             Loader class or None
         """
-        file_type = file_type.lower()
-        loader_map = {
-            "pdf": PyPDFLoader,
-            "txt": TextLoader,
-            "csv": CSVLoader,
-            "md": UnstructuredMarkdownLoader,
-            "markdown": UnstructuredMarkdownLoader,
-        }
-        return loader_map.get(file_type)
+        return LOADER_MAP.get(file_type.lower())
+    
+    def _get_container_client(self, credential=None) -> ContainerClient:
+        """Return the injected container client, or build one for the configured Azure container."""
+        if self.container_client is None:
+            if BLOB_CONNECTION_STRING:
+                self.container_client = ContainerClient.from_connection_string(BLOB_CONNECTION_STRING, BLOB_CONTAINER)
+            else:
+                blob_service_client = BlobServiceClient(account_url=ACCOUNT_URL, credential=credential or DefaultAzureCredential())
+                self.container_client = blob_service_client.get_container_client(BLOB_CONTAINER)
+        return self.container_client
     
-    def list_all_blob_names(self, directory: str = "Finance", file_extension: Optional[str] = None, credential: str = DefaultAzureCredential()) -> list[str]:
+    def list_all_blob_names(self, directory: str = "Finance", file_extension: Optional[str] = None, credential=None) -> list[str]:
         """List all blob names in the specified directory.
 
         Args:
             directory (str, optional): The directory to search for blobs. Defaults to "Finance".
             file_extension (Optional[str], optional): Filter blobs by file extension. Defaults to None.
-            credential (str, optional): Azure credential for authentication. Defaults to DefaultAzureCredential.
+            credential (optional): Azure credential for authentication. Defaults to a DefaultAzureCredential created on first use.
         Returns:
             list[str]: list of blob names
         """
-        blob_service_client = BlobServiceClient(account_url=ACCOUNT_URL, credential=credential)
-        container_client = blob_service_client.get_container_client(BLOB_CONTAINER)
+        container_client = self._get_container_client(credential)
+        prefix = directory_prefix(directory)
         
         blob_names = []
         blob_names.extend(
-            blob.name.replace(f"{directory}/", "").replace(f"{directory}\\", "")
-            for blob in container_client.list_blobs(name_starts_with=directory)
+            blob.name[len(prefix):]
+            for blob in container_client.list_blobs(name_starts_with=prefix)
             if file_extension is None or blob.name.endswith(file_extension)
         )
         logging.info(f"Found {len(blob_names)} blobs in directory '{directory}'")
         return blob_names
 
     
+    def list_blobs(self, directory: str = "Finance", file_extension: Optional[str] = None, credential=None) -> list[dict]:
+        """List blobs in the specified directory together with their etag and last-modified time.
+
+        Args:
+            directory (str, optional): The directory to search for blobs. Defaults to "Finance".
+            file_extension (Optional[str], optional): Filter blobs by file extension. Defaults to None.
+            credential (optional): Azure credential for authentication. Defaults to DefaultAzureCredential.
+        Returns:
+            list[dict]: full blob paths with "name", "etag" and "last_modified" keys
+        """
+        container_client = self._get_container_client(credential)
+        
+        blobs = [
+            {
+                "name": blob.name,
+                "etag": blob.etag,
+                "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
+            }
+            for blob in container_client.list_blobs(name_starts_with=directory_prefix(directory))
+            if file_extension is None or blob.name.endswith(file_extension)
+        ]
+        logging.info(f"Found {len(blobs)} blobs in directory '{directory}'")
+        return blobs
+
     def load_documents_from_azure(
         self,
         blob_names: List[str],
@@ -173,44 +351,184 @@ class IngestionPipeline:
         """
         Load documents from Azure Blob Storage.
         
+        Blobs are downloaded concurrently and each one is parsed with the loader for its own extension.
+        A blob that fails to download or parse is logged and recorded in `self.load_failures`
+        instead of failing the whole load.
+        
         Args:
             blob_names: List of blob names to load
             directory: Directory path in blob container (optional)
-            file_type: File type/extension (pdf, txt, csv, md). If None, auto-detect from blob name.
+            file_type: File type/extension (pdf, txt, csv, md). If None, auto-detect from each blob name.
             
         Returns:
             List of LangChain Document objects
         """
-        # Build full blob paths
-        blob_paths = []
-        for blob_name in blob_names:
-            if directory:
-                full_path = blob_name if blob_name.startswith(directory) else f"{directory}/{blob_name}"
-            else:
-                full_path = blob_name
-            blob_paths.append(full_path)
-        
-        # Auto-detect file type if not provided
-        if file_type is None and blob_names:
-            file_ext = blob_names[0].split(".")[-1].lower()
-            file_type = file_ext
-        
-        # Get appropriate loader factory
-        loader_factory = self._get_loader_factory(file_type) if file_type else None
-        
-        # Create loader
-        loader = AzureBlobStorageLoader(
-            account_url=ACCOUNT_URL,
-            container_name=BLOB_CONTAINER,
-            blob_names=blob_paths,
-            loader_factory=loader_factory,
-        )
+        blob_paths = self._blob_paths(blob_names, directory)
+        loaded, failures = self.load_blobs(blob_paths, file_type=file_type)
+        self.load_failures.update(failures)
         
-        # Load documents
-        documents = loader.load()
-        logging.info(f"Loaded {len(documents)} documents from Azure Blob Storage")
+        documents = [doc for docs in loaded.values() for doc in docs]
+        logging.info(f"Loaded {len(documents)} documents from {len(loaded)} blobs ({len(failures)} failed)")
         return documents
     
+    def _blob_paths(self, blob_names: Iterable[str], directory: str = "") -> List[str]:
+        """Build full blob paths from names relative to `directory`."""
+        prefix = directory_prefix(directory)
+        return [blob_name if blob_name.startswith(prefix) else f"{prefix}{blob_name}" for blob_name in blob_names]
+    
+    def load_blobs(
+        self,
+        blob_paths: List[str],
+        file_type: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> tuple[dict[str, List[Document]], dict[str, str]]:
+        """
+        Download and parse blobs concurrently with bounded parallelism.
+        Download and parse times are added to `self.timings`.
+        
+        Args:
+            blob_paths: Full blob paths in the container
+            file_type: Force a loader for every blob. If None, the loader is picked per blob from its extension.
+            max_workers: Maximum parallel downloads. Defaults to `download_workers`.
+            
+        Returns:
+            Tuple of (documents per blob path in input order, error message per failed blob path)
+        """
+        container_client = self._get_container_client()
+        loaded: dict[str, List[Document]] = {}
+        failures: dict[str, str] = {}
+        if not blob_paths:
+            return loaded, failures
+        stage_seconds = {"download": 0.0, "parse": 0.0}
+        lock = threading.Lock()
+        
+        def load(blob_path: str) -> List[Document]:
+            download_started = time.perf_counter()
+            content, source = self._download_blob(container_client, blob_path)
+            parse_started = time.perf_counter()
+            documents = parse_blob(content, blob_path, source, file_type)
+            with lock:
+                stage_seconds["download"] += parse_started - download_started
+                stage_seconds["parse"] += time.perf_counter() - parse_started
+            return documents
+        
+        with ThreadPoolExecutor(max_workers=max_workers or self.download_workers) as executor:
+            futures = [executor.submit(load, blob_path) for blob_path in blob_paths]
+            for blob_path, future in zip(blob_paths, futures):
+                try:
+                    loaded[blob_path] = future.result()
+                except Exception as e:
+                    logging.warning(f"Failed to load blob '{blob_path}': {e}")
+                    failures[blob_path] = str(e)
+        # Summed across download threads, like the load_and_chunk stage timings
+        for stage, seconds in stage_seconds.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        return loaded, failures
+    
+    def _download_blob(self, container_client: ContainerClient, blob_path: str) -> tuple[bytes, str]:
+        blob_client = container_client.get_blob_client(blob_path)
+        return blob_client.download_blob().readall(), blob_client.url
+    
+    def _add_timing(self, stage: str, seconds: float) -> None:
+        with self._timings_lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+    
+    def stream_chunks(
+        self,
+        blob_paths: Iterable[str],
+        file_type: Optional[str] = None,
+        parse_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        on_blob: Optional[Callable[[str, List[Document]], None]] = None,
+    ) -> Iterator[Document]:
+        """
+        Download, parse and chunk blobs as a stream, yielding each blob's chunks as soon as they are ready.
+        
+        Download and parse run as `bounded_map` stages connected by bounded queues, so only a few blobs
+        are held in memory at any time however many `blob_paths` there are, and the consumer (usually
+        `embed_and_store`) sees the first chunks within one blob's download and parse time. Blobs are
+        yielded in the order of `blob_paths`, so chunks are batched and upserted deterministically. Failed blobs are recorded in `self.load_failures`; stage timings
+        are added to `self.timings`.
+        
+        Args:
+            blob_paths: Full blob paths in the container. May be lazy.
+            file_type: Force a loader for every blob. If None, the loader is picked per blob from its extension.
+            parse_workers: Parse and chunk in this many worker processes. If None, parse on the download threads.
+            max_pending: Blobs buffered between stages. Defaults to twice the number of download workers.
+            on_blob: Called with each loaded blob's path and chunks, before the chunks are yielded.
+            
+        Yields:
+            Chunked Document objects
+        """
+        container_client = self._get_container_client()
+        max_pending = max(max_pending or 2 * self.download_workers, 1)
+        started = time.perf_counter()
+        counts = {"loaded": 0, "chunks": 0}
+        
+        def download(blob_path: str) -> tuple[bytes, str]:
+            download_started = time.perf_counter()
+            content, source = self._download_blob(container_client, blob_path)
+            self._add_timing("download", time.perf_counter() - download_started)
+            return content, source
+        
+        def chunk(blob_path: str, content: bytes, source: str, parsers: Optional[ProcessPoolExecutor] = None) -> List[Document]:
+            args = (content, blob_path, source, file_type, self.chunk_size, self.chunk_overlap)
+            if parsers is None:
+                chunks, parse_seconds, chunk_seconds = parse_and_chunk(*args)
+            else:
+                chunks, parse_seconds, chunk_seconds = parsers.submit(parse_and_chunk, *args).result()
+            self._add_timing("parse", parse_seconds)
+            self._add_timing("chunk", chunk_seconds)
+            return self.batcher.split_oversized(chunks)
+        
+        def succeeded(outcomes):
+            for blob_path, result, error in outcomes:
+                if error is None:
+                    yield blob_path, result
+                    continue
+                logging.warning(f"Failed to load blob '{blob_path}': {error}")
+                with self._timings_lock:
+                    self.load_failures[blob_path] = str(error)
+        
+        def loaded_chunks(blob_path: str, chunks: List[Document]) -> List[Document]:
+            counts["loaded"] += 1
+            counts["chunks"] += len(chunks)
+            if on_blob is not None:
+                on_blob(blob_path, chunks)
+            return chunks
+        
+        try:
+            if parse_workers:
+                # Spawned workers avoid forking a process that already runs download threads
+                with ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn")) as parsers:
+                    downloads = bounded_map(download, blob_paths, workers=self.download_workers, buffer=max_pending, name="ingest-download")
+                    parsed = bounded_map(
+                        lambda downloaded: chunk(downloaded[0], *downloaded[1], parsers=parsers),
+                        succeeded(downloads),
+                        workers=parse_workers,
+                        buffer=max_pending,
+                        name="ingest-parse",
+                    )
+                    for blob_path, chunks in succeeded(parsed):
+                        yield from loaded_chunks(blob_path, chunks)
+            else:
+                loaded = bounded_map(
+                    lambda blob_path: chunk(blob_path, *download(blob_path)),
+                    blob_paths,
+                    workers=self.download_workers,
+                    buffer=max_pending,
+                    name="ingest-load",
+                )
+                for blob_path, chunks in succeeded(loaded):
+                    yield from loaded_chunks(blob_path, chunks)
+        finally:
+            # Download/parse/chunk are summed across workers; load_and_chunk is wall-clock and overlaps embedding
+            self._add_timing("load_and_chunk", time.perf_counter() - started)
+            logging.info(
+                f"Parsed and chunked {counts['loaded']} blobs into {counts['chunks']} chunks "
+                f"({len(self.load_failures)} failed)"
+            )
+    
     def chunk_documents(self, documents: List[Document]) -> List[Document]:
         """
         Split documents into chunks.
@@ -221,53 +539,145 @@ class IngestionPipeline:
         Returns:
             List of chunked Document objects
         """
-        chunks = self.text_splitter.split_documents(documents)
+        chunks = self.batcher.split_oversized(self.text_splitter.split_documents(documents))
         logging.info(f"Split {len(documents)} documents into {len(chunks)} chunks")
         return chunks
     
     def embed_and_store(
         self,
-        documents: List[Document],
-        batch_size: int = 100,
+        documents: Iterable[Document],
+        batch_size: Optional[int] = None,
+        mark_version: bool = True,
+        max_concurrency: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        on_stored: Optional[Callable[[int, List[PointStruct]], None]] = None,
+        stop: Optional[threading.Event] = None,
     ) -> dict:
         """
         Generate embeddings and store documents in Qdrant.
         
+        Chunks are packed into batches by token count (embedding model tokenizer) up to a token and an
+        item budget. Several embedding requests run at once under the request/token rate limits, and upserts run on
+        a separate thread so they overlap with the next embedding calls. A batch that fails with 429, 5xx
+        or a connection error is retried with exponential backoff and jitter; it is only reported in
+        `errors` once `max_retries` is exhausted or the error is not retryable.
+        
+        `documents` may be a lazy stream (see `stream_chunks`). It is pulled a batch at a time and embedding
+        never runs more than a few batches ahead of the upserts, so memory stays bounded and each batch is
+        stored as soon as it is embedded.
+        
         Args:
-            documents: List of LangChain Document objects (chunked)
-            batch_size: Number of documents to process in each batch
+            documents: LangChain Document objects (chunked), as a list or a stream
+            batch_size: Maximum number of documents per batch. Defaults to the batcher's item budget.
+            mark_version: Stamp a new ingestion version on the collection if anything was stored
+            max_concurrency: Embedding requests in flight. Defaults to `embed_concurrency`.
+            max_batch_tokens: Token budget per batch. Defaults to the pipeline's `max_batch_tokens`.
+            on_stored: Called on the upsert thread with each batch number and its points once they are in Qdrant
+            stop: When set, no more documents are pulled and batches not yet sent are skipped; batches
+                already embedded (or being embedded) are still stored and the result has status "cancelled".
             
         Returns:
             Dictionary with ingestion statistics
         """
-        total_docs = len(documents)
-        stored_count = 0
+        max_concurrency = max_concurrency or self.embed_concurrency
+        stats = {"total_documents": 0, "stored_count": 0, "embed": 0.0, "upsert": 0.0, "first_upsert": None}
         errors = []
+        lock = threading.Lock()
+        started = time.perf_counter()
         
-        # Process in batches
-        for i in range(0, total_docs, batch_size):
-            batch = documents[i:i + batch_size]
-            
-            try:
-                points = self.process_batch(batch)
-                self.upsert_to_qdrant(points)
-                stored_count += len(points)
-                logging.info(f"Stored batch {i//batch_size + 1}: {len(points)} documents")
-            except Exception as e:
-                error_msg = f"Error processing batch {i//batch_size + 1}: {str(e)}"
-                logging.exception(error_msg)
-                errors.append(error_msg)
+        def stopped() -> bool:
+            return stop is not None and stop.is_set()
+        
+        def counted(docs: Iterable[Document]) -> Iterator[Document]:
+            for doc in docs:
+                if stopped():
+                    return
+                stats["total_documents"] += 1
+                yield doc
+        
+        def embed(numbered: tuple[int, tuple[List[Document], int]]) -> Optional[List[PointStruct]]:
+            number, (batch, tokens) = numbered
+            if stopped():
+                # Packed before the stop but not sent yet
+                return None
+            embed_started = time.perf_counter()
+            points = self.process_batch(batch, tokens=tokens, description=f"Embedding batch {number}")
+            with lock:
+                stats["embed"] += time.perf_counter() - embed_started
+            return points
+        
+        def upsert(number: int, points: List[PointStruct]) -> None:
+            upsert_started = time.perf_counter()
+            retry_with_backoff(lambda: self.upsert_to_qdrant(points), max_retries=self.max_retries, description=f"Upserting batch {number}")
+            with lock:
+                stats["upsert"] += time.perf_counter() - upsert_started
+                stats["stored_count"] += len(points)
+                if stats["first_upsert"] is None:
+                    stats["first_upsert"] = time.perf_counter() - started
+            logging.info(f"Stored batch {number}: {len(points)} documents")
+            if on_stored is not None:
+                on_stored(number, points)
+        
+        def record_error(number: int, error: Exception) -> None:
+            error_msg = f"Error processing batch {number}: {str(error)}"
+            logging.error(error_msg)
+            errors.append(error_msg)
         
+        def collect(futures: dict[Future, int], block: bool) -> None:
+            done = wait(futures, return_when=FIRST_COMPLETED)[0] if block else [f for f in futures if f.done()]
+            for future in done:
+                number = futures.pop(future)
+                if future.exception() is not None:
+                    record_error(number, future.exception())
+        
+        batches = self.batcher.batches(counted(documents), max_batch_tokens=max_batch_tokens, max_batch_items=batch_size)
+        with ThreadPoolExecutor(max_workers=1) as upserter:
+            upserting: dict[Future, int] = {}
+            # Batches are packed on the stage's feeder thread, so a slow upstream never delays handing
+            # embedded batches to the upserter. Embedded points are the largest objects in the pipeline,
+            # so the stage's buffer is one batch, and at most `2 * max_concurrency + 1` batches are
+            # packed ahead of the one being upserted while an earlier batch is still embedding.
+            embedded = bounded_map(embed, enumerate(batches, start=1), workers=max_concurrency, buffer=1, name="ingest-embed")
+            for (number, _), points, error in embedded:
+                if error is not None:
+                    record_error(number, error)
+                    continue
+                if points is None:
+                    logging.info(f"Ingestion stopped before embedding batch {number}")
+                    continue
+                upserting[upserter.submit(upsert, number, points)] = number
+                collect(upserting, block=False)
+                # Don't run ahead of upserts by more than a few batches
+                while len(upserting) >= 2 * max_concurrency:
+                    collect(upserting, block=True)
+            while upserting:
+                collect(upserting, block=True)
+        
+        total_docs = stats["total_documents"]
+        stored_count = stats["stored_count"]
+        elapsed = time.perf_counter() - started
+        if stored_count and mark_version:
+            self.mark_ingestion_version()
+        
+        timings = {**self.timings, "embed": stats["embed"], "upsert": stats["upsert"], "embed_and_store": elapsed}
+        if stats["first_upsert"] is not None:
+            timings["first_upsert"] = stats["first_upsert"]
         result = {
-            "status": "partial" if errors else "success",
+            "status": "cancelled" if stopped() else "partial" if errors else "success",
             "total_documents": total_docs,
             "stored_count": stored_count,
             "errors": errors,
+            "chunks_per_second": stored_count / elapsed if elapsed > 0 else 0.0,
+            # embed/upsert are summed across threads; embed_and_store and first_upsert are wall-clock
+            "timings": timings,
         }
         
-        logging.info(f"Ingestion complete: {stored_count}/{total_docs} documents stored")
-        return result
+        if self.embedding_cache:
+            result["embedding_cache"] = self.embedding_cache.stats()
         
+        logging.info(f"Ingestion complete: {stored_count}/{total_docs} documents stored ({result['chunks_per_second']:.1f} chunks/s)")
+        return result
+    
     # Create points for Qdrant
     def create_points(self, texts, embeddings, metadatas):
         """
@@ -283,11 +693,16 @@ class IngestionPipeline:
         """
         points = []
         for text, embedding, metadata in zip(texts, embeddings, metadatas):
-            point_id = str(uuid.uuid4())
+            # Documents that did not come from a blob (no "blob_path") get random ids
+            blob_path = metadata.get("blob_path")
+            point_id = chunk_point_id(blob_path, chunk_hash(text)) if blob_path else str(uuid.uuid4())
             points.append(
                 PointStruct(
                     id=point_id,
-                    vector=embedding,
+                    vector=self.profile.point_vector(
+                        embedding,
+                        self.sparse_encoder.encode_document(text) if self.sparse_enabled else None
+                    ),
                     payload={
                         "text": text,
                         **metadata,
@@ -319,6 +734,27 @@ class IngestionPipeline:
     def embed_documents(self, texts: List[str]):
         return self.embeddings.embed_documents(texts)
     
+    def mark_ingestion_version(self) -> Optional[str]:
+        """Stamp the collection metadata with a new ingestion version so query-side caches are invalidated."""
+        version = datetime.now(timezone.utc).isoformat()
+        try:
+            self.qdrant_client.update_collection(
+                collection_name=self.collection_name,
+                metadata={"ingestion_version": version}
+            )
+        except Exception as e:
+            logging.warning(f"Could not update ingestion version for '{self.collection_name}': {e}")
+            return None
+        return version
+    
+    def delete_points(self, point_ids: List[str]) -> None:
+        if not point_ids:
+            return
+        self.qdrant_client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=point_ids)
+        )
+    
     # Upsert to Qdrant
     def upsert_to_qdrant(self, points: List[PointStruct]):
         self.qdrant_client.upsert(
@@ -327,28 +763,74 @@ class IngestionPipeline:
         )
     
     # Process batch of documents before embedding and storing in Qdrant
-    def process_batch(self, batch: List[Document]):
+    def process_batch(self, batch: List[Document], tokens: Optional[int] = None, description: str = "Embedding batch"):
         texts, metadatas = self.extract_from_documents(batch)
-        embeddings = self.embed_documents(texts)
+        embeddings = self.embed_with_cache(texts, tokens=tokens, description=description)
         return self.create_points(texts, embeddings, metadatas)
     
+    def embed_with_cache(self, texts: List[str], tokens: Optional[int] = None, description: str = "Embedding batch") -> List[List[float]]:
+        """
+        Embed texts, calling the API only for texts missing from the embedding cache.
+        
+        The API call is rate limited and retried with backoff on 429, 5xx and connection errors.
+        
+        Args:
+            texts: Chunk texts to embed
+            tokens: Token count of all texts, if already known
+            description: Label used in retry log messages
+            
+        Returns:
+            One embedding per text
+        """
+        embeddings = self.embedding_cache.get_many(texts) if self.embedding_cache else [None] * len(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            return embeddings
+        
+        missing_texts = [texts[i] for i in missing]
+        if tokens is None or len(missing) < len(texts):
+            tokens = sum(self.batcher.count_tokens(text) for text in missing_texts)
+        
+        def request():
+            self.request_limiter.acquire(1)
+            self.token_limiter.acquire(tokens)
+            return self.embed_documents(missing_texts)
+        
+        vectors = retry_with_backoff(request, max_retries=self.max_retries, description=description)
+        if self.embedding_cache:
+            self.embedding_cache.put_many(missing_texts, vectors)
+        for i, vector in zip(missing, vectors):
+            embeddings[i] = vector
+        return embeddings
+    
     def ingest_from_azure(
         self,
-        blob_names: List[str],
+        blob_names: Iterable[str],
         directory: str = "",
         file_type: Optional[str] = None,
         chunk_size: Optional[int] = None,
         chunk_overlap: Optional[int] = None,
+        parse_workers: Optional[int] = None,
+        on_blob: Optional[Callable[[str, List[Document]], None]] = None,
+        on_stored: Optional[Callable[[int, List[PointStruct]], None]] = None,
+        stop: Optional[threading.Event] = None,
     ) -> dict:
         """
         Complete ingestion pipeline: Load -> Chunk -> Embed -> Store.
         
+        The stages are streamed (see `stream_chunks` and `embed_and_store`), so memory use does not grow
+        with the number of blobs and the first vectors are stored while the rest are still loading.
+        
         Args:
-            blob_names: List of blob names to ingest
+            blob_names: Blob names to ingest
             directory: Directory path in blob container
             file_type: File type/extension (pdf, txt, csv, md)
             chunk_size: Override default chunk size
             chunk_overlap: Override default chunk overlap
+            parse_workers: Parse and chunk in this many worker processes. If None, parse on the download threads.
+            on_blob: Progress hook, see `stream_chunks`
+            on_stored: Progress hook, see `embed_and_store`
+            stop: Cancellation event, see `embed_and_store`
             
         Returns:
             Dictionary with ingestion results
@@ -357,27 +839,144 @@ class IngestionPipeline:
         if chunk_size or chunk_overlap:
             current_chunk_size = chunk_size if chunk_size else self.chunk_size
             current_chunk_overlap = chunk_overlap if chunk_overlap else self.chunk_overlap
+            self.chunk_size = current_chunk_size
+            self.chunk_overlap = current_chunk_overlap
             self.text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=current_chunk_size,
                 chunk_overlap=current_chunk_overlap,
                 length_function=len,
+                add_start_index=True,
             )
         
-        # Step 1: Load documents from Azure
-        documents = self.load_documents_from_azure(
-            blob_names=blob_names,
-            directory=directory,
-            file_type=file_type,
-        )
+        self.load_failures = {}
+        self.timings = {}
+        
+        # Load -> chunk -> embed -> store as one stream: chunks are embedded and stored while later
+        # blobs are still downloading and parsing
+        chunks = self.stream_chunks(self._blob_paths(blob_names, directory), file_type=file_type, parse_workers=parse_workers, on_blob=on_blob)
+        result = self.embed_and_store(chunks, on_stored=on_stored, stop=stop)
         
-        if not documents:
+        if not result["total_documents"] and result["status"] != "cancelled":
             return {
                 "status": "error",
                 "message": "No documents loaded from Azure Blob Storage",
+                "load_errors": self.load_failures,
             }
         
-        # Step 2: Chunk documents
-        chunks = self.chunk_documents(documents)
+        result["load_errors"] = self.load_failures
+        if self.load_failures and result["status"] == "success":
+            result["status"] = "partial"
+        return result
+
+    def sync_from_azure(
+        self,
+        manifest_path: str | Path,
+        directory: str = "Finance",
+        file_extension: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> dict:
+        """
+        Incremental ingestion: only new or changed blobs are downloaded, chunked and embedded.
+        
+        Blob etags/last-modified times and per-chunk content hashes are kept in a manifest. Points use
+        ids derived from the blob path and chunk hash, so unchanged chunks of a changed blob are not
+        re-embedded, stale chunks are deleted, and points of blobs removed from the directory are dropped.
+        The manifest is saved after every blob, so an interrupted sync resumes where it stopped.
+        
+        Args:
+            manifest_path: Location of the JSON manifest for this collection
+            directory: Directory path in blob container
+            file_extension: Only sync blobs with this extension
+            batch_size: Maximum number of chunks to embed per request
+            
+        Returns:
+            Dictionary with sync statistics
+        """
+        manifest = IngestionManifest(manifest_path)
+        blobs = self.list_blobs(directory=directory, file_extension=file_extension)
+        listed = {blob["name"] for blob in blobs}
+        
+        counts = {"new_blobs": 0, "updated_blobs": 0, "unchanged_blobs": 0, "removed_blobs": 0}
+        stored_count = 0
+        deleted_count = 0
+        errors = []
         
-        # Step 3: Embed and store in Qdrant
-        return self.embed_and_store(chunks)
\ No newline at end of file
+        changed = []
+        for blob in blobs:
+            if manifest.is_current(blob["name"], blob["etag"], blob["last_modified"]):
+                counts["unchanged_blobs"] += 1
+            else:
+                changed.append(blob)
+        
+        # Download changed blobs concurrently, a window at a time to bound memory
+        window = max(1, 2 * self.download_workers)
+        for start in range(0, len(changed), window):
+            group = changed[start:start + window]
+            loaded, failures = self.load_blobs([blob["name"] for blob in group])
+            for blob_path, error in failures.items():
+                errors.append(f"Error loading blob '{blob_path}': {error}")
+            
+            for blob in group:
+                blob_path = blob["name"]
+                if blob_path not in loaded:
+                    continue
+                try:
+                    documents = loaded.pop(blob_path)
+                    chunks = self.chunk_documents(documents)
+                    
+                    old_hashes = set(manifest.chunk_hashes(blob_path))
+                    new_hashes = {}
+                    for chunk in chunks:
+                        new_hashes.setdefault(chunk_hash(chunk.page_content), chunk)
+                    
+                    # Only chunks whose content is not already stored need embedding
+                    added = [chunk for text_hash, chunk in new_hashes.items() if text_hash not in old_hashes]
+                    result = self.embed_and_store(added, batch_size=batch_size, mark_version=False)
+                    if result["errors"]:
+                        raise Exception("; ".join(result["errors"]))
+                    stale = [chunk_point_id(blob_path, text_hash) for text_hash in old_hashes - new_hashes.keys()]
+                    self.delete_points(stale)
+                    
+                    counts["updated_blobs" if blob_path in manifest.blobs else "new_blobs"] += 1
+                    stored_count += result["stored_count"]
+                    deleted_count += len(stale)
+                    manifest.update(blob_path, blob["etag"], blob["last_modified"], list(new_hashes))
+                    manifest.save()
+                except Exception as e:
+                    error_msg = f"Error syncing blob '{blob_path}': {str(e)}"
+                    logging.exception(error_msg)
+                    errors.append(error_msg)
+        
+        # Drop points of blobs that no longer exist in the directory. `listed` only holds blobs with
+        # `file_extension`, so blobs with other extensions are left to the syncs that list them.
+        for blob_path in manifest.blob_paths(prefix=directory_prefix(directory)):
+            if blob_path in listed or (file_extension is not None and not blob_path.endswith(file_extension)):
+                continue
+            try:
+                stale = [chunk_point_id(blob_path, text_hash) for text_hash in manifest.chunk_hashes(blob_path)]
+                self.delete_points(stale)
+                manifest.remove(blob_path)
+                manifest.save()
+                counts["removed_blobs"] += 1
+                deleted_count += len(stale)
+            except Exception as e:
+                error_msg = f"Error removing points for blob '{blob_path}': {str(e)}"
+                logging.exception(error_msg)
+                errors.append(error_msg)
+        
+        if stored_count or deleted_count:
+            self.mark_ingestion_version()
+        
+        result = {
+            "status": "partial" if errors else "success",
+            **counts,
+            "stored_count": stored_count,
+            "deleted_count": deleted_count,
+            "errors": errors,
+        }
+        logging.info(
+            f"Sync complete: {counts['new_blobs']} new, {counts['updated_blobs']} updated, "
+            f"{counts['unchanged_blobs']} unchanged, {counts['removed_blobs']} removed blobs; "
+            f"{stored_count} points stored, {deleted_count} deleted"
+        )
+        return result
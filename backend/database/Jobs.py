@@ -0,0 +1,583 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from ..Clients import ClientRegistry, get_clients
+from config import INGESTION_JOB_DIR, INGESTION_MAX_JOBS, INGESTION_RESUME_JOBS, INGESTION_RUN_IN_API, QDRANT_COLLECTION_NAME
+
+# Ingestion pulls in LangChain loaders and the Azure SDKs; it is imported only when a job runs
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from qdrant_client.models import PointStruct
+
+# File locks for JobLease: flock on POSIX, msvcrt byte-range locks on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+# Job states. A "running" job whose lease nobody holds was interrupted (its process stopped or died).
+ACTIVE_STATES = ("queued", "running", "cancelling")
+FINAL_STATES = ("completed", "partial", "failed", "cancelled", "interrupted")
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class IngestionJob:
+    """An ingestion of one blob directory with a checkpoint file that lets it resume after a restart.
+
+    Only the process holding the job's `JobLease` runs it or writes its checkpoint; other processes read
+    the checkpoint as a snapshot. A blob counts as completed once every one of its chunks is stored in Qdrant. Blobs finish out of
+    order (see `IngestionPipeline.stream_chunks`), so the checkpoint is the set of completed blobs plus
+    the last stored blob and batch. A resumed job skips completed blobs; chunks of a blob that was only
+    partly stored are upserted again under the same deterministic point ids, so nothing is duplicated.
+
+    Args:
+        path (str | Path): Location of the checkpoint file. It is loaded if it exists.
+        checkpoint_interval (float): Minimum seconds between checkpoint writes while running. Defaults to 2.
+        **params: Job parameters ("directory", "collection_name", "file_extension", "parse_workers") for a new job.
+    """
+
+    def __init__(self, path: str | Path, checkpoint_interval: float = 2.0, **params):
+        self.path = Path(path)
+        self.checkpoint_interval = checkpoint_interval
+        self.stop_event = threading.Event()
+        self.stop_reason = "cancelled"
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+        # Chunks still to be stored per loaded blob
+        self._remaining: dict[str, int] = {}
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.completed: set[str] = set(state.pop("completed", []))
+            self.state = state
+            logging.info(f"Loaded ingestion job {self.job_id} ({len(self.completed)} blobs completed) from {self.path}")
+        else:
+            self.completed = set()
+            self.state = {
+                "job_id": self.path.stem,
+                "state": "queued",
+                **params,
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "updated_at": _now(),
+                "runs": 0,
+                "total_blobs": None,
+                "failed_blobs": 0,
+                "stored_chunks": 0,
+                "last_blob": None,
+                "last_batch": None,
+                # Wall-clock start and progress of the current run, for throughput and ETA in any process
+                "run_started": None,
+                "run_blobs": 0,
+                "run_chunks": 0,
+                "errors": [],
+                "load_errors": {},
+                "message": None,
+            }
+
+    @property
+    def job_id(self) -> str:
+        return self.state["job_id"]
+
+    @property
+    def status(self) -> str:
+        return self.state["state"]
+
+    @property
+    def cancel_path(self) -> Path:
+        """Marker file through which other processes ask the job's owner to stop it."""
+        return self.path.with_suffix(".cancel")
+
+    def request_stop(self, reason: str = "cancelled") -> None:
+        """Stop after the batches already embedded are stored. `reason` becomes the final state."""
+        with self._lock:
+            self.stop_reason = reason
+            if self.state["state"] == "running":
+                self.state["state"] = "cancelling"
+        self.stop_event.set()
+
+    def requeue(self) -> None:
+        with self._lock:
+            self.state["state"] = "queued"
+        self.save()
+
+    def start(self) -> None:
+        with self._lock:
+            # Blobs that failed to load in an earlier run are retried
+            self.state.update(state="running", started_at=_now(), finished_at=None, message=None, failed_blobs=0, load_errors={})
+            self.state.update(run_started=time.time(), run_blobs=0, run_chunks=0)
+            self.state["runs"] += 1
+        self.save()
+
+    def set_total(self, total_blobs: int) -> None:
+        with self._lock:
+            self.state["total_blobs"] = total_blobs
+        self.save()
+
+    def blob_loaded(self, blob_path: str, chunks: list["Document"]) -> None:
+        """`on_blob` hook of `IngestionPipeline.ingest_from_azure`."""
+        with self._lock:
+            if not chunks:
+                self._complete(blob_path)
+                return
+            self._remaining[blob_path] = len(chunks)
+
+    def batch_stored(self, number: int, points: list["PointStruct"]) -> None:
+        """`on_stored` hook of `IngestionPipeline.ingest_from_azure`."""
+        with self._lock:
+            self.state["stored_chunks"] += len(points)
+            self.state["last_batch"] = number
+            self.state["run_chunks"] += len(points)
+            for point in points:
+                blob_path = (point.payload or {}).get("blob_path")
+                if blob_path not in self._remaining:
+                    continue
+                self._remaining[blob_path] -= 1
+                if self._remaining[blob_path] <= 0:
+                    self._complete(blob_path)
+        if time.monotonic() - self._saved_at >= self.checkpoint_interval:
+            self.save()
+
+    def finish_as(self, final: str) -> None:
+        """Record a final state for a job that is not running (e.g. cancelled while queued)."""
+        with self._lock:
+            self.state.update(state=final, finished_at=_now())
+        self.save()
+
+    def finish(self, result: Optional[dict] = None, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            if self.stop_event.is_set():
+                final = self.stop_reason
+            elif error is not None:
+                final, self.state["message"] = "failed", str(error)
+            elif result is None or result["status"] == "success":
+                final = "completed"
+            elif result["status"] == "error":
+                final, self.state["message"] = "failed", result.get("message")
+            else:
+                final = "partial"
+            if result is not None:
+                self.state["errors"] = (self.state["errors"] + result.get("errors", []))[-50:]
+                self.state["load_errors"] = result.get("load_errors", {})
+                self.state["failed_blobs"] = len(self.state["load_errors"])
+            self.state.update(state=final, finished_at=_now())
+        self.save()
+        logging.info(f"Ingestion job {self.job_id} {final}: {len(self.completed)}/{self.state['total_blobs']} blobs, {self.state['stored_chunks']} chunks stored")
+
+    def progress(self) -> dict:
+        """Job state with progress, this run's throughput and the estimated seconds left."""
+        with self._lock:
+            state = dict(self.state)
+            total = state["total_blobs"]
+            done = len(self.completed)
+            remaining = max(total - done - state["failed_blobs"], 0) if total is not None else None
+            run_started = state.pop("run_started", None)
+            elapsed = time.time() - run_started if run_started is not None else None
+            active = state["state"] in ("running", "cancelling") and elapsed
+            blobs_per_second = state["run_blobs"] / elapsed if active else None
+            state.update(
+                completed_blobs=done,
+                remaining_blobs=remaining,
+                progress=done / total if total else None,
+                elapsed_seconds=elapsed if active else None,
+                blobs_per_second=blobs_per_second,
+                chunks_per_second=state["run_chunks"] / elapsed if active else None,
+                eta_seconds=remaining / blobs_per_second if blobs_per_second and remaining is not None else None,
+            )
+        return state
+
+    def save(self) -> None:
+        """Write the checkpoint atomically so a crash never leaves a half-written file."""
+        with self._lock:
+            self.state["updated_at"] = _now()
+            data = {**self.state, "completed": sorted(self.completed)}
+            self._saved_at = time.monotonic()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+
+    # Helper methods
+    def _complete(self, blob_path: str) -> None:
+        # Caller holds the lock
+        self._remaining.pop(blob_path, None)
+        self.completed.add(blob_path)
+        self.state["last_blob"] = blob_path
+        self.state["run_blobs"] += 1
+
+
+class JobLease:
+    """Exclusive `flock` on `<job>.lock` (a byte-range lock on Windows), held by the one process that runs or edits a job.
+
+    The lock is released by the operating system when its holder exits, so a dead worker never blocks a job.
+
+    Args:
+        path (str | Path): Lock file, created if missing.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Take the lease without waiting. Returns False if another holder has it."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+
+
+class IngestionJobManager:
+    """Queues ingestion jobs as checkpoint files in `directory` and, with `run_jobs`, runs them.
+
+    Any number of processes can share `directory`: API workers submit, inspect, cancel and resume jobs
+    through the checkpoint files, and a worker process (`python -m backend.database.Jobs`) polls the
+    directory and runs queued jobs. A job is run only by the process holding its `JobLease`, so two
+    workers never run the same job or overwrite each other's checkpoint. A checkpoint that says
+    "running" while nobody holds the lease belongs to a stopped or crashed process and is reported as
+    "interrupted"; a worker with `resume_interrupted` picks such jobs up again.
+
+    Args:
+        directory (str | Path): Checkpoint directory. Defaults to `INGESTION_JOB_DIR` from config.
+        clients (ClientRegistry | None): Shared Qdrant client and HTTP pool. Defaults to the process-wide registry.
+        max_jobs (int): Jobs this process runs at the same time. Defaults to `INGESTION_MAX_JOBS`.
+        run_jobs (bool): Poll `directory` and run jobs in this process. Defaults to `INGESTION_RUN_IN_API` (off),
+            which suits the API; the worker entry point turns it on.
+        resume_interrupted (bool): Also run interrupted jobs, not only queued ones. Defaults to `INGESTION_RESUME_JOBS` (off).
+        checkpoint_interval (float): Minimum seconds between checkpoint writes of a running job. Defaults to 2.
+        poll_interval (float): Seconds between scans of `directory` for jobs and cancel requests. Defaults to 1.
+        **pipeline_options: Passed to every `IngestionPipeline` (e.g. `container_client`, `chunk_size`).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = INGESTION_JOB_DIR,
+        clients: Optional[ClientRegistry] = None,
+        max_jobs: int = INGESTION_MAX_JOBS,
+        run_jobs: bool = INGESTION_RUN_IN_API,
+        resume_interrupted: bool = INGESTION_RESUME_JOBS,
+        checkpoint_interval: float = 2.0,
+        poll_interval: float = 1.0,
+        **pipeline_options,
+    ):
+        self.directory = Path(directory)
+        self.clients = clients
+        self.max_jobs = max(1, max_jobs)
+        self.run_jobs = run_jobs
+        self.resume_interrupted = resume_interrupted
+        self.checkpoint_interval = checkpoint_interval
+        self.poll_interval = poll_interval
+        self.pipeline_options = pipeline_options
+        # Jobs this process runs, with the leases it holds for them
+        self.running: dict[str, tuple[IngestionJob, JobLease]] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._poller: Optional[threading.Thread] = None
+        if run_jobs:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="ingestion-job")
+            self._poller = threading.Thread(target=self._poll_loop, name="ingestion-jobs-poll", daemon=True)
+            self._poller.start()
+
+    def submit(
+        self,
+        directory: str = "Finance",
+        collection_name: str = QDRANT_COLLECTION_NAME,
+        file_extension: Optional[str] = None,
+        parse_workers: Optional[int] = None,
+    ) -> IngestionJob:
+        """Queue a new ingestion of `directory` into `collection_name` and return the job."""
+        job_id = uuid.uuid4().hex
+        job = IngestionJob(
+            self.directory / f"{job_id}.json",
+            checkpoint_interval=self.checkpoint_interval,
+            directory=directory,
+            collection_name=collection_name,
+            file_extension=file_extension,
+            parse_workers=parse_workers,
+        )
+        job.save()
+        logging.info(f"Queued ingestion job {job_id} for '{directory}' into '{collection_name}'")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """The live job if this process runs it, otherwise a snapshot of its checkpoint. None if unknown."""
+        with self._lock:
+            running = self.running.get(job_id)
+        if running is not None:
+            return running[0]
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        try:
+            job = self._read(self.directory / f"{job_id}.json")
+        except KeyError:
+            return None
+        if job.status in ("running", "cancelling") and self._lease_free(job):
+            job.state["state"] = "interrupted"
+        elif job.status == "running" and job.cancel_path.exists():
+            job.state["state"] = "cancelling"
+        return job
+
+    def all_jobs(self) -> list[IngestionJob]:
+        """Every job in `directory`, oldest first."""
+        paths = self.directory.glob("*.json") if self.directory.exists() else []
+        jobs = (self._safe_get(path.stem) for path in paths)
+        return sorted((job for job in jobs if job is not None), key=lambda job: job.state["created_at"])
+
+    def cancel(self, job_id: str) -> IngestionJob:
+        """Stop a queued or running job; its checkpoint is kept so it can be resumed.
+
+        A job run by another process is asked to stop through its cancel marker and shows as "cancelling"
+        until its owner has stored the batches already embedded.
+
+        Raises:
+            KeyError: If there is no such job.
+            ValueError: If the job has already finished.
+        """
+        job = self._require(job_id)
+        if job.status not in ACTIVE_STATES:
+            raise ValueError(f"Ingestion job {job_id} is already {job.status}.")
+        with self._lock:
+            running = self.running.get(job_id)
+        if running is not None:
+            job.request_stop("cancelled")
+            return job
+        lease = JobLease(job.path.with_suffix(".lock"))
+        if lease.acquire():
+            # Nobody runs it: cancel the checkpoint directly
+            try:
+                job = self._read(job.path)
+                if job.status in ACTIVE_STATES:
+                    job.finish_as("cancelled")
+                return job
+            finally:
+                lease.release()
+        job.cancel_path.touch()
+        job.state["state"] = "cancelling"
+        return job
+
+    def resume(self, job_id: str) -> IngestionJob:
+        """Queue a finished or interrupted job again; it skips the blobs its checkpoint lists as completed.
+
+        Raises:
+            KeyError: If there is no such job.
+            ValueError: If the job is still queued or running.
+        """
+        job = self._require(job_id)
+        if job.status in ACTIVE_STATES:
+            raise ValueError(f"Ingestion job {job_id} is still {job.status}.")
+        lease = JobLease(job.path.with_suffix(".lock"))
+        if not lease.acquire():
+            raise ValueError(f"Ingestion job {job_id} is still running.")
+        try:
+            job = self._read(job.path)
+            job.cancel_path.unlink(missing_ok=True)
+            job.requeue()
+        finally:
+            lease.release()
+        return job
+
+    def stats(self) -> dict:
+        states = [job.status for job in self.all_jobs()]
+        return {state: states.count(state) for state in (*ACTIVE_STATES, *FINAL_STATES)}
+
+    def serve_forever(self) -> None:
+        """Run jobs in the foreground until interrupted (the worker process entry point)."""
+        try:
+            while not self._closed.wait(self.poll_interval):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop the jobs this process runs as "interrupted" and wait for them to store their embedded batches."""
+        self._closed.set()
+        if self._poller is not None:
+            self._poller.join()
+        with self._lock:
+            running = list(self.running.values())
+        for job, _ in running:
+            job.request_stop("interrupted")
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    # Helper methods
+    def _require(self, job_id: str) -> IngestionJob:
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def _read(self, path: Path) -> IngestionJob:
+        """Load an existing checkpoint. A missing one raises KeyError rather than starting a new job."""
+        try:
+            if path.exists():
+                return IngestionJob(path, checkpoint_interval=self.checkpoint_interval)
+        except FileNotFoundError:
+            pass
+        raise KeyError(path.stem)
+
+    def _safe_get(self, job_id: str) -> Optional[IngestionJob]:
+        try:
+            return self.get(job_id)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read ingestion job {job_id}: {e}")
+            return None
+
+    def _lease_free(self, job: IngestionJob) -> bool:
+        lease = JobLease(job.path.with_suffix(".lock"))
+        if not lease.acquire():
+            return False
+        lease.release()
+        return True
+
+    def _poll_loop(self) -> None:
+        while not self._closed.wait(self.poll_interval):
+            try:
+                self._poll()
+            except Exception:
+                logging.exception("Polling ingestion jobs failed")
+
+    def _poll(self) -> None:
+        with self._lock:
+            running = list(self.running.values())
+        for job, _ in running:
+            if job.cancel_path.exists() and not job.stop_event.is_set():
+                job.request_stop("cancelled")
+        for job in self.all_jobs():
+            with self._lock:
+                if len(self.running) >= self.max_jobs or self._closed.is_set():
+                    return
+                if job.job_id in self.running:
+                    continue
+            if not (job.status == "queued" or (job.status == "interrupted" and self.resume_interrupted)):
+                continue
+            lease = JobLease(job.path.with_suffix(".lock"))
+            if not lease.acquire():
+                continue
+            # Re-read under the lease: another process may have claimed and finished it meanwhile
+            try:
+                job = self._read(job.path)
+            except KeyError:
+                lease.release()
+                continue
+            claimable = job.status == "queued" or (self.resume_interrupted and job.status in ("running", "cancelling", "interrupted"))
+            if not claimable:
+                lease.release()
+                continue
+            if job.cancel_path.exists():
+                job.finish_as("cancelled")
+                job.cancel_path.unlink(missing_ok=True)
+                lease.release()
+                continue
+            with self._lock:
+                self.running[job.job_id] = (job, lease)
+            logging.info(f"Running ingestion job {job.job_id} (run {job.state['runs'] + 1})")
+            self.executor.submit(self._run, job, lease)
+
+    def _run(self, job: IngestionJob, lease: JobLease) -> None:
+        try:
+            self._ingest(job)
+        finally:
+            job.cancel_path.unlink(missing_ok=True)
+            with self._lock:
+                self.running.pop(job.job_id, None)
+            lease.release()
+
+    def _ingest(self, job: IngestionJob) -> None:
+        job.start()
+        try:
+            from .Ingestion import IngestionPipeline
+
+            pipeline = IngestionPipeline(
+                collection_name=job.state["collection_name"],
+                clients=self.clients or get_clients(),
+                **self.pipeline_options,
+            )
+            blobs = pipeline.list_blobs(directory=job.state["directory"], file_extension=job.state["file_extension"])
+            job.set_total(len(blobs))
+            pending = [blob["name"] for blob in blobs if blob["name"] not in job.completed]
+            if not pending or job.stop_event.is_set():
+                job.finish()
+                return
+            result = pipeline.ingest_from_azure(
+                pending,
+                directory=job.state["directory"],
+                parse_workers=job.state["parse_workers"],
+                on_blob=job.blob_loaded,
+                on_stored=job.batch_stored,
+                stop=job.stop_event,
+            )
+            job.finish(result)
+        except Exception as e:
+            logging.exception(f"Ingestion job {job.job_id} failed")
+            job.finish(error=e)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run queued ingestion jobs from the shared job directory.")
+    parser.add_argument("--directory", default=str(INGESTION_JOB_DIR), help="Job checkpoint directory.")
+    parser.add_argument("--max-jobs", type=int, default=INGESTION_MAX_JOBS, help="Jobs run at the same time.")
+    parser.add_argument("--resume-interrupted", action="store_true", default=INGESTION_RESUME_JOBS,
+                        help="Also pick up jobs whose process stopped or crashed.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Ingestion worker: `python -m backend.database.Jobs`. Runs next to the API, not inside it."""
+    args = parse_args(argv)
+    manager = IngestionJobManager(
+        directory=args.directory,
+        max_jobs=args.max_jobs,
+        run_jobs=True,
+        resume_interrupted=args.resume_interrupted,
+    )
+    logging.info(f"Ingestion worker polling {manager.directory} for jobs")
+    manager.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
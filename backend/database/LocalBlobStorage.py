@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+import hashlib
+
+
+@dataclass
+class LocalBlobProperties:
+    name: str
+    etag: str
+    last_modified: datetime
+    size: int
+
+
+class LocalBlobDownloader:
+    def __init__(self, path: Path):
+        self.path = path
+
+    def readall(self) -> bytes:
+        return self.path.read_bytes()
+
+
+class LocalBlobClient:
+    def __init__(self, root: Path, blob_name: str):
+        self.blob_name = blob_name
+        self.path = root / blob_name
+        self.url = self.path.resolve().as_uri()
+
+    def download_blob(self, **kwargs) -> LocalBlobDownloader:
+        if not self.path.is_file():
+            raise FileNotFoundError(f"Blob '{self.blob_name}' does not exist.")
+        return LocalBlobDownloader(self.path)
+
+
+class LocalContainerClient:
+    """In-process stand-in for `azure.storage.blob.ContainerClient` backed by a local directory.
+
+    Implements the subset of the container API used by `IngestionPipeline` (`list_blobs`,
+    `get_blob_client(...).download_blob().readall()` and `url`), so ingestion can be tested and
+    benchmarked without Azure or Azurite. Blob names are paths relative to `root`.
+
+    Args:
+        root (str | Path): Directory that plays the role of the blob container.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.url = self.root.resolve().as_uri()
+
+    def list_blobs(self, name_starts_with: Optional[str] = None, **kwargs) -> Iterator[LocalBlobProperties]:
+        for path in sorted(self.root.rglob("*")):
+            if not path.is_file():
+                continue
+            name = path.relative_to(self.root).as_posix()
+            if name_starts_with and not name.startswith(name_starts_with):
+                continue
+            stat = path.stat()
+            yield LocalBlobProperties(
+                name=name,
+                etag=hashlib.md5(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest(),
+                last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                size=stat.st_size,
+            )
+
+    def get_blob_client(self, blob: str) -> LocalBlobClient:
+        return LocalBlobClient(self.root, blob)
@@ -0,0 +1,186 @@
+from typing import Hashable, Optional
+import logging
+import threading
+import time
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import ScoredPoint
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+
+class LocalVectorIndex:
+    """In-process mirror of a Qdrant collection for exact top-k cosine search.
+
+    All vectors are scrolled out of the collection once and kept L2-normalized in a contiguous matrix,
+    so a query is one matrix-vector product plus `argpartition`. The mirror is tagged with the
+    collection version it was built from; callers should fall back to Qdrant whenever `is_fresh` is False.
+
+    Args:
+        qdrant_client (QdrantClient): Client used to scroll the collection.
+        collection_name (str): The collection to mirror.
+        dtype (str): "float32" or "float16" storage for the vector matrix. Defaults to "float32".
+        max_bytes (int): Maximum size of the vector matrix. Larger collections are not mirrored. Defaults to 1 GiB.
+        refresh_interval (float | None): Seconds after which the mirror is considered stale. None disables periodic refresh. Defaults to 900.
+        scroll_batch_size (int): Number of points fetched per scroll request. Defaults to 1024.
+        vector_name (str | None): Named vector to mirror, or None for the collection's unnamed vector. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        qdrant_client: QdrantClient,
+        collection_name: str,
+        dtype: str = "float32",
+        max_bytes: int = 1 << 30,
+        refresh_interval: float | None = 900.0,
+        scroll_batch_size: int = 1024,
+        vector_name: Optional[str] = None,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"dtype must be 'float32' or 'float16', got {dtype!r}.")
+        self.qdrant_client = qdrant_client
+        self.collection_name = collection_name
+        self.dtype = np.dtype(dtype)
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self.scroll_batch_size = scroll_batch_size
+        self.vector_name = vector_name
+
+        # (matrix, ids, payloads, version, loaded_at); swapped atomically on refresh
+        self._state: Optional[tuple] = None
+        # Version for which the collection was found too large, so refreshes are not retried per query
+        self._skipped_version: Hashable = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def load(self, version: Hashable = None) -> bool:
+        """Scroll the whole collection into memory.
+
+        Args:
+            version (Hashable, optional): Collection version the mirror is built for.
+
+        Returns:
+            bool: True if the mirror was loaded, False if the collection is too large or empty.
+        """
+        with self._refresh_lock:
+            info = self.qdrant_client.get_collection(collection_name=self.collection_name)
+            points_count = info.points_count or 0
+            vectors = info.config.params.vectors
+            dimensions = vectors[self.vector_name].size if self.vector_name else vectors.size
+            estimated_bytes = points_count * dimensions * self.dtype.itemsize
+            if points_count == 0 or estimated_bytes > self.max_bytes:
+                logging.warning(
+                    f"Not mirroring collection '{self.collection_name}': {points_count} points "
+                    f"({estimated_bytes / 2**20:.1f} MiB, limit {self.max_bytes / 2**20:.1f} MiB)."
+                )
+                self._state = None
+                self._skipped_version = version
+                return False
+
+            started = time.perf_counter()
+            matrix = np.empty((points_count, dimensions), dtype=np.float32)
+            ids: list = []
+            payloads: list[dict] = []
+            offset = None
+            while True:
+                records, offset = self.qdrant_client.scroll(
+                    collection_name=self.collection_name,
+                    limit=self.scroll_batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=[self.vector_name] if self.vector_name else True,
+                )
+                for record in records:
+                    if len(ids) == matrix.shape[0]:
+                        matrix = np.resize(matrix, (max(1, 2 * matrix.shape[0]), dimensions))
+                    vector = record.vector
+                    if isinstance(vector, dict):
+                        # Named vectors, or the unnamed one ("") next to a sparse vector
+                        vector = vector[self.vector_name or ""]
+                    matrix[len(ids)] = vector
+                    ids.append(record.id)
+                    payloads.append(record.payload or {})
+                if offset is None:
+                    break
+
+            matrix = matrix[:len(ids)]
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = np.ascontiguousarray(matrix / norms, dtype=self.dtype)
+
+            self._state = (matrix, ids, payloads, version, time.monotonic())
+            logging.info(
+                f"Mirrored {len(ids)} points from '{self.collection_name}' "
+                f"({matrix.nbytes / 2**20:.1f} MiB) in {time.perf_counter() - started:.2f}s."
+            )
+            return True
+
+    def is_fresh(self, version: Hashable = None) -> bool:
+        """True if the mirror is loaded, built for `version` and younger than `refresh_interval`."""
+        state = self._state
+        if state is None or state[3] != version:
+            return False
+        return self.refresh_interval is None or time.monotonic() - state[4] <= self.refresh_interval
+
+    def refresh_in_background(self, version: Hashable = None) -> None:
+        """Reload the mirror on a daemon thread unless a refresh is already running."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        if self._state is None and version is not None and version == self._skipped_version:
+            return
+
+        def refresh():
+            try:
+                self.load(version=version)
+            except Exception as e:
+                logging.warning(f"Could not refresh local mirror of '{self.collection_name}': {e}")
+
+        self._refresh_thread = threading.Thread(target=refresh, name="local-index-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def search(self, query_embedding: list[float], top_k: int, score_threshold: float | None = None) -> list[ScoredPoint]:
+        """Exact top-k cosine search with Qdrant's `score_threshold` semantics.
+
+        Raises:
+            ValueError: If the mirror is not loaded or the embedding has the wrong length.
+        """
+        state = self._state
+        if state is None:
+            raise ValueError(f"Local mirror of '{self.collection_name}' is not loaded.")
+        matrix, ids, payloads, _, _ = state
+        if len(query_embedding) != matrix.shape[1]:
+            raise ValueError(f"Query embedding must be of length {matrix.shape[1]}, got {len(query_embedding)}.")
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        scores = (matrix @ (query / norm).astype(self.dtype)).astype(np.float32)
+
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if score_threshold is not None:
+            top = top[scores[top] >= score_threshold]
+
+        return [
+            ScoredPoint(id=ids[i], version=0, score=float(scores[i]), payload=payloads[i])
+            for i in top
+        ]
+
+    def stats(self) -> dict:
+        state = self._state
+        if state is None:
+            return {"loaded": False}
+        matrix, _, _, version, loaded_at = state
+        return {
+            "loaded": True,
+            "points": matrix.shape[0],
+            "bytes": matrix.nbytes,
+            "dtype": str(matrix.dtype),
+            "version": version,
+            "age_seconds": time.monotonic() - loaded_at,
+        }
@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import Optional
+import json
+import logging
+import os
+import threading
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+
+class IngestionManifest:
+    """JSON manifest of the blobs ingested into a collection.
+
+    Each entry records the blob's etag and last-modified time together with the content hashes of
+    its chunks, so a later sync can skip unchanged blobs and work out which points to delete.
+
+    Args:
+        path (str | Path): Location of the manifest file. It is created on the first `save`.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.blobs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.blobs = json.load(f).get("blobs", {})
+            logging.info(f"Loaded manifest with {len(self.blobs)} blobs from {self.path}")
+
+    def is_current(self, blob_path: str, etag: Optional[str], last_modified: Optional[str]) -> bool:
+        """True if the blob was ingested before and has not changed since."""
+        entry = self.blobs.get(blob_path)
+        return entry is not None and entry.get("etag") == etag and entry.get("last_modified") == last_modified
+
+    def chunk_hashes(self, blob_path: str) -> list[str]:
+        return self.blobs.get(blob_path, {}).get("chunks", [])
+
+    def update(self, blob_path: str, etag: Optional[str], last_modified: Optional[str], chunk_hashes: list[str]) -> None:
+        with self._lock:
+            self.blobs[blob_path] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "chunks": chunk_hashes,
+            }
+
+    def remove(self, blob_path: str) -> list[str]:
+        """Forget a blob and return the chunk hashes it had."""
+        with self._lock:
+            return self.blobs.pop(blob_path, {}).get("chunks", [])
+
+    def blob_paths(self, prefix: str = "") -> list[str]:
+        return [path for path in self.blobs if path.startswith(prefix)]
+
+    def save(self) -> None:
+        """Write the manifest atomically so a crash never leaves a half-written file."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"blobs": self.blobs}, f)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from typing import Optional
+import math
+from qdrant_client import models
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """Vector layout and search settings for a Qdrant collection.
+
+    Args:
+        name (str): Profile name, as used in `QDRANT_COLLECTION_PROFILE`.
+        dimensions (int): Length of the stored (and queried) embeddings. Defaults to 1536.
+        quantization (str | None): None, "int8" (scalar) or "binary". Quantized vectors are kept in RAM,
+            originals on disk, and results are rescored against the originals. Defaults to None.
+        prefetch_dimensions (int | None): If set, a Matryoshka-truncated copy of each embedding of this
+            length is stored as a second vector and searched first; candidates are then rescored with
+            the full embedding. Defaults to None.
+        oversampling (float): Candidates fetched per requested result before rescoring. Defaults to 3.0.
+        sparse (bool): Store a BM25 sparse vector next to the dense one(s) for hybrid and lexical search. Defaults to True.
+    """
+
+    name: str
+    dimensions: int = 1536
+    quantization: Optional[str] = None
+    prefetch_dimensions: Optional[int] = None
+    oversampling: float = 3.0
+    sparse: bool = True
+
+    # Vector names used when the collection holds both a full and a truncated vector
+    FULL_VECTOR = "full"
+    PREFETCH_VECTOR = "mrl"
+    SPARSE_VECTOR = "bm25"
+
+    def __post_init__(self):
+        if self.quantization not in (None, "int8", "binary"):
+            raise ValueError(f"quantization must be None, 'int8' or 'binary', got {self.quantization!r}.")
+        if self.prefetch_dimensions is not None and not 0 < self.prefetch_dimensions < self.dimensions:
+            raise ValueError(f"prefetch_dimensions must be between 0 and {self.dimensions}, got {self.prefetch_dimensions}.")
+
+    @property
+    def vector_name(self) -> Optional[str]:
+        """Name of the full-dimension vector, or None for a collection with a single unnamed vector."""
+        return self.FULL_VECTOR if self.prefetch_dimensions else None
+
+    def vectors_config(self) -> models.VectorParams | dict[str, models.VectorParams]:
+        full = models.VectorParams(
+            size=self.dimensions,
+            distance=models.Distance.COSINE,
+            # With quantization the originals are only read for rescoring, so they can live on disk
+            on_disk=True if self.quantization else None,
+        )
+        if not self.prefetch_dimensions:
+            return full
+        return {
+            self.FULL_VECTOR: full,
+            self.PREFETCH_VECTOR: models.VectorParams(size=self.prefetch_dimensions, distance=models.Distance.COSINE),
+        }
+
+    def sparse_vectors_config(self) -> Optional[dict[str, models.SparseVectorParams]]:
+        if not self.sparse:
+            return None
+        return {self.SPARSE_VECTOR: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+
+    def quantization_config(self) -> Optional[models.ScalarQuantization | models.BinaryQuantization]:
+        if self.quantization == "int8":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        if not self.quantization:
+            return None
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=True, oversampling=self.oversampling)
+        )
+
+    def point_vector(
+        self, embedding: list[float], sparse_vector: Optional[models.SparseVector] = None
+    ) -> list[float] | dict[str, list[float] | models.SparseVector]:
+        """Vector(s) to store for an embedding and, if the collection has one, its sparse vector."""
+        if not self.prefetch_dimensions:
+            if sparse_vector is None:
+                return embedding
+            # "" is the collection's unnamed dense vector
+            vectors = {"": embedding}
+        else:
+            vectors = {self.FULL_VECTOR: embedding, self.PREFETCH_VECTOR: self.truncate(embedding)}
+        if sparse_vector is not None:
+            vectors[self.SPARSE_VECTOR] = sparse_vector
+        return vectors
+
+    def truncate(self, embedding: list[float]) -> list[float]:
+        """Matryoshka truncation: keep the first `prefetch_dimensions` values and re-normalize."""
+        head = embedding[:self.prefetch_dimensions]
+        norm = math.sqrt(sum(x * x for x in head)) or 1.0
+        return [x / norm for x in head]
+
+    def query_kwargs(self, query_embedding: list[float], top_k: int) -> dict:
+        """Keyword arguments for `query_points` that implement this profile's search."""
+        kwargs = {"query": query_embedding, "limit": top_k}
+        if not self.prefetch_dimensions:
+            kwargs["search_params"] = self.search_params()
+        else:
+            # Rescoring the prefetched candidates against the full vectors is exact
+            kwargs["using"] = self.FULL_VECTOR
+            kwargs["prefetch"] = models.Prefetch(
+                query=self.truncate(query_embedding),
+                using=self.PREFETCH_VECTOR,
+                limit=math.ceil(top_k * self.oversampling),
+                params=self.search_params(),
+            )
+        return kwargs
+
+    def hybrid_query_kwargs(
+        self,
+        query_embedding: list[float],
+        sparse_query: models.SparseVector,
+        top_k: int,
+        score_threshold: Optional[float] = None,
+    ) -> dict:
+        """Keyword arguments for `query_points` that fuse the dense search and the sparse search with RRF.
+
+        `score_threshold` applies to the dense candidates only; fused RRF scores are rank-based.
+        """
+        limit = math.ceil(top_k * self.oversampling)
+        dense = self.query_kwargs(query_embedding, limit)
+        return {
+            "prefetch": [
+                models.Prefetch(
+                    query=dense["query"],
+                    using=dense.get("using"),
+                    prefetch=dense.get("prefetch"),
+                    params=dense.get("search_params"),
+                    limit=limit,
+                    score_threshold=score_threshold,
+                ),
+                models.Prefetch(query=sparse_query, using=self.SPARSE_VECTOR, limit=limit),
+            ],
+            "query": models.FusionQuery(fusion=models.Fusion.RRF),
+            "limit": top_k,
+        }
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        CollectionProfile("default"),
+        CollectionProfile("int8", quantization="int8"),
+        CollectionProfile("binary", quantization="binary", oversampling=4.0),
+        CollectionProfile("mrl256", prefetch_dimensions=256, oversampling=4.0),
+        CollectionProfile("mrl512-int8", prefetch_dimensions=512, quantization="int8"),
+        CollectionProfile("dim512-int8", dimensions=512, quantization="int8"),
+    )
+}
+
+
+def get_profile(profile: str | CollectionProfile) -> CollectionProfile:
+    """Resolve a profile name to its `CollectionProfile`."""
+    if isinstance(profile, CollectionProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown collection profile '{profile}'. Available: {', '.join(PROFILES)}.") from None
@@ -0,0 +1,82 @@
+from typing import Callable, TypeVar
+import logging
+import random
+import threading
+import time
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+T = TypeVar("T")
+
+# Transport-level failures that are worth retrying even without an HTTP status
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "ResponseHandlingException", "ConnectError", "ReadTimeout"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket that refills continuously at `rate_per_minute`.
+
+    Args:
+        rate_per_minute (float): Tokens added per minute; also the bucket capacity.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        if rate_per_minute <= 0:
+            raise ValueError(f"rate_per_minute must be positive, got {rate_per_minute}.")
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until `amount` tokens are available and take them. Returns the seconds waited."""
+        # A request larger than the bucket would never fit; let it through once the bucket is full
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limiting (429), server errors (5xx) and connection failures."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def retry_with_backoff(
+    fn: Callable[[], T],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    description: str = "request",
+) -> T:
+    """Call `fn`, retrying retryable errors with exponential backoff and full jitter.
+
+    Raises:
+        Exception: The last error if it is not retryable or `max_retries` is exhausted.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            attempt += 1
+            logging.warning(f"{description} failed ({e}); retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
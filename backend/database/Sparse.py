@@ -0,0 +1,49 @@
+from collections import Counter
+import hashlib
+import re
+from qdrant_client import models
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.&'-][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how in is it its of on or that the this to was were "
+    "what when where which who why will with".split()
+)
+
+
+class BM25Encoder:
+    """Encodes text as BM25 sparse vectors for Qdrant.
+
+    Documents get the BM25 term-frequency weight of each term; queries get weight 1 per term. The IDF
+    part is applied by Qdrant at query time (`Modifier.IDF` on the sparse vector), so document vectors
+    never need re-encoding when the corpus changes. Terms are mapped to indices by a stable hash.
+
+    Args:
+        k1 (float): Term-frequency saturation. Defaults to 1.2.
+        b (float): Document-length normalization. Defaults to 0.75.
+        avg_doc_length (float): Expected number of terms per chunk. Defaults to 150.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 150.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    def tokenize(self, text: str) -> list[str]:
+        return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+    def term_index(self, term: str) -> int:
+        return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little")
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        terms = self.tokenize(text)
+        norm = self.k1 * (1 - self.b + self.b * len(terms) / self.avg_doc_length)
+        weights: dict[int, float] = {}
+        for term, tf in Counter(terms).items():
+            index = self.term_index(term)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        return models.SparseVector(indices=list(weights), values=list(weights.values()))
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        indices = sorted({self.term_index(term) for term in self.tokenize(text)})
+        return models.SparseVector(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,129 @@
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+import heapq
+import logging
+import queue
+import threading
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Marks the end of a stage's input (one per worker) and of each worker's output
+_DONE = object()
+
+
+class StageError(Exception):
+    """Raised by `bounded_map` when iterating its input fails; the stage stops."""
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 4,
+    buffer: Optional[int] = None,
+    name: str = "stage",
+) -> Iterator[tuple[T, Optional[R], Optional[Exception]]]:
+    """Apply `fn` to `items` on `workers` threads, yielding `(item, result, error)` in input order.
+
+    The stage is connected to its input and to its consumer by bounded queues: `items` is only pulled
+    while fewer than `workers` items wait for a thread, and workers block once `buffer` results wait
+    for the consumer. Results that finish ahead of an earlier item wait in a reorder heap, and `items`
+    is only pulled while fewer than `2 * workers + buffer` items are between the input and the
+    consumer, so one slow item holds up the stage instead of growing the heap. That caps what the
+    stage holds however long `items` is, and `items` may itself be another `bounded_map`, so stages
+    chain into a pipeline whose memory is set by its queue sizes instead of by the input. A failing
+    `fn` yields its exception as `error`; a failing `items` raises `StageError`. Closing the generator
+    early stops the workers.
+
+    Args:
+        fn (Callable[[T], R]): Work per item. Runs on a worker thread.
+        items (Iterable[T]): Input, possibly lazy. Iterated by a single feeder thread.
+        workers (int): Worker threads. Defaults to 4.
+        buffer (Optional[int]): Results waiting for the consumer. Defaults to `2 * workers`.
+        name (str): Thread name prefix, for logs and thread dumps. Defaults to "stage".
+    """
+    workers = max(1, workers)
+    inbox: queue.Queue = queue.Queue(maxsize=workers)
+    outbox: queue.Queue = queue.Queue(maxsize=max(1, buffer or 2 * workers))
+    # Items pulled from `items` but not yet yielded, in the queues, on the workers or in the reorder heap
+    window = threading.Semaphore(2 * workers + outbox.maxsize)
+    stopped = threading.Event()
+    feed_error: list[BaseException] = []
+
+    def put(target: queue.Queue, value) -> bool:
+        # Wake up regularly so a closed consumer does not leave threads blocked on a full queue
+        while not stopped.is_set():
+            try:
+                target.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reserve() -> bool:
+        while not stopped.is_set():
+            if window.acquire(timeout=0.1):
+                return True
+        return False
+
+    def feed() -> None:
+        try:
+            for index, item in enumerate(items):
+                if not (reserve() and put(inbox, (index, item))):
+                    return
+        except BaseException as e:
+            feed_error.append(e)
+        finally:
+            # Stop an upstream stage that is no longer needed (no-op if `items` is exhausted or not a generator)
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+        for _ in range(workers):
+            put(inbox, _DONE)
+
+    def work() -> None:
+        while not stopped.is_set():
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            index, item = item
+            try:
+                outcome = (item, fn(item), None)
+            except Exception as e:
+                outcome = (item, None, e)
+            if not put(outbox, (index, outcome)):
+                return
+        put(outbox, _DONE)
+
+    threads = [threading.Thread(target=feed, name=f"{name}-feed", daemon=True)]
+    threads += [threading.Thread(target=work, name=f"{name}-{number}", daemon=True) for number in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        finished = 0
+        following = 0
+        # (index, outcome) of results that finished before an earlier item; indexes are unique
+        ahead: list[tuple[int, tuple]] = []
+        while finished < workers:
+            entry = outbox.get()
+            if entry is _DONE:
+                finished += 1
+                continue
+            heapq.heappush(ahead, entry)
+            while ahead and ahead[0][0] == following:
+                _, outcome = heapq.heappop(ahead)
+                following += 1
+                window.release()
+                yield outcome
+        if feed_error:
+            raise StageError(f"Reading the input of '{name}' failed: {feed_error[0]}") from feed_error[0]
+    finally:
+        stopped.set()
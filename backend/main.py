@@ -1,13 +1,16 @@
 from .server.Chat import Chat
 from .database.Agent import RAG
-from qdrant_client import QdrantClient, models
-from config import QDRANT_URL,QDRANT_API_KEY, OPENAI_API_KEY, QDRANT_COLLECTION_NAME
+from .Clients import get_clients
+from qdrant_client import models
+from config import QDRANT_URL, OPENAI_API_KEY, QDRANT_COLLECTION_NAME
 
 # # System configurations
-client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+client = get_clients().qdrant(QDRANT_URL)
 
 # agent = RAG(collection_name=QDRANT_COLLECTION_NAME, directory="Finance", openai_api_key=OPENAI_API_KEY)
 # agent.InitiatePipeline(qdrant_url=QDRANT_URL)
+# Long ingestions run better as resumable background jobs: queue them with POST /api/ingest and run
+# them in the ingestion worker, `python -m backend.database.Jobs`
 
 # client.delete_collection(collection_name=QDRANT_COLLECTION_NAME)  # For testing purposes only
 # print("Collection deleted for testing purposes.")
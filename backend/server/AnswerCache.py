@@ -0,0 +1,130 @@
+from typing import Hashable, Iterable, Optional
+import logging
+import threading
+import time
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed by query embedding.
+
+    A stored answer is returned for a new question when the cosine similarity between the two query
+    embeddings is at least `threshold` and both questions retrieved the same context documents.
+    Embeddings live in a preallocated float32 matrix, so a lookup is one matrix-vector product.
+
+    Args:
+        capacity (int): Maximum number of cached answers. The least recently used entry is evicted first. Defaults to 2048.
+        dimensions (int): Length of the query embeddings. Defaults to 1536.
+        threshold (float): Minimum cosine similarity for a hit. Defaults to 0.95.
+    """
+
+    def __init__(self, capacity: int = 2048, dimensions: int = 1536, threshold: float = 0.95):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}.")
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}.")
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self.threshold = threshold
+
+        self._vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._answers: list[Optional[str]] = [None] * capacity
+        self._context_ids: list[Optional[frozenset]] = [None] * capacity
+        self._version: Hashable = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, embedding: list[float], context_ids: Iterable, version: Hashable = None) -> Optional[str]:
+        """Return a cached answer for a near-duplicate question with the same context, or None."""
+        query = self._normalize(embedding)
+        context_key = frozenset(str(i) for i in context_ids)
+
+        with self._lock:
+            self._check_version(version)
+            if query is None or not self._valid.any():
+                self.misses += 1
+                return None
+
+            scores = self._vectors @ query
+            scores[~self._valid] = -np.inf
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for slot in candidates[np.argsort(scores[candidates])[::-1]]:
+                if self._context_ids[slot] == context_key:
+                    self._last_used[slot] = time.monotonic()
+                    self.hits += 1
+                    return self._answers[slot]
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding: list[float], context_ids: Iterable, answer: str, version: Hashable = None) -> None:
+        """Cache `answer` for the question embedding and its retrieved context ids."""
+        query = self._normalize(embedding)
+        if query is None:
+            return
+        context_key = frozenset(str(i) for i in context_ids)
+
+        with self._lock:
+            self._check_version(version)
+            free = np.flatnonzero(~self._valid)
+            if free.size:
+                slot = free[0]
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+
+            self._vectors[slot] = query
+            self._valid[slot] = True
+            self._last_used[slot] = time.monotonic()
+            self._answers[slot] = answer
+            self._context_ids[slot] = context_key
+
+    def invalidate(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": int(self._valid.sum()),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    # Helper methods
+    def _normalize(self, embedding: list[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dimensions,):
+            raise ValueError(f"Embedding must be of length {self.dimensions}, got {vector.size}.")
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def _check_version(self, version: Hashable) -> None:
+        if version != self._version:
+            if self._valid.any():
+                logging.info(f"Collection version changed to {version}. Clearing answer cache.")
+            self._clear()
+            self._version = version
+
+    def _clear(self) -> None:
+        self._valid[:] = False
+        self._last_used[:] = 0.0
+        self._answers = [None] * self.capacity
+        self._context_ids = [None] * self.capacity
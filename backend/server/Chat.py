@@ -1,5 +1,14 @@
+from typing import AsyncIterator, ContextManager
+import asyncio
 from ..database.Agent import RAG
-from openai import OpenAI
+from ..database.Cache import LRUCache
+from .AnswerCache import SemanticAnswerCache
+from .ContextPacker import ContextPacker
+from .History import HistoryPlan, HistoryWindow
+from ..Clients import ClientRegistry, get_clients
+from ..Coalescer import RequestCoalescer, SingleFlight
+from ..Metrics import Metrics, get_metrics
+from qdrant_client.models import ScoredPoint
 from config import OPENAI_API_KEY, QDRANT_COLLECTION_NAME
 import logging
 
@@ -16,22 +25,76 @@ class Chat:
         model (str): The OpenAI model to use for generating responses. Default is "gpt-5-mini".
         key (str): The OpenAI API key for authentication. Default is taken from config.
         user (str): Optional user identifier for containerized sessions.
+        embedding_cache_size (int): Maximum number of cached query embeddings. Defaults to 4096.
+        embedding_cache_ttl (float): Seconds a cached query embedding stays valid. Defaults to 3600.
+        answer_cache_threshold (float | None): Cosine similarity above which a cached answer is reused. None disables the answer cache. Defaults to 0.95.
+        answer_cache_capacity (int): Maximum number of cached answers. Defaults to 2048.
+        context_tokens (int): Token budget for the retrieved context passed to the model. Defaults to 3000.
+        history_tokens (int): Token budget for conversation history, summary included. Defaults to 1500.
+        history_summary_tokens (int): Part of `history_tokens` reserved for the summary of older turns. Defaults to 300.
+        summary_model (str | None): Model used to summarize older turns. Defaults to `model`.
+        clients (ClientRegistry | None): Source of the shared OpenAI clients. Defaults to the process-wide registry.
+        embedding_batch_size (int): Concurrent async query embeddings sent as one request. 1 disables batching. Defaults to 32.
+        embedding_batch_delay (float): Seconds a query embedding may wait for others to batch with. Defaults to 0.005.
+        single_flight (bool): Answer identical standalone questions asked concurrently only once. Defaults to True.
+        metrics (Metrics | None): Where stage latencies and token counts are recorded. Defaults to the process-wide metrics.
     """
     
     def __init__(
         self,
         model: str = "gpt-5.1",
         key: str = OPENAI_API_KEY,
-        user: str = None, rag_agent: RAG | None = None
+        user: str = None, rag_agent: RAG | None = None,
+        embedding_cache_size: int = 4096,
+        embedding_cache_ttl: float = 3600.0,
+        answer_cache_threshold: float | None = 0.95,
+        answer_cache_capacity: int = 2048,
+        context_tokens: int = 3000,
+        history_tokens: int = 1500,
+        history_summary_tokens: int = 300,
+        summary_model: str | None = None,
+        clients: ClientRegistry | None = None,
+        embedding_batch_size: int = 32,
+        embedding_batch_delay: float = 0.005,
+        single_flight: bool = True,
+        metrics: Metrics | None = None,
         ):
         if not key:
             raise ValueError("OpenAI API key must be provided.")
         if not model:
             raise ValueError("Model name must be provided.")
-        self.client = OpenAI(api_key=key)
+        clients = clients or get_clients()
+        self.client = clients.openai(key)
+        self.async_client = clients.async_openai(key)
         self.model = model
         self.user = user
         self.agent = rag_agent
+        # Query embeddings must match the collection profile of the RAG agent
+        self.dimensions = rag_agent.profile.dimensions if rag_agent is not None else 1536
+        # Query embedding cache: (model, normalized query) -> embedding
+        self.embedding_cache = LRUCache(maxsize=embedding_cache_size, ttl=embedding_cache_ttl)
+        # Semantic answer cache: near-duplicate question + same retrieved context -> stored answer
+        self.answer_cache = (
+            SemanticAnswerCache(capacity=answer_cache_capacity, dimensions=self.dimensions, threshold=answer_cache_threshold)
+            if answer_cache_threshold is not None else None
+        )
+        # Merges overlapping chunks and fills the context up to a token budget
+        self.context_packer = ContextPacker(model=model, max_tokens=context_tokens)
+        # Recent turns verbatim, older turns as a rolling summary cached per conversation
+        self.summary_model = summary_model or model
+        self.history = HistoryWindow(
+            count_tokens=self.context_packer.count_tokens,
+            max_tokens=history_tokens,
+            summary_tokens=history_summary_tokens,
+        )
+        # Concurrent async query embeddings are coalesced into one request per embedding model
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_batch_delay = embedding_batch_delay
+        self.embedding_coalescers: dict[str, RequestCoalescer[str, list[float]]] = {}
+        # Identical questions in flight at the same time: the first one is answered, the others wait for it
+        self.in_flight = SingleFlight() if single_flight else None
+        # Per-stage latency histograms, token and error counters
+        self.metrics = metrics or get_metrics()
 
 # System configuration variables
     content_not_found = "I'm sorry, but I couldn't find any relevant information to answer your question."
@@ -41,45 +104,341 @@ class Chat:
         f"If you don't have an answer, respond with: The information is not available in the provided context."
     )
 
+    SUMMARY_INSTRUCTIONS = (
+        "Update the summary of a conversation between a user and a Q&A assistant with the new messages. "
+        "Keep the facts, names, figures and open questions needed to understand follow-up questions. "
+        "Reply with the updated summary only, in at most 150 words."
+    )
+
 # Main methods
-    def model_response(self, question: str, context: str, system: str = INSTRUCTIONS) -> str:
+    def model_response(self, question: str, context: str, system: str = INSTRUCTIONS, history: HistoryPlan | None = None) -> str:
         # Format user input with context
-        response = self.client.responses.create(
-            model=self.model,
-            input=[
-                {"role": "system", "content": system},
-                {"role": "developer", "content": f"Context:\n{context}"},
-                {"role": "user", "content": question.strip()},
-            ],
-        )
-        return response.output_text.replace("\n", " ").strip()
+        with self.metrics.stage("llm"):
+            response = self.client.responses.create(
+                model=self.model,
+                input=self.build_input(question=question, context=context, system=system, history=history),
+            )
+        self.metrics.record_usage(self.model, response.usage)
+        return self.clean_response(response.output_text)
     
-    def query_pipeline(self, query:str) -> str:
-        # Step 1: Embed the user query
-        embeddings = self.embed_queries(query=query)
+    def query_pipeline(self, query:str, conversation_id:str|None=None, history:list[dict]|None=None) -> str:
+        """Answer `query`. `history` holds the earlier messages of the conversation (oldest first, with `seq`).
+
+        Concurrent calls with the same standalone question and collection version share one answer;
+        the calls that wait for another one's answer record the wait as their "coalesced" stage.
+        """
+        # Without an agent the pipeline raises its ValueError; there is no collection version to key on
+        if self.in_flight is not None and not history and self.agent is not None:
+            key = (self.normalize_query(query), self.agent.collection_version())
+            return self.in_flight.do_sync(key, lambda: self.answer_query(query=query), waiting=self.coalesced_stage)
+        return self.answer_query(query=query, conversation_id=conversation_id, history=history)
+
+    def answer_query(self, query:str, conversation_id:str|None=None, history:list[dict]|None=None) -> str:
+        """Run the full pipeline for `query`, without sharing in-flight answers."""
+        # Step 0: Fit the conversation history into its token budget
+        history_plan = self.history_plan(conversation_id=conversation_id, messages=history)
+
+        # Step 1: Keyword and title queries are answered lexically, without an embedding
+        embeddings = None
+        documents = self.lexical_documents(query=query, limit=10)
 
-        # Step 2: Retrieve and format relevant context using the RAG agent
-        formatted_context = self.retrieve_context(embeddings=embeddings, limit=10)
+        # Step 2: Otherwise embed the user query and retrieve relevant documents using the RAG agent
+        if documents is None:
+            embeddings = self.embed_queries(query=query)
+            documents = self.retrieve_documents(embeddings=embeddings, limit=10, query=query)
 
-        # Step 3: Generate final response using LLM with context
-        final_response = self.model_response(question=query, context=formatted_context)
+        # Step 3: Reuse the answer to a near-duplicate question with the same context (standalone questions only)
+        version = self.agent.collection_version()
+        answer_key = embeddings if history_plan is None else None
+        cached_response = self.cached_answer(embeddings=answer_key, documents=documents, version=version)
+        if cached_response is not None:
+            return cached_response
+
+        # Step 4: Generate final response using LLM with context
+        formatted_context = self.format_context(documents=documents)
+        final_response = self.model_response(question=query, context=formatted_context, history=history_plan)
+        self.store_answer(embeddings=answer_key, documents=documents, answer=final_response, version=version)
         
         logging.info("Generated final response for user query.")
         return final_response
+
+# Async methods
+    async def amodel_response(self, question: str, context: str, system: str = INSTRUCTIONS, history: HistoryPlan | None = None) -> str:
+        with self.metrics.stage("llm"):
+            response = await self.async_client.responses.create(
+                model=self.model,
+                input=self.build_input(question=question, context=context, system=system, history=history),
+            )
+        self.metrics.record_usage(self.model, response.usage)
+        return self.clean_response(response.output_text)
+
+    async def astream_model_response(self, question: str, context: str, system: str = INSTRUCTIONS, history: HistoryPlan | None = None) -> AsyncIterator[str]:
+        """Stream the model answer as text deltas from the Responses API."""
+        with self.metrics.stage("llm"):
+            stream = await self.async_client.responses.create(
+                model=self.model,
+                input=self.build_input(question=question, context=context, system=system, history=history),
+                stream=True,
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    self.metrics.record_usage(self.model, event.response.usage)
+
+    async def aquery_pipeline(self, query:str, conversation_id:str|None=None, history:list[dict]|None=None) -> str:
+        """Async version of `query_pipeline`. Every stage awaits network I/O instead of blocking a worker thread.
+
+        Concurrent calls with the same standalone question and collection version share one answer;
+        the calls that wait for another one's answer record the wait as their "coalesced" stage.
+        """
+        if self.in_flight is not None and not history and self.agent is not None:
+            key = (self.normalize_query(query), await self.agent.acollection_version())
+            return await self.in_flight.do(key, lambda: self.aanswer_query(query=query), waiting=self.coalesced_stage)
+        return await self.aanswer_query(query=query, conversation_id=conversation_id, history=history)
+
+    async def aanswer_query(self, query:str, conversation_id:str|None=None, history:list[dict]|None=None) -> str:
+        """Async version of `answer_query`. Summarizing older history runs concurrently with retrieval."""
+        history_plan, (embeddings, documents) = await asyncio.gather(
+            self.ahistory_plan(conversation_id=conversation_id, messages=history),
+            self.aretrieve(query=query, limit=10),
+        )
+
+        version = await self.agent.acollection_version()
+        answer_key = embeddings if history_plan is None else None
+        cached_response = self.cached_answer(embeddings=answer_key, documents=documents, version=version)
+        if cached_response is not None:
+            return cached_response
+
+        formatted_context = self.format_context(documents=documents)
+        final_response = await self.amodel_response(question=query, context=formatted_context, history=history_plan)
+        self.store_answer(embeddings=answer_key, documents=documents, answer=final_response, version=version)
+
+        logging.info("Generated final response for user query.")
+        return final_response
+
+    async def aembed_queries(self, query:str, model:str="text-embedding-3-small") -> list[float]:
+        cache_key = (model, self.normalize_query(query))
+        embedding = self.embedding_cache.get(cache_key)
+        if embedding is not None:
+            return embedding
+
+        with self.metrics.stage("embed"):
+            embedding = await self.embedding_coalescer(model).submit(query)
+        self.embedding_cache.set(cache_key, embedding)
+        logging.info(f"Generated embedding for query of length {len(query)}.")
+        return embedding
+
+    async def aembed_batch(self, queries: list[str], model: str = "text-embedding-3-small") -> list[list[float]]:
+        """Embed several queries in one request; duplicates are sent once."""
+        unique = list(dict.fromkeys(queries))
+        response = await self.async_client.embeddings.create(model=model, input=unique, dimensions=self.dimensions)
+        self.metrics.record_usage(model, response.usage)
+        embeddings = {unique[item.index]: item.embedding for item in response.data}
+        return [embeddings[query] for query in queries]
+
+    def embedding_coalescer(self, model: str) -> RequestCoalescer[str, list[float]]:
+        coalescer = self.embedding_coalescers.get(model)
+        if coalescer is None:
+            coalescer = self.embedding_coalescers[model] = RequestCoalescer(
+                handler=lambda queries: self.aembed_batch(queries, model=model),
+                max_batch_size=self.embedding_batch_size,
+                max_delay=self.embedding_batch_delay,
+                name="Embedding batch",
+            )
+        return coalescer
+
+    async def aretrieve_context(self, embeddings: list[float], limit:int=10, max_tokens:int|None=None, display_info:bool=False) -> str:
+        """Async version of `retrieve_context`. See `retrieve_context` for arguments."""
+        documents = await self.aretrieve_documents(embeddings=embeddings, limit=limit)
+        return self.format_context(documents=documents, max_tokens=max_tokens, display_info=display_info)
+
+    async def aretrieve_documents(self, embeddings: list[float], limit:int=10, query:str|None=None) -> list[ScoredPoint]:
+        if self.agent is None:
+            raise ValueError("RAG agent is not initialized. Cannot retrieve context.")
+        with self.metrics.stage("search"):
+            return await self.agent.asimilarity_search(query_embedding=embeddings, top_k=limit, query_text=query)
+
+    async def alexical_documents(self, query:str, limit:int=10) -> list[ScoredPoint] | None:
+        if self.agent is None:
+            raise ValueError("RAG agent is not initialized. Cannot retrieve context.")
+        with self.metrics.stage("lexical"):
+            return await self.agent.alexical_search(query=query, top_k=limit)
+
+    async def aretrieve(self, query:str, limit:int=10) -> tuple[list[float] | None, list[ScoredPoint]]:
+        """Lexical fast path, else embed and search. Returns `(embeddings, documents)`; embeddings is None for lexical hits."""
+        documents = await self.alexical_documents(query=query, limit=limit)
+        if documents is not None:
+            return None, documents
+        embeddings = await self.aembed_queries(query=query)
+        return embeddings, await self.aretrieve_documents(embeddings=embeddings, limit=limit, query=query)
+
+    async def ahistory_plan(self, conversation_id:str|None, messages:list[dict]|None) -> HistoryPlan | None:
+        """Async version of `history_plan`."""
+        if not messages:
+            return None
+        plan = self.history.plan(conversation_id=conversation_id, messages=messages)
+        if plan.to_summarize:
+            try:
+                summary = await self.asummarize_history(summary=plan.summary, messages=plan.to_summarize)
+            except Exception as e:
+                logging.warning(f"Could not summarize conversation history, dropping older turns: {e}")
+            else:
+                plan.summary = summary
+                self.store_summary(conversation_id=conversation_id, plan=plan)
+        return plan
+
+    async def asummarize_history(self, summary:str|None, messages:list[dict]) -> str:
+        with self.metrics.stage("history"):
+            response = await self.async_client.responses.create(
+                model=self.summary_model,
+                input=self.build_summary_input(summary=summary, messages=messages),
+            )
+        self.metrics.record_usage(self.summary_model, response.usage)
+        return self.context_packer.truncate(response.output_text, self.history.summary_tokens)
+
+    async def astream_pipeline(
+        self, query:str, limit:int=10, conversation_id:str|None=None, history:list[dict]|None=None
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """Run retrieval, then stream the answer.
+
+        Yields `(event, data)` pairs: one `retrieval` event with the retrieved document ids and scores,
+        followed by a `token` event for every text delta produced by the model.
+        """
+        history_plan, (embeddings, documents) = await asyncio.gather(
+            self.ahistory_plan(conversation_id=conversation_id, messages=history),
+            self.aretrieve(query=query, limit=limit),
+        )
+        yield "retrieval", {"documents": self.document_scores(documents)}
+
+        version = await self.agent.acollection_version()
+        answer_key = embeddings if history_plan is None else None
+        cached_response = self.cached_answer(embeddings=answer_key, documents=documents, version=version)
+        if cached_response is not None:
+            yield "token", {"text": cached_response}
+            return
+
+        parts: list[str] = []
+        formatted_context = self.format_context(documents=documents)
+        async for delta in self.astream_model_response(question=query, context=formatted_context, history=history_plan):
+            parts.append(delta)
+            yield "token", {"text": delta}
+        self.store_answer(embeddings=answer_key, documents=documents, answer=self.clean_response("".join(parts)), version=version)
     
     # Helper methods        
+    def build_input(self, question: str, context: str, system: str = INSTRUCTIONS, history: HistoryPlan | None = None) -> list[dict]:
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "developer", "content": f"Context:\n{context}"},
+        ]
+        if history is not None:
+            if history.summary:
+                messages.append({"role": "developer", "content": f"Summary of the earlier conversation:\n{history.summary}"})
+            messages.extend({"role": m["role"], "content": m["content"]} for m in history.recent)
+        messages.append({"role": "user", "content": question.strip()})
+        return messages
+
+    def build_summary_input(self, summary: str | None, messages: list[dict]) -> list[dict]:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        return [
+            {"role": "system", "content": self.SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"},
+        ]
+
+    def history_plan(self, conversation_id: str | None, messages: list[dict] | None) -> HistoryPlan | None:
+        """Fit `messages` into the history budget, summarizing turns that left the verbatim window. None without history."""
+        if not messages:
+            return None
+        plan = self.history.plan(conversation_id=conversation_id, messages=messages)
+        if plan.to_summarize:
+            try:
+                summary = self.summarize_history(summary=plan.summary, messages=plan.to_summarize)
+            except Exception as e:
+                logging.warning(f"Could not summarize conversation history, dropping older turns: {e}")
+            else:
+                plan.summary = summary
+                self.store_summary(conversation_id=conversation_id, plan=plan)
+        return plan
+
+    def summarize_history(self, summary: str | None, messages: list[dict]) -> str:
+        with self.metrics.stage("history"):
+            response = self.client.responses.create(
+                model=self.summary_model,
+                input=self.build_summary_input(summary=summary, messages=messages),
+            )
+        self.metrics.record_usage(self.summary_model, response.usage)
+        return self.context_packer.truncate(response.output_text, self.history.summary_tokens)
+
+    def store_summary(self, conversation_id: str | None, plan: HistoryPlan) -> None:
+        # Without a conversation ID the summary cannot be reused
+        if conversation_id is not None:
+            self.history.store(conversation_id=conversation_id, through_seq=plan.to_summarize[-1]["seq"], summary=plan.summary)
+
+    def clean_response(self, text: str) -> str:
+        return text.replace("\n", " ").strip()
+
+    def document_scores(self, documents: list[ScoredPoint]) -> list[dict]:
+        return [{"id": str(doc.id), "score": doc.score} for doc in documents]
+
     def embed_queries(self, query:str, model:str="text-embedding-3-small") -> list[float]:
-        embedding = self.client.embeddings.create(model=model, input=query, dimensions=1536).data[0].embedding
+        cache_key = (model, self.normalize_query(query))
+        embedding = self.embedding_cache.get(cache_key)
+        if embedding is not None:
+            return embedding
+
+        with self.metrics.stage("embed"):
+            response = self.client.embeddings.create(model=model, input=query, dimensions=self.dimensions)
+        self.metrics.record_usage(model, response.usage)
+        embedding = response.data[0].embedding
+        self.embedding_cache.set(cache_key, embedding)
         logging.info(f"Generated embedding for query of length {len(query)}.")
         return embedding
 
-    def retrieve_context(self, embeddings: list[float], limit:int=10, max_chars:int=8000, display_info:bool=False) -> str:
+    def normalize_query(self, query:str) -> str:
+        """Collapse whitespace and case so trivially different phrasings share cache entries."""
+        return " ".join(query.split()).casefold()
+
+    def coalesced_stage(self) -> ContextManager:
+        """Stage timing a request that waits for an identical one's answer instead of running the pipeline."""
+        return self.metrics.stage("coalesced")
+
+    def cached_answer(self, embeddings: list[float] | None, documents: list[ScoredPoint], version: tuple) -> str | None:
+        # Lexically answered queries have no embedding to compare
+        if self.answer_cache is None or embeddings is None:
+            return None
+        answer = self.answer_cache.lookup(embedding=embeddings, context_ids=[doc.id for doc in documents], version=version)
+        if answer is not None:
+            logging.info("Returning cached answer for near-duplicate query.")
+        return answer
+
+    def store_answer(self, embeddings: list[float] | None, documents: list[ScoredPoint], answer: str, version: tuple) -> None:
+        if self.answer_cache is not None and embeddings is not None and answer:
+            self.answer_cache.store(embedding=embeddings, context_ids=[doc.id for doc in documents], answer=answer, version=version)
+
+    def cache_stats(self) -> dict:
+        stats = {"embedding": self.embedding_cache.stats()}
+        if self.answer_cache is not None:
+            stats["answer"] = self.answer_cache.stats()
+        if self.agent is not None:
+            stats["retrieval"] = self.agent.cache_stats()
+        stats["history_summary"] = self.history.stats()
+        return stats
+
+    def batching_stats(self) -> dict:
+        stats = {f"embedding:{model}": coalescer.stats() for model, coalescer in self.embedding_coalescers.items()}
+        if self.agent is not None:
+            stats["search"] = self.agent.batching_stats()
+        if self.in_flight is not None:
+            stats["single_flight"] = self.in_flight.stats()
+        return stats
+
+    def retrieve_context(self, embeddings: list[float], limit:int=10, max_tokens:int|None=None, display_info:bool=False) -> str:
         """Retrieve and format context from RAG agent based on a list of embeddings. Takes top-k similar documents and concatenates their text content.
 
         Args:
             embeddings (list[float]): list of embeddings representing the user query.
             limit (int, optional): number of top similar documents to retrieve. Defaults to 6.
-            max_chars (int, optional): maximum number of characters for the concatenated context. Defaults to 8000.
+            max_tokens (int, optional): token budget for the packed context. Defaults to `context_tokens`.
 
         Raises:
             ValueError: raises an error if RAG agent is not initialized.
@@ -88,30 +447,40 @@ class Chat:
             str: concatenated context from top-k similar documents. Pass to LLM for final response generation.
         """
         
+        documents = self.retrieve_documents(embeddings=embeddings, limit=limit)
+        return self.format_context(documents=documents, max_tokens=max_tokens, display_info=display_info)
+
+    def retrieve_documents(self, embeddings: list[float], limit:int=10, query:str|None=None) -> list[ScoredPoint]:
         # System checks and initilizations
         if self.agent is None:
             raise ValueError("RAG agent is not initialized. Cannot retrieve context.")
+        with self.metrics.stage("search"):
+            return self.agent.similarity_search(query_embedding=embeddings, top_k=limit, query_text=query)
 
-        documents = self.agent.similarity_search(query_embedding=embeddings, top_k=limit)
-        
-        results = [
-            {"id": doc.id, "text": doc.payload.get("text", ""), "score": doc.score}
-            for doc in documents
-        ]
+    def lexical_documents(self, query:str, limit:int=10) -> list[ScoredPoint] | None:
+        if self.agent is None:
+            raise ValueError("RAG agent is not initialized. Cannot retrieve context.")
+        with self.metrics.stage("lexical"):
+            return self.agent.lexical_search(query=query, top_k=limit)
 
-        if not results:
+    def format_context(self, documents: list, max_tokens:int|None=None, display_info:bool=False) -> str:
+        """Pack the text of retrieved documents into a single context string of at most `max_tokens` tokens."""
+        if not documents:
             logging.warning("No relevant documents found for the given query embedding.")
             return self.content_not_found
 
         # Formatting the retrieved context
-        context = "\n\n".join(r["text"] for r in results).strip()
+        with self.metrics.stage("context"):
+            context, used = self.context_packer.pack(documents=documents, max_tokens=max_tokens)
 
         if not context:
             return self.content_not_found
 
-        if len(context) > max_chars:
-            context = context[:max_chars]
-        
+        results = [
+            {"id": doc.id, "text": doc.payload.get("text", ""), "score": doc.score}
+            for doc in used
+        ]
+
         # Logging information
         average_score = sum(r["score"] for r in results) / len(results)
         logging.info(f"Average similarity score of retrieved documents: {average_score:.4f}")
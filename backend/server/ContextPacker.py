@@ -0,0 +1,117 @@
+from typing import Optional
+import logging
+import re
+from qdrant_client.models import ScoredPoint
+from ..Tokens import Tokenizer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+# Sentence end followed by whitespace; used to avoid cutting the one chunk that has to be truncated mid-sentence
+SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+class ContextPacker:
+    """Packs retrieved chunks into a prompt context under a token budget.
+
+    Chunks are taken in score order. Chunks from the same document (same `source`, `title` and `page`)
+    are merged into one passage, and the text that overlapping chunks share is only included once, so
+    the `chunk_overlap` used at ingestion is not paid for twice. Tokens are counted with the chat
+    model's tokenizer, or estimated from characters if it cannot be loaded (see `backend/Tokens.py`).
+
+    Args:
+        model (str): Chat model whose tokenizer is used for counting. Falls back to o200k_base.
+        max_tokens (int): Token budget for the packed context. Defaults to 3000.
+        min_overlap (int): Shortest shared prefix/suffix, in characters, treated as chunk overlap. Defaults to 20.
+    """
+
+    separator = "\n\n"
+
+    def __init__(self, model: str, max_tokens: int = 3000, min_overlap: int = 20):
+        if max_tokens <= 0:
+            raise ValueError(f"max_tokens must be positive, got {max_tokens}.")
+        self.tokenizer = Tokenizer(model, fallback="o200k_base")
+        self.max_tokens = max_tokens
+        self.min_overlap = min_overlap
+
+    def count_tokens(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def pack(self, documents: list[ScoredPoint], max_tokens: Optional[int] = None) -> tuple[str, list[ScoredPoint]]:
+        """Return `(context, used)`: the packed context and the documents that made it into it, in score order.
+
+        Documents are added best score first while the context fits in `max_tokens`. If not even the best
+        document fits, it is truncated at the last sentence end within the budget and used alone.
+        """
+        max_tokens = max_tokens or self.max_tokens
+        groups: dict[tuple, list[ScoredPoint]] = {}
+        group_tokens: dict[tuple, int] = {}
+        used: list[ScoredPoint] = []
+        total = 0
+
+        for doc in sorted(documents, key=lambda d: d.score, reverse=True):
+            if not (doc.payload or {}).get("text", "").strip():
+                continue
+            key = self._group_key(doc)
+            members = groups.get(key, []) + [doc]
+            tokens = self.count_tokens(self._merge(members))
+            added = tokens - group_tokens.get(key, 0)
+            if key not in groups and groups:
+                added += self.count_tokens(self.separator)
+            if total + added > max_tokens:
+                if not used:
+                    # The best document alone is over budget: keep as much of it as fits
+                    logging.info(f"Best document exceeds the {max_tokens}-token context budget; truncated it.")
+                    return self.truncate(doc.payload["text"], max_tokens), [doc]
+                continue
+            groups[key] = members
+            group_tokens[key] = tokens
+            total += added
+            used.append(doc)
+
+        context = self.separator.join(self._merge(members) for members in groups.values()).strip()
+        logging.info(f"Packed {len(used)} of {len(documents)} documents into ~{total} context tokens.")
+        return context, used
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut `text` to `max_tokens`, at the last sentence end if there is one."""
+        if self.count_tokens(text) <= max_tokens:
+            return text.strip()
+        head = self.tokenizer.truncate(text, max_tokens)
+        ends = [m.end() for m in SENTENCE_END.finditer(head + " ")]
+        return (head[:ends[-1]] if ends else head).strip()
+
+    # Helper methods
+    def _group_key(self, doc: ScoredPoint) -> tuple:
+        payload = doc.payload or {}
+        source = payload.get("blob_path") or payload.get("source") or payload.get("title")
+        if source is None:
+            # Without a source there is nothing to merge with
+            return ("id", str(doc.id))
+        return (source, payload.get("title"), payload.get("page"))
+
+    def _merge(self, members: list[ScoredPoint]) -> str:
+        """Join chunks of one document in document order, dropping the text that neighbours share."""
+        ordered = sorted(members, key=lambda d: (d.payload or {}).get("start_index", 0))
+        passages: list[str] = []
+        for doc in ordered:
+            text = doc.payload["text"].strip()
+            for i, passage in enumerate(passages):
+                merged = self._join(passage, text) or self._join(text, passage)
+                if merged is not None:
+                    passages[i] = merged
+                    break
+            else:
+                passages.append(text)
+        return self.separator.join(passages)
+
+    def _join(self, first: str, second: str) -> Optional[str]:
+        """Merge `second` onto `first` if it is contained in it or starts with a suffix of it."""
+        if second in first:
+            return first
+        for size in range(min(len(first), len(second)) - 1, self.min_overlap - 1, -1):
+            if first.endswith(second[:size]):
+                return first + second[size:]
+        return None
@@ -0,0 +1,320 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Optional
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+
+
+class ConversationStore(ABC):
+    """Chat history keyed by conversation ID.
+
+    Messages are dicts with `seq` (position in the conversation, starting at 1), `role` and `content`.
+    Each conversation keeps at most `max_messages` messages; older ones are dropped as new ones arrive,
+    but `seq` keeps counting so callers can tell how much history was dropped or already summarized.
+    Async code uses `aappend` and `amessages`, which run stores that do I/O on a worker thread.
+    """
+
+    def __init__(self, max_messages: int = 200, ttl: float | None = 86400.0):
+        if max_messages <= 0:
+            raise ValueError(f"max_messages must be positive, got {max_messages}.")
+        self.max_messages = max_messages
+        self.ttl = ttl
+
+    @abstractmethod
+    def append(self, conversation_id: str, role: str, content: str) -> int:
+        """Add a message to the conversation (creating it if needed) and return its `seq`."""
+
+    @abstractmethod
+    def messages(self, conversation_id: str, limit: Optional[int] = None) -> list[dict]:
+        """Return the stored messages, oldest first; only the last `limit` if given. Unknown IDs return []."""
+
+    @abstractmethod
+    def delete(self, conversation_id: str) -> None:
+        """Remove a conversation."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Counts for monitoring."""
+
+    async def aappend(self, conversation_id: str, role: str, content: str) -> int:
+        """`append` on a worker thread, so a store waiting on disk or a lock never blocks the event loop."""
+        return await asyncio.to_thread(self.append, conversation_id, role, content)
+
+    async def amessages(self, conversation_id: str, limit: Optional[int] = None) -> list[dict]:
+        """`messages` on a worker thread, so a store waiting on disk or a lock never blocks the event loop."""
+        return await asyncio.to_thread(self.messages, conversation_id, limit)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return bool(self.messages(conversation_id, limit=1))
+
+
+class _Conversation:
+    __slots__ = ("messages", "next_seq", "chars", "updated_at")
+
+    def __init__(self):
+        self.messages: deque[dict] = deque()
+        self.next_seq = 1
+        self.chars = 0
+        self.updated_at = time.monotonic()
+
+
+class MemoryConversationStore(ConversationStore):
+    """In-process conversation store bounded by conversation count, total message size and idle time.
+
+    Conversations are kept in LRU order. When `max_conversations` or `max_chars` is exceeded, or a
+    conversation has been idle longer than `ttl`, the least recently used conversations are evicted.
+    Not shared between worker processes; use `SQLiteConversationStore` for that.
+
+    Args:
+        max_conversations (int): Maximum number of conversations held. Defaults to 10,000.
+        max_messages (int): Maximum messages kept per conversation. Defaults to 200.
+        max_chars (int): Maximum total characters of all stored messages. Defaults to 50,000,000.
+        ttl (float | None): Seconds of inactivity after which a conversation expires. None disables expiry. Defaults to 1 day.
+    """
+
+    def __init__(
+        self,
+        max_conversations: int = 10_000,
+        max_messages: int = 200,
+        max_chars: int = 50_000_000,
+        ttl: float | None = 86400.0,
+    ):
+        super().__init__(max_messages=max_messages, ttl=ttl)
+        if max_conversations <= 0:
+            raise ValueError(f"max_conversations must be positive, got {max_conversations}.")
+        self.max_conversations = max_conversations
+        self.max_chars = max_chars
+        self.evictions = 0
+        self._conversations: OrderedDict[str, _Conversation] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def append(self, conversation_id: str, role: str, content: str) -> int:
+        with self._lock:
+            now = time.monotonic()
+            conversation = self._get(conversation_id, now)
+            if conversation is None:
+                conversation = self._conversations[conversation_id] = _Conversation()
+
+            message = {"seq": conversation.next_seq, "role": role, "content": content}
+            conversation.messages.append(message)
+            conversation.next_seq += 1
+            conversation.chars += len(content)
+            conversation.updated_at = now
+            self._chars += len(content)
+            if len(conversation.messages) > self.max_messages:
+                dropped = conversation.messages.popleft()
+                conversation.chars -= len(dropped["content"])
+                self._chars -= len(dropped["content"])
+
+            self._evict(now, keep=conversation_id)
+            return message["seq"]
+
+    def messages(self, conversation_id: str, limit: Optional[int] = None) -> list[dict]:
+        with self._lock:
+            conversation = self._get(conversation_id, time.monotonic())
+            if conversation is None:
+                return []
+            messages = list(conversation.messages)
+            return messages[-limit:] if limit else messages
+
+    # Dict operations under a lock that is never held for long; a thread hop would cost more than the call
+    async def aappend(self, conversation_id: str, role: str, content: str) -> int:
+        return self.append(conversation_id, role, content)
+
+    async def amessages(self, conversation_id: str, limit: Optional[int] = None) -> list[dict]:
+        return self.messages(conversation_id, limit)
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock:
+            conversation = self._conversations.pop(conversation_id, None)
+            if conversation is not None:
+                self._chars -= conversation.chars
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "conversations": len(self._conversations),
+                "max_conversations": self.max_conversations,
+                "chars": self._chars,
+                "max_chars": self.max_chars,
+                "evictions": self.evictions,
+            }
+
+    # Helper methods
+    def _get(self, conversation_id: str, now: float) -> Optional[_Conversation]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return None
+        if self._expired(conversation, now):
+            self._remove(conversation_id)
+            return None
+        self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def _expired(self, conversation: _Conversation, now: float) -> bool:
+        return self.ttl is not None and now - conversation.updated_at > self.ttl
+
+    def _remove(self, conversation_id: str) -> None:
+        conversation = self._conversations.pop(conversation_id)
+        self._chars -= conversation.chars
+        self.evictions += 1
+
+    def _evict(self, now: float, keep: str) -> None:
+        """Drop expired and least recently used conversations until the store is within its limits."""
+        while self._conversations:
+            oldest_id, oldest = next(iter(self._conversations.items()))
+            over = len(self._conversations) > self.max_conversations or self._chars > self.max_chars
+            if oldest_id == keep or not (over or self._expired(oldest, now)):
+                break
+            self._remove(oldest_id)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversation store in a SQLite database in WAL mode, shared by all workers on the host and kept across restarts.
+
+    Appends are a single short write transaction. Messages beyond `max_messages` are deleted as new
+    ones arrive, and conversations idle longer than `ttl` are purged every `purge_interval` appends.
+
+    Args:
+        path (str | Path): Database file.
+        max_messages (int): Maximum messages kept per conversation. Defaults to 200.
+        ttl (float | None): Seconds of inactivity after which a conversation expires. None disables expiry. Defaults to 1 day.
+        purge_interval (int): Appends between purges of expired conversations. Defaults to 1000.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_messages: int = 200,
+        ttl: float | None = 86400.0,
+        purge_interval: int = 1000,
+    ):
+        super().__init__(max_messages=max_messages, ttl=ttl)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.purge_interval = purge_interval
+        self.evictions = 0
+        self._appends = 0
+        self._lock = threading.Lock()
+
+        # Autocommit mode; transactions are opened explicitly so appends from other processes serialize
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations "
+            "(id TEXT PRIMARY KEY, next_seq INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (updated_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages "
+            "(conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+            "PRIMARY KEY (conversation_id, seq)) WITHOUT ROWID"
+        )
+
+    def append(self, conversation_id: str, role: str, content: str) -> int:
+        with self._lock:
+            now = time.time()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired conversations start over rather than resurrecting stale history
+                if self.ttl is not None:
+                    self.evictions += self._delete_where("updated_at < ? AND id = ?", (now - self.ttl, conversation_id))
+                seq = self._db.execute(
+                    "INSERT INTO conversations (id, next_seq, updated_at) VALUES (?, 2, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET next_seq = next_seq + 1, updated_at = excluded.updated_at "
+                    "RETURNING next_seq - 1",
+                    (conversation_id, now),
+                ).fetchone()[0]
+                self._db.execute(
+                    "INSERT INTO messages (conversation_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                    (conversation_id, seq, role, content),
+                )
+                if seq > self.max_messages:
+                    self._db.execute(
+                        "DELETE FROM messages WHERE conversation_id = ? AND seq <= ?",
+                        (conversation_id, seq - self.max_messages),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+            self._appends += 1
+            if self.ttl is not None and self._appends % self.purge_interval == 0:
+                self._purge_expired(now)
+            return seq
+
+    def messages(self, conversation_id: str, limit: Optional[int] = None) -> list[dict]:
+        with self._lock:
+            if self.ttl is not None:
+                row = self._db.execute("SELECT updated_at FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+                if row is None or time.time() - row[0] > self.ttl:
+                    return []
+            rows = self._db.execute(
+                "SELECT seq, role, content FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+                (conversation_id, limit or self.max_messages),
+            ).fetchall()
+        return [{"seq": seq, "role": role, "content": content} for seq, role, content in reversed(rows)]
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._delete_where("id = ?", (conversation_id,))
+            self._db.execute("COMMIT")
+
+    def stats(self) -> dict:
+        with self._lock:
+            conversations = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "conversations": conversations,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # Helper methods
+    def _delete_where(self, condition: str, params: tuple) -> int:
+        ids = [row[0] for row in self._db.execute(f"SELECT id FROM conversations WHERE {condition}", params)]
+        for conversation_id in ids:
+            self._db.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            self._db.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+        return len(ids)
+
+    def _purge_expired(self, now: float) -> None:
+        self._db.execute("BEGIN IMMEDIATE")
+        purged = self._delete_where("updated_at < ?", (now - self.ttl,))
+        self._db.execute("COMMIT")
+        self.evictions += purged
+        if purged:
+            logging.info(f"Purged {purged} expired conversations.")
+
+
+def create_conversation_store(
+    backend: str = "memory",
+    path: str | Path | None = None,
+    max_messages: int = 200,
+    ttl: float | None = 86400.0,
+) -> ConversationStore:
+    """Build the conversation store named by `backend` ("memory" or "sqlite")."""
+    if backend == "memory":
+        return MemoryConversationStore(max_messages=max_messages, ttl=ttl)
+    if backend == "sqlite":
+        if path is None:
+            raise ValueError("A database path is required for the sqlite conversation store.")
+        return SQLiteConversationStore(path=path, max_messages=max_messages, ttl=ttl)
+    raise ValueError(f"Unknown conversation store '{backend}'. Available: memory, sqlite.")
@@ -0,0 +1,77 @@
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from ..database.Cache import LRUCache
+
+
+@dataclass
+class HistoryPlan:
+    """What to send for a conversation's history: the rolling summary, the recent turns verbatim,
+    and the older turns that still have to be folded into the summary."""
+
+    summary: Optional[str] = None
+    recent: list[dict] = field(default_factory=list)
+    to_summarize: list[dict] = field(default_factory=list)
+
+
+class HistoryWindow:
+    """Fits conversation history into a token budget: recent turns verbatim, older turns as a rolling summary.
+
+    Summaries are cached per conversation together with the `seq` of the last message they cover, so
+    each message is summarized once: a new summary is built from the previous one plus the turns that
+    have left the verbatim window since. When the window overflows, it is cut back to half the
+    verbatim budget, so summaries are refreshed every few turns rather than on every request.
+
+    Args:
+        count_tokens (Callable[[str], int]): Token counter of the chat model.
+        max_tokens (int): Total history budget, summary included. Defaults to 1500.
+        summary_tokens (int): Part of the budget reserved for the summary. Defaults to 300.
+        cache_size (int): Maximum number of conversations with a cached summary. Defaults to 10,000.
+        cache_ttl (float | None): Seconds a cached summary stays valid. Defaults to 1 day.
+    """
+
+    # Per-message overhead of the role/formatting tokens
+    message_overhead = 4
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        max_tokens: int = 1500,
+        summary_tokens: int = 300,
+        cache_size: int = 10_000,
+        cache_ttl: float | None = 86400.0,
+    ):
+        if not 0 <= summary_tokens < max_tokens:
+            raise ValueError(f"summary_tokens must be between 0 and max_tokens ({max_tokens}), got {summary_tokens}.")
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        # conversation_id -> (seq of the last summarized message, summary)
+        self.summaries = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
+    @property
+    def recent_tokens(self) -> int:
+        return self.max_tokens - self.summary_tokens
+
+    def plan(self, conversation_id: Optional[str], messages: list[dict]) -> HistoryPlan:
+        """Split `messages` (oldest first, with `seq`) into cached summary, recent turns and turns to summarize."""
+        cached = self.summaries.get(conversation_id) if conversation_id is not None else None
+        through, summary = cached or (0, None)
+        pending = [m for m in messages if m["seq"] > through]
+        tokens = [self.count_tokens(m["content"]) + self.message_overhead for m in pending]
+        if sum(tokens) <= self.recent_tokens:
+            return HistoryPlan(summary=summary, recent=pending)
+
+        keep, used = 0, 0
+        for count in reversed(tokens):
+            if used + count > self.recent_tokens // 2:
+                break
+            used += count
+            keep += 1
+        split = len(pending) - keep
+        return HistoryPlan(summary=summary, recent=pending[split:], to_summarize=pending[:split])
+
+    def store(self, conversation_id: str, through_seq: int, summary: str) -> None:
+        self.summaries.set(conversation_id, (through_seq, summary))
+
+    def stats(self) -> dict:
+        return self.summaries.stats()
@@ -1,12 +1,35 @@
-from typing import Union, List, Optional
+from contextlib import asynccontextmanager
+from typing import Union, List, Optional, AsyncIterator, Callable, TypeVar
+import asyncio
+import json
 import logging
+import time
 import uuid
-from fastapi import FastAPI, HTTPException
+
+# Heavy imports below are timed for the startup report. The openai and qdrant_client packages (behind
+# Chat, RAG, the job manager and the clients) take most of the import time; they are imported in
+# `lifespan`, so importing this module stays cheap.
+_imports_started = time.perf_counter()
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from backend.server.Chat import Chat
-from backend.database.Agent import RAG
-from config import OPENAI_API_KEY, QDRANT_COLLECTION_NAME
+from backend.server.Conversations import create_conversation_store
+from backend.Metrics import get_metrics
+from config import (
+    OPENAI_API_KEY,
+    QDRANT_COLLECTION_NAME,
+    CONVERSATION_STORE,
+    CONVERSATION_DB_PATH,
+    CONVERSATION_MAX_MESSAGES,
+    CONVERSATION_TTL,
+    LOCAL_INDEX,
+    LOCAL_INDEX_DTYPE,
+    LOCAL_INDEX_MAX_BYTES
+    )
+IMPORT_SECONDS = time.perf_counter() - _imports_started
+
+T = TypeVar("T")
 
 # Configure logging
 logging.basicConfig(
@@ -14,6 +37,7 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s %(message)s"
 )
 logger = logging.getLogger(__name__)
+metrics = get_metrics()
 
 class AIPrompt(BaseModel):
     id: Optional[int] = Field(None, description="Unique identifier for the prompt")
@@ -39,14 +63,86 @@ class ChatResponse(BaseModel):
     error: Optional[str] = Field(None, description="Error message if request failed")
 
 
-# In-memory conversation store (placeholder for future memory implementation)
-conversations: dict[str, list[dict]] = {}
+class IngestRequest(BaseModel):
+    directory: str = Field("Finance", description="Blob directory to ingest")
+    collection_name: str = Field(QDRANT_COLLECTION_NAME, description="Qdrant collection to store the chunks in")
+    file_extension: Optional[str] = Field(None, description="Only ingest blobs with this extension")
+    parse_workers: Optional[int] = Field(None, ge=1, description="Parser processes; parses on the download threads if not set")
+
+
+# Seconds spent per startup step; served by /api/startup
+startup_report: dict[str, float] = {}
+
+def timed(name: str, build: Callable[[], T]) -> T:
+    started = time.perf_counter()
+    result = build()
+    startup_report[name] = round(time.perf_counter() - started, 4)
+    return result
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared clients, RAG agent, Chat instance and conversation store when the server starts, not at import."""
+    started = time.perf_counter()
+    startup_report["imports"] = round(IMPORT_SECONDS, 4)
+    lifespan_imports_started = time.perf_counter()
+    from backend.server.Chat import Chat
+    from backend.database.Agent import RAG
+    from backend.database.Jobs import IngestionJobManager
+    from backend.Clients import get_clients
+    startup_report["lifespan_imports"] = round(time.perf_counter() - lifespan_imports_started, 4)
+    clients = get_clients()
+    timed("clients", lambda: (clients.openai(), clients.async_openai(), clients.qdrant(), clients.async_qdrant()))
+    app.state.agent = timed("agent", lambda: RAG(
+        collection_name=QDRANT_COLLECTION_NAME,
+        directory="Finance",
+        openai_api_key=OPENAI_API_KEY,
+        local_index=LOCAL_INDEX,
+        local_index_dtype=LOCAL_INDEX_DTYPE,
+        local_index_max_bytes=LOCAL_INDEX_MAX_BYTES,
+        clients=clients
+    ))
+    if LOCAL_INDEX:
+        # Scrolls the whole collection, so it runs off the event loop; Qdrant serves searches if it fails
+        local_index_started = time.perf_counter()
+        try:
+            await asyncio.to_thread(app.state.agent.load_local_index)
+        except Exception as e:
+            logger.warning(f"Could not load the local index at startup: {e}")
+        startup_report["local_index"] = round(time.perf_counter() - local_index_started, 4)
+    app.state.chat = timed("chat", lambda: Chat(model="gpt-5.1", key=OPENAI_API_KEY, rag_agent=app.state.agent, clients=clients))
+    # Conversation history, bounded per conversation and in total (see backend/server/Conversations.py)
+    app.state.conversations = timed("conversations", lambda: create_conversation_store(
+        backend=CONVERSATION_STORE,
+        path=CONVERSATION_DB_PATH,
+        max_messages=CONVERSATION_MAX_MESSAGES,
+        ttl=CONVERSATION_TTL
+    ))
+    # Cache, batching and conversation counters are read at scrape time by /metrics
+    metrics.register_stats("cache", app.state.chat.cache_stats)
+    metrics.register_stats("batching", app.state.chat.batching_stats)
+    metrics.register_stats("conversations", app.state.conversations.stats)
+    # Ingestion jobs are queued here and run by the ingestion worker process (see backend/database/Jobs.py)
+    app.state.ingestion = timed("ingestion", lambda: IngestionJobManager(clients=clients))
+    metrics.register_stats("ingestion_jobs", app.state.ingestion.stats)
+    startup_report["lifespan"] = round(time.perf_counter() - started, 4)
+    startup_report["total"] = round(startup_report["imports"] + startup_report["lifespan"], 4)
+    logger.info(f"Chat instance and RAG agent initialized successfully. Startup times (s): {startup_report}")
+
+    yield
+
+    # Jobs run in this process (INGESTION_RUN_IN_API) store their embedded batches and checkpoint as "interrupted"
+    await asyncio.to_thread(app.state.ingestion.close)
+    close = getattr(app.state.conversations, "close", None)
+    if close is not None:
+        close()
+    await clients.aclose()
 
 # FastAPI application instance.
 app = FastAPI(
     title="AI Chatbot API",
     description="API for the AI Chatbot with RAG capabilities",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -58,53 +154,159 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG agent and Chat instance at startup
-agent = RAG(collection_name=QDRANT_COLLECTION_NAME, directory="Finance", openai_api_key=OPENAI_API_KEY)
-chat_instance = Chat(model="gpt-5.1", key=OPENAI_API_KEY, rag_agent=agent)
-logger.info("Chat instance and RAG agent initialized successfully.")
-
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the EmbeddingBot API"}
 
+@app.get("/api/startup")
+def startup_times() -> dict[str, float]:
+    """Seconds spent on imports and on each step of building the app at startup.
+
+    `imports` is importing this module; `lifespan_imports` is loading the openai and qdrant_client
+    packages when the server starts, which is most of the startup time.
+    """
+    return startup_report
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    """Latency histograms, token/error counters and cache stats in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/chat", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest) -> ChatResponse:
-    """Process a chat message and return an AI-generated response."""
+async def chat_endpoint(request: ChatRequest, response: Response) -> ChatResponse:
+    """Process a chat message and return an AI-generated response.
+
+    The `Server-Timing` header holds the milliseconds spent per pipeline stage.
+    """
     # Generate or use existing conversation ID
     conversation_id = request.conversation_id or str(uuid.uuid4())
+    chat_instance, conversations = app.state.chat, app.state.conversations
     
+    with metrics.request("chat") as timings:
+        try:
+            logger.info(f"Processing chat request for conversation: {conversation_id}")
+            
+            # Earlier turns, then store user message in conversation history (created if new)
+            history = await conversations.amessages(conversation_id)
+            await conversations.aappend(conversation_id, "user", request.message)
+            
+            # Generate response using the Chat pipeline
+            response_text = await chat_instance.aquery_pipeline(
+                request.message.strip(),
+                conversation_id=conversation_id,
+                history=history
+            )
+            
+            # Store assistant response in conversation history
+            await conversations.aappend(conversation_id, "assistant", response_text)
+            
+            logger.info(f"Successfully generated response for conversation: {conversation_id}")
+            
+            response.headers["Server-Timing"] = timings.header()
+            return ChatResponse(
+                response=response_text,
+                conversation_id=conversation_id
+            )
+            
+        except ValueError as e:
+            logger.error(f"Validation error in chat endpoint: {str(e)}")
+            raise HTTPException(status_code=400, detail="Invalid request parameters")
+        except Exception as e:
+            logger.error(f"Unexpected error in chat endpoint: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail="An error occurred while processing your request")
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest) -> StreamingResponse:
+    """Process a chat message and stream the AI-generated response as Server-Sent Events.
+
+    Events: `retrieval` (document ids and scores), `token` (text delta), `done` (conversation ID and
+    milliseconds per stage, as headers are sent before they are known) and `error` if the pipeline
+    fails after the stream has started.
+    """
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+    message = request.message.strip()
+    if not message:
+        raise HTTPException(status_code=400, detail="Invalid request parameters")
+
+    logger.info(f"Processing streaming chat request for conversation: {conversation_id}")
+    chat_instance, conversations = app.state.chat, app.state.conversations
+    history = await conversations.amessages(conversation_id)
+    await conversations.aappend(conversation_id, "user", request.message)
+
+    async def event_stream() -> AsyncIterator[str]:
+        parts: list[str] = []
+        with metrics.request("chat_stream") as timings:
+            try:
+                async for event, data in chat_instance.astream_pipeline(message, conversation_id=conversation_id, history=history):
+                    if event == "token":
+                        parts.append(data["text"])
+                    yield sse_event(event, data)
+            except Exception as e:
+                logger.error(f"Unexpected error in chat stream endpoint: {str(e)}", exc_info=True)
+                timings.status = "error"
+                yield sse_event("error", {"detail": "An error occurred while processing your request"})
+                return
+
+            # Store the finished assistant response in conversation history
+            await conversations.aappend(conversation_id, "assistant", chat_instance.clean_response("".join(parts)))
+            logger.info(f"Successfully streamed response for conversation: {conversation_id}")
+            yield sse_event("done", {"conversation_id": conversation_id, "timings": timings.as_dict()})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def ingestion_job(job_id: str):
+    job = app.state.ingestion.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
+    return job
+
+@app.post("/api/ingest", status_code=202)
+def start_ingestion(request: IngestRequest) -> dict:
+    """Queue ingestion of a blob directory for the ingestion worker. Poll `GET /api/ingest/{job_id}` for progress."""
+    job = app.state.ingestion.submit(
+        directory=request.directory,
+        collection_name=request.collection_name,
+        file_extension=request.file_extension,
+        parse_workers=request.parse_workers,
+    )
+    return job.progress()
+
+@app.get("/api/ingest")
+def list_ingestions() -> list[dict]:
+    """All ingestion jobs in the shared job directory, oldest first."""
+    return [job.progress() for job in app.state.ingestion.all_jobs()]
+
+@app.get("/api/ingest/{job_id}")
+def ingestion_status(job_id: str) -> dict:
+    """State of an ingestion job: completed and remaining blobs, stored chunks, throughput, ETA and errors."""
+    return ingestion_job(job_id).progress()
+
+@app.post("/api/ingest/{job_id}/cancel")
+def cancel_ingestion(job_id: str) -> dict:
+    """Stop a queued or running job once its embedded batches are stored. It can be resumed later."""
     try:
-        logger.info(f"Processing chat request for conversation: {conversation_id}")
-        
-        # Initialize conversation history if new
-        if conversation_id not in conversations:
-            conversations[conversation_id] = []
-        
-        # Store user message in conversation history
-        conversations[conversation_id].append({
-            "role": "user",
-            "content": request.message
-        })
-        
-        # Generate response using the Chat pipeline
-        response_text = chat_instance.query_pipeline(request.message.strip())
-        
-        # Store assistant response in conversation history
-        conversations[conversation_id].append({
-            "role": "assistant",
-            "content": response_text
-        })
-        
-        logger.info(f"Successfully generated response for conversation: {conversation_id}")
-        
-        return ChatResponse(
-            response=response_text,
-            conversation_id=conversation_id
-        )
-        
+        return app.state.ingestion.cancel(job_id).progress()
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
     except ValueError as e:
-        logger.error(f"Validation error in chat endpoint: {str(e)}")
-        raise HTTPException(status_code=400, detail="Invalid request parameters")
-    except Exception as e:
-        logger.error(f"Unexpected error in chat endpoint: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="An error occurred while processing your request")
\ No newline at end of file
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/api/ingest/{job_id}/resume", status_code=202)
+def resume_ingestion(job_id: str) -> dict:
+    """Run a finished, cancelled or interrupted job again, skipping the blobs it already completed."""
+    try:
+        return app.state.ingestion.resume(job_id).progress()
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -8,14 +8,42 @@ load_dotenv()
 ACCOUNT_URL = os.getenv("AZURE_ACCOUNT_URL")
 BLOB_CONTAINER = os.getenv("BLOB_CONTAINER")
 BLOB_ACCESS_KEY = os.getenv("BLOB_ACCESS_KEY")
+BLOB_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")  # e.g. Azurite for local runs
 # Qdrant keys
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME")
+QDRANT_COLLECTION_PROFILE = os.getenv("QDRANT_COLLECTION_PROFILE", "default")  # see backend/database/Profiles.py
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
 # OpenAI API key
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None uses the public API; set for proxies or local stand-ins
+# Shared HTTP connection pools (see backend/Clients.py)
+CLIENT_MAX_CONNECTIONS = int(os.getenv("CLIENT_MAX_CONNECTIONS", "100"))
+CLIENT_MAX_KEEPALIVE = int(os.getenv("CLIENT_MAX_KEEPALIVE", "20"))
+CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("CLIENT_KEEPALIVE_EXPIRY", "30"))
+CLIENT_TIMEOUT = float(os.getenv("CLIENT_TIMEOUT", "60"))
+CLIENT_CONNECT_TIMEOUT = float(os.getenv("CLIENT_CONNECT_TIMEOUT", "5"))
+# In-process NumPy mirror of the collection for dense search (see backend/database/LocalIndex.py)
+LOCAL_INDEX = os.getenv("LOCAL_INDEX", "false").lower() in ("1", "true", "yes")
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")  # "float32" or "float16"
+LOCAL_INDEX_MAX_BYTES = int(os.getenv("LOCAL_INDEX_MAX_BYTES", str(1 << 30)))
+# Conversation history
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "memory")  # "memory" or "sqlite"
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "200"))
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "86400"))
+# Background ingestion jobs (see backend/database/Jobs.py)
+INGESTION_MAX_JOBS = int(os.getenv("INGESTION_MAX_JOBS", "1"))
+INGESTION_RESUME_JOBS = os.getenv("INGESTION_RESUME_JOBS", "false").lower() in ("1", "true", "yes")
+# Jobs normally run in a separate worker (`python -m backend.database.Jobs`); "true" also runs them in the API process
+INGESTION_RUN_IN_API = os.getenv("INGESTION_RUN_IN_API", "false").lower() in ("1", "true", "yes")
 
 # Default paths
 DIR = Path(__file__).resolve().parent.parent
 DB_PATH = DIR / "testing" / "database"
-SOURCE_DIR = DIR / "testing" / "Notes"
\ No newline at end of file
+SOURCE_DIR = DIR / "testing" / "Notes"
+MANIFEST_DIR = Path(os.getenv("MANIFEST_DIR", DIR / "testing" / "manifests"))
+EMBEDDING_CACHE_DIR = Path(os.getenv("EMBEDDING_CACHE_DIR", DIR / "testing" / "embedding_cache"))
+CONVERSATION_DB_PATH = Path(os.getenv("CONVERSATION_DB_PATH", DIR / "testing" / "conversations.sqlite3"))
+INGESTION_JOB_DIR = Path(os.getenv("INGESTION_JOB_DIR", DIR / "testing" / "ingestion_jobs"))